@@ -0,0 +1,313 @@
+"""
+Microbenchmarks for the rule-based components, with JSON baselines and a regression check.
+
+Each case reports ops/sec and p50/p90/p99 latency. Inputs come from the synthetic conversation
+generator (short, long and pathological utterances) and sessions pre-filled with up to 10^5 turns.
+
+Usage:
+    python benchmarks/bench_components.py --quick
+    python benchmarks/bench_components.py --save benchmarks/baselines/local.json
+    python benchmarks/bench_components.py --compare benchmarks/baselines/local.json --tolerance 0.25
+    python benchmarks/bench_components.py --filter memory. --histories 100 100000
+
+--compare exits with status 1 when any case's p50 latency (or ops/sec) is worse than the
+baseline by more than the tolerance.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.memory import Memory
+from core.reasoning import Reasoning
+from core.turn_features import TurnFeatures
+from synthetic import LENGTHS, SyntheticConversation
+
+DEFAULT_HISTORIES = (100, 10_000, 100_000)
+QUICK_HISTORIES = (100, 10_000)
+
+
+class Session:
+    """Reasoning and Memory after `turns` synthetic turns through the rule-based pipeline"""
+
+    def __init__(self, turns: int, seed: int = 42):
+        self.reasoning = Reasoning(use_llm=False)
+        self.memory = Memory("bench")
+        self.analysis = {}
+        for turn_number, user_input in enumerate(SyntheticConversation(seed).mixed(turns), 1):
+            self.add_turn(user_input, turn_number)
+
+    def add_turn(self, user_input: str, turn_number: int):
+        features = TurnFeatures(user_input)
+        self.analysis = self.reasoning.analyze_input(user_input, turn_number, features)
+        self.memory.simulate_biometric_response(features.intensity, features.stress_factor)
+        self.memory.store_interaction(user_input, self.analysis, turn_number, features)
+        self.memory.store_agent_response("AgentA", "I'm here and ready to listen. What's on your mind?")
+
+
+class Suite:
+    """Builds sessions, agents and inputs lazily so filtered runs only pay for what they use"""
+
+    def __init__(self, histories, seed: int = 42):
+        self.histories = histories
+        self.seed = seed
+        self._sessions = {}
+        self._agents = None
+        self._api = None
+
+    def session(self, turns: int) -> Session:
+        if turns not in self._sessions:
+            started = time.perf_counter()
+            self._sessions[turns] = Session(turns, self.seed)
+            print(f"   (built a {turns:,}-turn session in {time.perf_counter() - started:.1f}s)")
+        return self._sessions[turns]
+
+    def inputs(self, length: str, count: int = 64) -> List[str]:
+        return SyntheticConversation(self.seed + 1).utterances(count, length)
+
+    def features(self, session: Session, length: str) -> List[TurnFeatures]:
+        """Features as Reasoning sees them, with repetition scored against the session"""
+        features = []
+        for user_input in self.inputs(length):
+            turn = TurnFeatures(user_input)
+            turn.repetition = session.reasoning.shingle_index.observe(turn.tokens)
+            features.append(turn)
+        return features
+
+    def agents(self):
+        if self._agents is None:
+            # The LLM probe is slow and irrelevant here
+            from agents.specialized_agents import AgentA, AgentB
+            agent_a = AgentA(name="AgentA", tone="neutral")
+            agent_b = AgentB(name="AgentB", tone="empathetic")
+            agent_a.llm_available = agent_b.llm_available = False
+            self._agents = (agent_a, agent_b)
+        return self._agents
+
+    def api(self, session: Session):
+        """API module and a conversation session wrapping the benchmark session"""
+        if self._api is None:
+            from interfaces import api
+            self._api = api
+        conversation = self._api.get_sessions().peek("bench")
+        if conversation is None:
+            conversation = self._api.get_sessions().get("bench")
+            conversation.reasoning.llm_available = False
+            conversation.agent_a.llm_available = conversation.agent_b.llm_available = False
+        conversation.memory = session.memory
+        conversation.reasoning = session.reasoning
+        conversation.turn_counter = len(session.reasoning.conversation_history)
+        return self._api, conversation
+
+    def cases(self) -> Dict[str, Callable[[], Callable[[], object]]]:
+        """Case name -> setup returning the zero-argument function to time"""
+        cases = {}
+
+        def cycle(items):
+            return itertools.cycle(items).__next__
+
+        for length in LENGTHS:
+            def rule_based_analysis(length=length):
+                session = self.session(self.histories[0])
+                next_features = cycle(self.features(session, length))
+                turn = itertools.count(len(session.reasoning.conversation_history) + 1).__next__
+
+                def run():
+                    features = next_features()
+                    return session.reasoning._rule_based_analysis(features.text, turn(), features=features)
+                return run
+
+            def detect_recursion(length=length):
+                session = self.session(self.histories[0])
+                next_features = cycle(self.features(session, length))
+
+                def run():
+                    features = next_features()
+                    return session.reasoning._detect_recursion(features.text, features)
+                return run
+
+            def detect_contradictions(length=length):
+                session = self.session(self.histories[0])
+                next_features = cycle(self.features(session, length))
+
+                def run():
+                    features = next_features()
+                    return session.reasoning._detect_contradictions(features.text, features)
+                return run
+
+            def turn_features(length=length):
+                next_input = cycle(self.inputs(length))
+                return lambda: TurnFeatures(next_input())
+
+            cases[f"reasoning.rule_based_analysis[{length}]"] = rule_based_analysis
+            cases[f"reasoning.detect_recursion[{length}]"] = detect_recursion
+            cases[f"reasoning.detect_contradictions[{length}]"] = detect_contradictions
+            cases[f"turn_features[{length}]"] = turn_features
+
+        def agent_a_fallback():
+            agent_a, _ = self.agents()
+            session = self.session(self.histories[0])
+            context = session.memory.get_conversation_context()
+            analyses = [dict(session.analysis, emotional_state=state, coherence_status=status)
+                        for state in ("happy", "sad", "anxious", "neutral")
+                        for status in ("stable", "coherence_lost")]
+            next_analysis = cycle(analyses)
+            return lambda: agent_a._generate_fallback_response(next_analysis(), context)
+
+        cases["agent_a.fallback_response"] = agent_a_fallback
+
+        for history in self.histories:
+            def store_interaction(history=history):
+                session = self.session(history)
+                next_features = cycle(self.features(session, "short"))
+                turn = itertools.count(history + 1).__next__
+
+                def run():
+                    features = next_features()
+                    return session.memory.store_interaction(features.text, session.analysis, turn(), features)
+                return run
+
+            def conversation_context(history=history):
+                memory = self.session(history).memory
+                return memory.get_conversation_context
+
+            def memory_summary(history=history):
+                memory = self.session(history).memory
+                return memory.get_memory_summary
+
+            def agent_b_fallback(history=history):
+                _, agent_b = self.agents()
+                past_interactions = self.session(history).memory.get_past_interactions()
+                return lambda: agent_b._basic_fallback_detection(past_interactions)
+
+            def system_status(history=history):
+                api, conversation = self.api(self.session(history))
+                return lambda: api.get_system_status_data(conversation)
+
+            def status_response(history=history, view="full"):
+                from interfaces.responses import dumps
+                api, conversation = self.api(self.session(history))
+                fields = list(api.RESPONSE_VIEWS['system_status'][view]) if view != "full" else None
+                return lambda: dumps(api.trimmed(api.get_system_status_data(conversation, fields), fields))
+
+            cases[f"memory.get_conversation_context[h={history}]"] = conversation_context
+            cases[f"memory.get_memory_summary[h={history}]"] = memory_summary
+            cases[f"agent_b.basic_fallback_detection[h={history}]"] = agent_b_fallback
+            cases[f"api.get_system_status_data[h={history}]"] = system_status
+            for view in ("full", "minimal"):
+                cases[f"api.status_response[{view}][h={history}]"] = \
+                    lambda history=history, view=view: status_response(history, view)
+            # Grows the session, so it runs after the read-only cases for this history size
+            cases[f"memory.store_interaction[h={history}]"] = store_interaction
+
+        return cases
+
+
+def measure(run: Callable[[], object], min_time: float, max_calls: int, warmup: int = 20) -> Dict:
+    """Time individual calls until min_time has elapsed or max_calls were made"""
+    for _ in range(warmup):
+        run()
+
+    samples = []
+    clock = time.perf_counter_ns
+    deadline = clock() + int(min_time * 1e9)
+    while len(samples) < max_calls:
+        start = clock()
+        run()
+        end = clock()
+        samples.append(end - start)
+        if end >= deadline and len(samples) >= 5:
+            break
+
+    samples.sort()
+
+    def percentile(fraction: float) -> float:
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))] / 1000.0
+
+    total_seconds = sum(samples) / 1e9
+    return {
+        "calls": len(samples),
+        "ops_per_sec": round(len(samples) / total_seconds, 1) if total_seconds else 0.0,
+        "mean_us": round(sum(samples) / len(samples) / 1000.0, 2),
+        "p50_us": round(percentile(0.50), 2),
+        "p90_us": round(percentile(0.90), 2),
+        "p99_us": round(percentile(0.99), 2),
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print per-case changes against the baseline and return the regressed case names"""
+    regressions = []
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%}):")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"   • {name:<48} new")
+            continue
+        latency_change = current["p50_us"] / previous["p50_us"] - 1.0 if previous["p50_us"] else 0.0
+        throughput_change = current["ops_per_sec"] / previous["ops_per_sec"] - 1.0 if previous["ops_per_sec"] else 0.0
+        regressed = latency_change > tolerance or throughput_change < -tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"   • {name:<48} p50 {latency_change:+7.1%}  ops/s {throughput_change:+7.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Component microbenchmarks with baseline comparison")
+    parser.add_argument("--quick", action="store_true", help=f"Histories {QUICK_HISTORIES} and shorter timing")
+    parser.add_argument("--histories", type=int, nargs="+", help="Session sizes for history-dependent cases")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=None, help="Seconds to time each case")
+    parser.add_argument("--max-calls", type=int, default=20000)
+    parser.add_argument("--save", help="Write results to this JSON baseline")
+    parser.add_argument("--compare", help="Compare against this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing")
+    args = parser.parse_args()
+
+    histories = tuple(args.histories or (QUICK_HISTORIES if args.quick else DEFAULT_HISTORIES))
+    min_time = args.min_time if args.min_time is not None else (0.2 if args.quick else 1.0)
+    suite = Suite(histories)
+
+    results = {}
+    print(f"Component benchmarks (histories {', '.join(f'{h:,}' for h in histories)}):")
+    for name, setup in suite.cases().items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(setup(), min_time, args.max_calls)
+        result = results[name]
+        print(f"   • {name:<48} {result['ops_per_sec']:>12,.0f} ops/s   p50 {result['p50_us']:>10.1f} µs"
+              f"   p90 {result['p90_us']:>10.1f} µs   p99 {result['p99_us']:>10.1f} µs")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w') as file:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results
+            }, file, indent=2)
+        print(f"\nSaved {len(results)} results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
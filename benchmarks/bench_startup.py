@@ -0,0 +1,131 @@
+"""
+Cold-start check for the CLI and the API, each measured in fresh interpreters.
+
+    cli: python startup, `import main` and AgenticAISystem() (everything before the welcome banner)
+    api: python startup, importing interfaces.api, create_app() and the first /api/system_status
+
+The LLM connection test is left out (it runs in the background for the CLI and is disabled for the
+API run), so the numbers measure this code rather than the network.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 7 --cli-budget-ms 800 --api-budget-ms 1200
+
+Exits with status 1 when a target's median cold start is over its budget, after printing its
+slowest imports. tests/test_startup.py runs the same cold starts against the default budgets and also
+checks that each target's deferred modules are not imported with it.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# Add src directory to path for imports
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(SRC_DIR)
+
+from core.startup import print_import_report, profile_imports
+
+DEFAULT_BUDGETS_MS = {"cli": 1000.0, "api": 1500.0}
+
+# Modules each target loads only when first needed, never as part of importing it. The API reads
+# its settings (and so yaml) at import; the CLI on construction.
+DEFERRED_MODULES = {
+    "cli": ("openai", "yaml", "colorama"),
+    "api": ("openai", "colorama"),
+}
+
+# Each prints a JSON object of in-process phase timings, plus the deferred modules the import
+# loaded anyway; total wall time is measured outside
+TARGETS = {
+    "cli": """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+deferred_imported = [name for name in DEFERRED if name in sys.modules]
+system = main.AgenticAISystem()
+ready = time.perf_counter()
+print(json.dumps({"import": imported - start, "construct": ready - imported, "deferred_imported": deferred_imported}))
+""",
+    "api": """
+import time
+start = time.perf_counter()
+from interfaces import api
+imported = time.perf_counter()
+deferred_imported = [name for name in DEFERRED if name in sys.modules]
+app = api.create_app()
+service = api.get_llm_service()
+if service is not None:
+    service.disable()
+response = app.test_client().get('/api/system_status')
+assert response.status_code == 200, response.status_code
+ready = time.perf_counter()
+print(json.dumps({"import": imported - start, "first_request": ready - imported,
+                  "deferred_imported": deferred_imported}))
+""",
+}
+
+IMPORT_STATEMENTS = {
+    "cli": "import main",
+    "api": "from interfaces import api",
+}
+
+
+def cold_start(target: str) -> Dict:
+    """Wall time of one fresh interpreter running the target, plus its phase timings"""
+    code = (f"import json, sys; sys.path.insert(0, {SRC_DIR!r}); DEFERRED = {DEFERRED_MODULES[target]!r}\n"
+            f"{TARGETS[target]}")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{target} cold start failed:\n{result.stderr}")
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    return {"wall": wall, **phases}
+
+
+def measure(target: str, runs: int) -> Dict:
+    samples = [cold_start(target) for _ in range(runs)]
+    result = {key: statistics.median(sample[key] for sample in samples)
+              for key in samples[0] if key != "deferred_imported"}
+    result["deferred_imported"] = sorted({name for sample in samples for name in sample["deferred_imported"]})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start budgets for the CLI and API")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target (median is used)")
+    parser.add_argument("--targets", nargs="+", choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument("--cli-budget-ms", type=float, default=DEFAULT_BUDGETS_MS["cli"])
+    parser.add_argument("--api-budget-ms", type=float, default=DEFAULT_BUDGETS_MS["api"])
+    args = parser.parse_args()
+    budgets = {"cli": args.cli_budget_ms / 1000.0, "api": args.api_budget_ms / 1000.0}
+
+    print(f"Cold start, median of {args.runs} runs:")
+    over_budget: List[str] = []
+    for target in args.targets:
+        result = measure(target, args.runs)
+        phases = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in result.items()
+                           if name not in ("wall", "deferred_imported"))
+        within = result["wall"] <= budgets[target]
+        print(f"   • {target}: {result['wall'] * 1000:.0f} ms (budget {budgets[target] * 1000:.0f} ms) "
+              f"[{phases}] {'ok' if within else 'OVER BUDGET'}")
+        if result["deferred_imported"]:
+            print(f"     imported with {target}, though deferred: {', '.join(result['deferred_imported'])}")
+        if not within:
+            over_budget.append(target)
+
+    for target in over_budget:
+        print_import_report(profile_imports(IMPORT_STATEMENTS[target]))
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
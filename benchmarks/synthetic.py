@@ -0,0 +1,69 @@
+"""
+Synthetic conversation generator for the benchmarks.
+
+Utterances mix lexicon keywords, recursion and contradiction phrasing with filler so that every
+rule-based branch is exercised. Lengths:
+    short         a handful of words, like most chat turns
+    long          a few hundred words
+    pathological  thousands of words built from a few repeated phrases (worst case for the
+                  keyword scans and the shingle index)
+"""
+
+import os
+import random
+import sys
+from typing import List
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.lexicon import EMOTION_LEXICON, RECURSION_PHRASES
+
+LENGTHS = ("short", "long", "pathological")
+
+_FILLER = (
+    "today work home friend family really maybe think feel time week meeting lunch sleep "
+    "plan call message weekend morning evening project deadline walk coffee news"
+).split()
+
+_TEMPLATES = (
+    "I'm feeling {emotion} about {topic}",
+    "I love {topic} but I also hate it",
+    "I'm fine, everything is fine, but nothing feels right",
+    "I keep thinking about {topic} over and over",
+    "Actually, I'm not sure... maybe I'm not feeling that {emotion}",
+    "Just a normal day with {topic}",
+)
+
+
+class SyntheticConversation:
+    """Deterministic stream of user inputs for a given seed"""
+
+    def __init__(self, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.keywords = [keyword for keywords in EMOTION_LEXICON.values() for keyword in keywords]
+
+    def _sentence(self) -> str:
+        template = self.rng.choice(_TEMPLATES)
+        return template.format(emotion=self.rng.choice(self.keywords), topic=self.rng.choice(_FILLER))
+
+    def utterance(self, length: str = "short") -> str:
+        if length == "short":
+            return self._sentence()
+        if length == "long":
+            words = []
+            while len(words) < self.rng.randint(150, 300):
+                words.extend(self._sentence().split())
+                words.extend(self.rng.choices(_FILLER, k=self.rng.randint(3, 12)))
+            return " ".join(words)
+        if length == "pathological":
+            phrases = [self._sentence() for _ in range(3)] + list(RECURSION_PHRASES[:2])
+            return " ".join(self.rng.choice(phrases) for _ in range(800))
+        raise ValueError(f"Unknown length: {length}")
+
+    def utterances(self, count: int, length: str = "short") -> List[str]:
+        return [self.utterance(length) for _ in range(count)]
+
+    def mixed(self, count: int) -> List[str]:
+        """Mostly short turns with the occasional long one, like a real session"""
+        return [self.utterance("long" if self.rng.random() < 0.05 else "short") for _ in range(count)]
@@ -1,7 +1,12 @@
 import random
 import time
 from typing import Dict, List, Optional
-from utils.config import Config
+from core.metrics import ALERTS, CACHE_HITS, FALLBACKS, timed_stage
+from core.monitoring_scheduler import MonitoringScheduler
+from core.prompt_builder import PromptHistory, get_prompt_builder
+from core.turn_features import get_turn_features
+from core.usage import AGENT_CALL_TYPES, get_usage_ledger
+from utils.config import Config, ConfigSnapshot, get_config_service
 
 class BaseAgent:
     def __init__(self, name: str, tone: str):
@@ -9,6 +14,20 @@ class BaseAgent:
         self.tone = tone
         self.config = Config()
         self.response_count = 0
+        self.llm_service = None
+        self._llm_available = False
+
+    @property
+    def llm_available(self) -> bool:
+        """Whether the LLM can be used. Unless set explicitly, follows the shared service,
+        whose connection test is waited on here, at first use, rather than at construction"""
+        if self._llm_available is None:
+            return self.llm_service is not None and self.llm_service.is_available()
+        return self._llm_available
+
+    @llm_available.setter
+    def llm_available(self, value: Optional[bool]):
+        self._llm_available = value
 
     def send_message(self, message: str) -> Dict:
         """Send a message with metadata"""
@@ -30,15 +49,20 @@ class AgentA(BaseAgent):
     Primary role: Respond helpfully using AI-powered responses based on emotional context
     """
     
-    def __init__(self, name: str, tone: str):
+    def __init__(self, name: str, tone: str, llm_service=None):
         super().__init__(name, tone)
         self.role = "compatibility_tone_mapper"
         
-        # Initialize LLM service
+        # Initialize LLM service, reusing a shared one when given
+        if llm_service is not None:
+            self.llm_service = llm_service
+            self.llm_available = None
+            return
         try:
             from core.llm_service import LLMService
             self.llm_service = LLMService()
-            self.llm_available = self.llm_service.test_connection()
+            self.llm_service.start_probe()
+            self.llm_available = None
         except Exception as e:
             print(f"Warning: LLM service unavailable, using fallback responses: {e}")
             self.llm_service = None
@@ -59,6 +83,7 @@ class AgentA(BaseAgent):
         else:
             return self.tone
 
+    @timed_stage("agent_a")
     def respond(self, user_input: str, emotional_analysis: Dict, memory_context: Dict = None) -> str:
         """Generate AI-powered response based on user input and emotional context"""
         self.response_count += 1
@@ -76,6 +101,8 @@ class AgentA(BaseAgent):
                 print(f"OpenAI service error, using fallback: {e}")
                 # Fall through to fallback response
         
+        FALLBACKS.inc("agent_a_template")
+        
         # Fallback to template-based responses
         return self._generate_fallback_response(emotional_analysis, memory_context)
 
@@ -155,6 +182,7 @@ class AgentA(BaseAgent):
             "tone": self.tone,
             "response_count": self.response_count,
             "llm_available": getattr(self, 'llm_available', False),
+            "llm_usage": get_usage_ledger().summary(AGENT_CALL_TYPES["agent_a"]),
             "capabilities": ["ai_powered_responses", "tone_mapping", "emotional_support", "coherence_restoration"]
         }
 
@@ -165,25 +193,49 @@ class AgentB(BaseAgent):
     Primary role: Monitor conversation and provide AI-powered interventions when needed
     """
     
-    def __init__(self, name: str, tone: str):
+    def __init__(self, name: str, tone: str, llm_service=None):
         super().__init__(name, tone)
         self.role = "drift_monitor"
         self.alerts_generated = 0
         self.monitoring_active = True
         self.intervention_threshold = 1  # Reduced to 1 for quicker interventions
         self.concern_count = 0
-        
-        # Initialize LLM service
+        self.recursion_active = False
+        self.prompt_history = PromptHistory()
+        
+        # Only run the LLM monitor on an interval or when cheap signals change
+        drift = self.config.snapshot.emotional_drift
+        self.scheduler = MonitoringScheduler(
+            check_interval=drift.check_interval,
+            recursion_threshold=drift.recursion_threshold,
+            stress_jump_threshold=drift.stress_jump_threshold
+        )
+        # Thresholds follow edits to settings.yaml without a restart
+        get_config_service(self.config.config_file).subscribe(self.apply_settings)
+        
+        # Initialize LLM service, reusing a shared one when given
+        if llm_service is not None:
+            self.llm_service = llm_service
+            self.llm_available = None
+            return
         try:
             from core.llm_service import LLMService
             self.llm_service = LLMService()
-            self.llm_available = self.llm_service.test_connection()
+            self.llm_service.start_probe()
+            self.llm_available = None
         except Exception as e:
             print(f"Warning: LLM service unavailable for Agent B, using fallback: {e}")
             self.llm_service = None
             self.llm_available = False
 
-    def monitor_emotional_drift(self, conversation_history: List[Dict], emotional_analysis: Dict) -> Dict:
+    def apply_settings(self, snapshot: ConfigSnapshot):
+        """Take the monitoring interval and trigger thresholds from a reloaded config snapshot"""
+        drift = snapshot.emotional_drift
+        self.scheduler.set_parameters(drift.check_interval, drift.recursion_threshold, drift.stress_jump_threshold)
+
+    @timed_stage("agent_b_monitor")
+    def monitor_emotional_drift(self, conversation_history: List[Dict], emotional_analysis: Dict,
+                                stress_level: float = None) -> Dict:
         """Monitor conversation using AI analysis and output specific predefined notifications"""
         
         monitoring_result = {
@@ -191,7 +243,8 @@ class AgentB(BaseAgent):
             "alerts_generated": [],
             "intervention_needed": False,
             "concern_level": "low",
-            "recommendations": []
+            "recommendations": [],
+            "verdict_source": "rules"
         }
         
         if not self.monitoring_active or len(conversation_history) < 1:
@@ -199,30 +252,62 @@ class AgentB(BaseAgent):
         
         alerts = []
         
+        # Recursion is detected locally from the shared repetition scores; no LLM call needed
+        repetition = get_turn_features(conversation_history[-1]).repetition
+        recursion_alert = self._local_recursion_alert(conversation_history, repetition)
+        if repetition is not None:
+            monitoring_result["repetition"] = repetition
+        if recursion_alert:
+            alerts.append(recursion_alert)
+        
         # Use AI-powered analysis if available, otherwise fall back to basic detection
         if self.llm_service and self.llm_available:
-            ai_detected_issues = self._ai_powered_monitoring(conversation_history)
-            
-            # Map AI findings to specific predefined notifications
-            if "recursion" in ai_detected_issues:
-                turn_num = len(conversation_history)
-                alerts.append(f"Recursion Detected at Turn {turn_num}")
-            
-            if "contradiction" in ai_detected_issues:
-                alerts.append("Emotional Contradiction Detected")
+            trigger = self.scheduler.observe(
+                emotional_analysis.get("emotional_state", "neutral"),
+                emotional_analysis.get("coherence_status", "stable"),
+                # Only entries without repetition scores still need the LLM to judge recursion
+                self._count_recursion_phrases(conversation_history) if repetition is None else 0,
+                stress_level
+            )
             
-            if "coherence_loss" in ai_detected_issues:
-                alerts.append("Coherence Lost – Recommend Pause")
+            if trigger:
+                ai_detected_issues = self._ai_powered_monitoring(conversation_history)
+                self.scheduler.record_verdict(ai_detected_issues, len(conversation_history))
+                monitoring_result["verdict_source"] = "llm"
+                monitoring_result["trigger"] = trigger
+                
+                # Map AI findings to specific predefined notifications
+                if "recursion" in ai_detected_issues and not recursion_alert:
+                    turn_num = len(conversation_history)
+                    alerts.append(f"Recursion Detected at Turn {turn_num}")
+                
+                if "contradiction" in ai_detected_issues:
+                    alerts.append("Emotional Contradiction Detected")
+                
+                if "coherence_loss" in ai_detected_issues:
+                    alerts.append("Coherence Lost – Recommend Pause")
+            else:
+                # Reuse the last verdict; alerts were already raised when it was fresh
+                CACHE_HITS.inc("agent_b_verdict")
+                cached_issues = self.scheduler.cached_verdict()
+                monitoring_result["verdict_source"] = "cached"
+                monitoring_result["active_issues"] = cached_issues
+                if cached_issues:
+                    monitoring_result["concern_level"] = "medium"
                 
         else:
             # Basic fallback detection (simplified)
-            alerts = self._basic_fallback_detection(conversation_history)
+            fallback_alerts = self._basic_fallback_detection(conversation_history)
+            if recursion_alert:
+                fallback_alerts = [alert for alert in fallback_alerts if not alert.startswith("Recursion Detected")]
+            alerts.extend(fallback_alerts)
         
         monitoring_result["alerts_generated"] = alerts
         
         # Increment the alert counter for each alert generated
         if alerts:
             self.alerts_generated += len(alerts)
+            ALERTS.inc("agent_b", amount=len(alerts))
             monitoring_result["intervention_needed"] = True
             monitoring_result["concern_level"] = "medium"
         
@@ -250,6 +335,8 @@ class AgentB(BaseAgent):
             "current_concern_count": self.concern_count,
             "intervention_threshold": self.intervention_threshold,
             "llm_available": getattr(self, 'llm_available', False),
+            "scheduler": self.scheduler.get_stats(),
+            "llm_usage": get_usage_ledger().summary(AGENT_CALL_TYPES["agent_b"]),
             "capabilities": ["ai_powered_interventions", "drift_detection", "recursion_monitoring", "intervention_generation"]
         }
 
@@ -261,49 +348,38 @@ class AgentB(BaseAgent):
             self.monitoring_active = not self.monitoring_active
         return self.monitoring_active
     
+    def _local_recursion_alert(self, conversation_history: List[Dict], repetition: Optional[Dict]) -> Optional[str]:
+        """Alert once when phrases start recurring across turns; stays quiet while the episode lasts"""
+        detected = bool(repetition and repetition.get("recursion_detected"))
+        newly_detected = detected and not self.recursion_active
+        self.recursion_active = detected
+        if newly_detected:
+            return f"Recursion Detected at Turn {len(conversation_history)}"
+        return None
+
+    def _count_recursion_phrases(self, conversation_history: List[Dict]) -> int:
+        """Count explicit recursion phrases in the latest user input"""
+        if not conversation_history:
+            return 0
+        return get_turn_features(conversation_history[-1]).recursion_phrase_hits
+    
     def _ai_powered_monitoring(self, conversation_history: List[Dict]) -> List[str]:
         """Use OpenAI to intelligently analyze conversation for concerning patterns"""
         
-        # Build conversation context for AI analysis
-        conversation_turns = []
-        for i, entry in enumerate(conversation_history[-5:], 1):  # Last 5 turns max
-            user_input = entry.get('interaction', entry.get('input', '')).strip()
-            if user_input:
-                conversation_turns.append(f"Turn {i}: {user_input}")
+        # Build conversation context for AI analysis, newest turns within the token budget
+        self.prompt_history.add_user_entries(conversation_history)
+        conversation_text = get_prompt_builder().render_history(
+            self.prompt_history, "agent_b_monitoring", user_only=True, numbered=True, empty_text=""
+        )
         
-        if not conversation_turns:
+        if not conversation_text:
             return []
-        
-        conversation_text = "\n".join(conversation_turns)
-        
-        analysis_prompt = f"""Analyze this conversation for these specific patterns:
-
-{conversation_text}
-
-Look for:
-1. **RECURSION**: User repeating same worries, thoughts, or concerns across multiple turns OR explicitly mentioning repetitive thinking (e.g., "I keep thinking", "can't stop", "over and over")
-
-2. **EMOTIONAL CONTRADICTION**: Clear contradictory emotional statements within same message OR rapid emotional swings between consecutive messages (e.g., "feeling great" then "actually not feeling great")
-
-3. **COHERENCE LOSS**: User expressing confusion about their own mental state, mentioning "losing coherence", "going insane", scattered thoughts, or responses that seem genuinely incoherent
-
-Be intelligent about context - normal conversation flow is NOT concerning. Only flag genuine issues.
-
-Respond with ONLY the issues found, one per line:
-- If recursion detected: "recursion"
-- If contradiction detected: "contradiction" 
-- If coherence loss detected: "coherence_loss"
-
-If no issues, respond with: "none"
-"""
 
         try:
-            response = self.llm_service.client.chat.completions.create(
-                model=self.llm_service.model,
-                messages=[
-                    {"role": "system", "content": "You are a clinical monitoring assistant. Analyze conversations for genuine psychological concerns. Be conservative - only flag real issues, not normal emotional fluctuations."},
-                    {"role": "user", "content": analysis_prompt}
-                ],
+            # Fixed instructions live in the LLM service's cacheable prefix
+            response = self.llm_service.create_chat_completion(
+                "agent_b_monitoring",
+                messages=self.llm_service.build_messages("agent_b_monitoring", f"Conversation:\n{conversation_text}"),
                 temperature=0.1,  # Very low temperature for consistent analysis
                 max_tokens=50
             )
@@ -326,6 +402,7 @@ If no issues, respond with: "none"
                 
         except Exception as e:
             print(f"AI monitoring failed, using fallback: {e}")
+            FALLBACKS.inc("agent_b_monitoring")
             return []
 
     def _basic_fallback_detection(self, conversation_history: List[Dict]) -> List[str]:
@@ -335,31 +412,24 @@ If no issues, respond with: "none"
         if not conversation_history:
             return alerts
         
-        current_entry = conversation_history[-1]
-        current_input = current_entry.get('interaction', current_entry.get('input', '')).lower()
+        current = get_turn_features(conversation_history[-1])
         
         # Very basic keyword detection as last resort
         
         # Recursion - only explicit mentions
-        recursion_phrases = ["keep thinking", "can't stop", "over and over", "again and again"]
-        if any(phrase in current_input for phrase in recursion_phrases):
+        if current.recursion_phrase_hits:
             turn_num = len(conversation_history)
             alerts.append(f"Recursion Detected at Turn {turn_num}")
         
         # Contradiction - only obvious cases
         if len(conversation_history) >= 2:
-            prev_entry = conversation_history[-2]
-            prev_input = prev_entry.get('interaction', prev_entry.get('input', '')).lower()
-            
-            prev_positive = any(word in prev_input for word in ["great", "good", "fine"])
-            current_negative = "not" in current_input and any(word in current_input for word in ["great", "good", "fine"])
+            previous = get_turn_features(conversation_history[-2])
             
-            if prev_positive and current_negative:
+            if previous.has_positive_word and current.negated_positive:
                 alerts.append("Emotional Contradiction Detected")
         
         # Coherence loss - explicit mentions
-        coherence_phrases = ["going insane", "losing my mind", "coherence is lost", "losing coherence"]
-        if any(phrase in current_input for phrase in coherence_phrases):
+        if current.coherence_loss_phrase:
             alerts.append("Coherence Lost – Recommend Pause")
         
         return alerts
\ No newline at end of file
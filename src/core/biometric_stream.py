@@ -0,0 +1,199 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from core.metrics import REGISTRY
+
+# Binary payload element types accepted by the ingestion endpoint (little-endian)
+SAMPLE_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float64": np.dtype("<f8"),
+    "uint16": np.dtype("<u2"),
+}
+
+BIOMETRIC_SAMPLES = REGISTRY.counter(
+    "agentic_biometric_samples_total", "Streamed biometric samples by outcome", ("outcome",))
+
+
+def to_rr_intervals(samples: np.ndarray, kind: str) -> np.ndarray:
+    """RR intervals in ms from RR (ms) or instantaneous heart rate (bpm) samples"""
+    samples = samples.astype(np.float64, copy=False)
+    if kind == "hr":
+        with np.errstate(divide="ignore"):
+            return 60000.0 / samples
+    if kind == "rr":
+        return samples
+    raise ValueError(f"Unknown sample kind: {kind}")
+
+
+class RRStream:
+    """
+    Ring buffer of one session's most recent RR intervals with windowed HRV features.
+    The buffer holds exactly one window, and the running sums behind mean RR, SDNN and
+    RMSSD are updated with each appended batch and each sample it overwrites, so a batch
+    of k samples costs O(k) regardless of the window size.
+    """
+
+    def __init__(self, window: int = 256, min_samples: int = 16, rr_range=(250.0, 2500.0)):
+        self.window = max(2, int(window))
+        self.min_samples = max(2, int(min_samples))
+        self.rr_low, self.rr_high = float(rr_range[0]), float(rr_range[1])
+
+        self.samples = np.zeros(self.window)
+        # Squared difference from each sample to the one before it
+        self.squared_diffs = np.zeros(self.window)
+        self.count = 0
+        self.position = 0
+        self.total_samples = 0
+        self.rejected_samples = 0
+
+        self._sum = 0.0
+        self._sum_squares = 0.0
+        self._sum_squared_diffs = 0.0
+        self._since_exact = 0
+        self._lock = threading.Lock()
+
+    def append(self, rr: np.ndarray) -> int:
+        """Add a batch of RR intervals (ms), dropping non-finite and out-of-range artifacts"""
+        valid = rr[np.isfinite(rr) & (rr >= self.rr_low) & (rr <= self.rr_high)]
+        rejected = len(rr) - len(valid)
+        with self._lock:
+            self.rejected_samples += rejected
+            if len(valid):
+                self._append(valid)
+        if rejected:
+            BIOMETRIC_SAMPLES.inc("rejected", amount=rejected)
+        BIOMETRIC_SAMPLES.inc("accepted", amount=len(valid))
+        return len(valid)
+
+    def _append(self, valid: np.ndarray):
+        self.total_samples += len(valid)
+        previous = self.samples[(self.position - 1) % self.window] if self.count else valid[0]
+        if len(valid) >= self.window:
+            # The batch replaces the whole window
+            if len(valid) > self.window:
+                previous = valid[-self.window - 1]
+            valid = valid[-self.window:]
+        diffs = np.diff(valid, prepend=previous)
+        squared = diffs * diffs
+        if not self.count:
+            # Nothing before the first sample of a session
+            squared[0] = 0.0
+
+        # Slots not yet filled hold zeros, so subtracting everything written over is exact
+        indices = (self.position + np.arange(len(valid))) % self.window
+        old_samples = self.samples[indices]
+        self._sum -= old_samples.sum()
+        self._sum_squares -= np.dot(old_samples, old_samples)
+        self._sum_squared_diffs -= self.squared_diffs[indices].sum()
+
+        self.samples[indices] = valid
+        self.squared_diffs[indices] = squared
+        self._sum += valid.sum()
+        self._sum_squares += np.dot(valid, valid)
+        self._sum_squared_diffs += squared.sum()
+
+        self.count = min(self.window, self.count + len(valid))
+        self.position = (self.position + len(valid)) % self.window
+
+        # Re-derive the sums now and then so rounding error cannot accumulate
+        self._since_exact += len(valid)
+        if self._since_exact >= 16 * self.window:
+            self._recompute()
+
+    def _recompute(self):
+        current = self.samples[:self.count]
+        self._sum = current.sum()
+        self._sum_squares = np.dot(current, current)
+        self._sum_squared_diffs = self.squared_diffs[:self.count].sum()
+        self._since_exact = 0
+
+    def features(self) -> Optional[Dict]:
+        """Mean RR/HR, SDNN and RMSSD over the current window, or None until min_samples arrive"""
+        with self._lock:
+            count = self.count
+            if count < self.min_samples:
+                return None
+            # The oldest sample's difference points outside the window
+            oldest = (self.position - count) % self.window
+            squared_diffs = self._sum_squared_diffs - self.squared_diffs[oldest]
+            mean_rr = self._sum / count
+            variance = (self._sum_squares - self._sum * mean_rr) / (count - 1)
+            total_samples = self.total_samples
+        return {
+            "mean_rr": round(float(mean_rr), 1),
+            "heart_rate": round(60000.0 / float(mean_rr), 1),
+            "sdnn": round(math.sqrt(max(float(variance), 0.0)), 2),
+            "rmssd": round(math.sqrt(max(float(squared_diffs), 0.0) / (count - 1)), 2),
+            "window_samples": count,
+            "total_samples": total_samples
+        }
+
+
+class BiometricStreamStore:
+    """Per-session RR streams, evicting the least recently fed session past max_sessions"""
+
+    def __init__(self, window: int = 256, min_samples: int = 16, rr_range=(250.0, 2500.0),
+                 max_sessions: int = 1000):
+        self.window = window
+        self.min_samples = min_samples
+        self.rr_range = rr_range
+        self.max_sessions = max_sessions
+        self._streams = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stream(self, session_id: str) -> RRStream:
+        """Stream for the session, created on first use"""
+        with self._lock:
+            stream = self._streams.get(session_id)
+            if stream is None:
+                stream = self._streams[session_id] = RRStream(self.window, self.min_samples, self.rr_range)
+                while len(self._streams) > self.max_sessions:
+                    self._streams.popitem(last=False)
+            else:
+                self._streams.move_to_end(session_id)
+            return stream
+
+    def get(self, session_id: str) -> Optional[RRStream]:
+        return self._streams.get(session_id)
+
+    def ingest(self, session_id: str, samples: np.ndarray, kind: str = "rr") -> Dict:
+        """Append a batch of samples to the session's stream and return its latest window"""
+        stream = self.stream(session_id)
+        accepted = stream.append(to_rr_intervals(samples, kind))
+        return {
+            "accepted": accepted,
+            "rejected": len(samples) - accepted,
+            "features": stream.features()
+        }
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_biometric_streams() -> BiometricStreamStore:
+    """Process-wide stream store configured from the `biometric_stream` settings section"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    from utils.config import Config
+                    stream_config = Config().get('biometric_stream', {}) or {}
+                except Exception as e:
+                    print(f"Biometric stream settings unavailable, using defaults: {e}")
+                    stream_config = {}
+                _store = BiometricStreamStore(
+                    window=stream_config.get('window_samples', 256),
+                    min_samples=stream_config.get('min_samples', 16),
+                    rr_range=stream_config.get('rr_range_ms', (250.0, 2500.0)),
+                    max_sessions=stream_config.get('max_sessions', 1000)
+                )
+    return _store
@@ -0,0 +1,201 @@
+import math
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Used for any `biometric_simulation` setting that is missing from settings.yaml
+DEFAULT_BIOMETRIC_PARAMS = {
+    "hrv_baseline": 50.0,
+    "hrv_variance": 15.0,          # Width of the per-turn HRV noise, two thirds of it downward
+    "hrv_min": 20.0,
+    "hrv_max": 80.0,
+    "intensity_hrv_drop": 15.0,    # HRV lost per unit of emotional intensity
+    "stress_hrv_drop": 10.0,       # HRV lost per unit of stress factor
+    "heart_rate_range": [60, 100],
+    "stress_heart_rate_gain": 20.0,
+    "gsr_range": [0.1, 1.0],
+    "stress_gsr_gain": 1.0,
+    "stress_smoothing": 0.3,       # Weight of the newest turn in Memory's stress level
+    "noise_block": 64,             # Turns of noise drawn at once per session
+    "seed": None,
+    "alert_thresholds": {"hrv": 25.0, "heart_rate": 100.0, "stress_level": 0.85},
+}
+
+# Uniform draws per session per turn: HRV noise, heart rate, GSR
+_CHANNELS = 3
+
+
+def load_biometric_params(section: Dict = None) -> Dict:
+    """Simulation parameters from the given or configured `biometric_simulation` settings section"""
+    if section is None:
+        try:
+            from utils.config import Config
+            section = Config().get('biometric_simulation', {}) or {}
+        except Exception as e:
+            print(f"Biometric settings unavailable, using defaults: {e}")
+            section = {}
+    params = dict(DEFAULT_BIOMETRIC_PARAMS, **section)
+    params["alert_thresholds"] = dict(DEFAULT_BIOMETRIC_PARAMS["alert_thresholds"],
+                                      **(params.get("alert_thresholds") or {}))
+    return params
+
+
+def session_seed(base_seed: Optional[int], session_key: str) -> np.random.SeedSequence:
+    """Seed for one session's stream; fixed per (base_seed, session_key) when base_seed is set"""
+    if base_seed is None:
+        return np.random.SeedSequence()
+    return np.random.SeedSequence([int(base_seed), zlib.crc32(session_key.encode("utf-8"))])
+
+
+def biometric_alert(hrv, heart_rate, stress_level, thresholds: Dict):
+    """Alert rule shared by Memory and population runs; works on scalars and arrays"""
+    return (
+        (hrv < thresholds["hrv"]) |
+        (heart_rate > thresholds["heart_rate"]) |
+        (stress_level > thresholds["stress_level"])
+    )
+
+
+class BiometricSimulator:
+    """
+    HRV, heart rate and GSR for many sessions at once.
+    State lives in arrays indexed by session slot and each `step` advances any subset of
+    slots in one vectorized update. Every slot draws from its own seeded generator, a block
+    of turns at a time, so a session's trajectory depends only on its seed and inputs and
+    not on which other sessions are simulated alongside it.
+    A live conversation's Memory holds a one-slot simulator stepped with `step_one`, so its
+    biometric state is part of the session (and moves with it through the session store).
+    """
+
+    def __init__(self, params: Dict = None):
+        self.params = params or load_biometric_params()
+        p = self.params
+        self.noise_block = max(1, int(p["noise_block"]))
+        self.hrv_low = -float(p["hrv_variance"]) * 2.0 / 3.0
+        self.hrv_width = float(p["hrv_variance"])
+        self.heart_rate_low, heart_rate_high = p["heart_rate_range"]
+        # Inclusive integer range, as random.randint drew it
+        self.heart_rate_span = heart_rate_high - self.heart_rate_low + 1
+        self.gsr_low, gsr_high = p["gsr_range"]
+        self.gsr_span = gsr_high - self.gsr_low
+
+        self.generators: List[np.random.Generator] = []
+        self.hrv = np.empty(0)
+        self.noise = np.empty((0, self.noise_block, _CHANNELS))
+        self.cursor = np.empty(0, dtype=np.int64)
+
+    def add_sessions(self, count: int = 1, seeds: Sequence = None) -> np.ndarray:
+        """Allocate session slots; seeds are SeedSequences or ints, fresh entropy when omitted"""
+        if seeds is None:
+            seeds = np.random.SeedSequence().spawn(count)
+        generators = [np.random.Generator(np.random.PCG64(seed)) for seed in seeds]
+        start = len(self.generators)
+        self.generators.extend(generators)
+
+        self.hrv = np.concatenate([self.hrv, np.full(len(generators), float(self.params["hrv_baseline"]))])
+        # Cursor at the end of the block so the first step draws one
+        self.noise = np.concatenate([self.noise, np.empty((len(generators), self.noise_block, _CHANNELS))])
+        self.cursor = np.concatenate([self.cursor, np.full(len(generators), self.noise_block, dtype=np.int64)])
+        return np.arange(start, len(self.generators))
+
+    def _draw(self, slots: np.ndarray) -> np.ndarray:
+        """Next uniform triple for each slot, refilling exhausted noise blocks"""
+        exhausted = slots[self.cursor[slots] >= self.noise_block]
+        for slot in exhausted:
+            self.noise[slot] = self.generators[slot].random((self.noise_block, _CHANNELS))
+        self.cursor[exhausted] = 0
+        draws = self.noise[slots, self.cursor[slots]]
+        self.cursor[slots] += 1
+        return draws
+
+    def _readings(self, hrv: np.ndarray, uniforms: np.ndarray, intensity, stress) -> Dict[str, np.ndarray]:
+        """Advance HRV and derive heart rate and GSR from one turn of uniforms"""
+        p = self.params
+        hrv_change = (self.hrv_low + uniforms[..., 0] * self.hrv_width
+                      - intensity * p["intensity_hrv_drop"] - stress * p["stress_hrv_drop"])
+        hrv = np.clip(hrv + hrv_change, p["hrv_min"], p["hrv_max"])
+        heart_rate = (self.heart_rate_low + np.floor(uniforms[..., 1] * self.heart_rate_span)
+                      + np.floor(stress * p["stress_heart_rate_gain"]))
+        gsr = self.gsr_low + uniforms[..., 2] * self.gsr_span + stress * p["stress_gsr_gain"]
+        return {"hrv": hrv, "heart_rate": heart_rate, "gsr": gsr}
+
+    def step(self, slots, intensity, stress=0.0) -> Dict[str, np.ndarray]:
+        """Advance the given slots one turn; intensity and stress are scalars or per-slot arrays"""
+        slots = np.asarray(slots, dtype=np.int64)
+        readings = self._readings(self.hrv[slots], self._draw(slots),
+                                  np.asarray(intensity, dtype=float), np.asarray(stress, dtype=float))
+        self.hrv[slots] = readings["hrv"]
+        return readings
+
+    def step_all(self, intensity, stress=0.0) -> Dict[str, np.ndarray]:
+        return self.step(np.arange(len(self.generators)), intensity, stress)
+
+    def step_one(self, slot: int, intensity: float, stress: float = 0.0) -> Dict[str, float]:
+        """Scalar path for a single session's turn; consumes the same stream as `step`"""
+        p = self.params
+        if self.cursor[slot] >= self.noise_block:
+            self.noise[slot] = self.generators[slot].random((self.noise_block, _CHANNELS))
+            self.cursor[slot] = 0
+        hrv_noise, heart_rate_draw, gsr_draw = self.noise[slot, self.cursor[slot]].tolist()
+        self.cursor[slot] += 1
+
+        hrv_change = (self.hrv_low + hrv_noise * self.hrv_width
+                      - intensity * p["intensity_hrv_drop"] - stress * p["stress_hrv_drop"])
+        hrv = float(min(p["hrv_max"], max(p["hrv_min"], self.hrv[slot] + hrv_change)))
+        self.hrv[slot] = hrv
+        return {
+            "hrv": hrv,
+            "heart_rate": int(self.heart_rate_low + math.floor(heart_rate_draw * self.heart_rate_span)
+                              + math.floor(stress * p["stress_heart_rate_gain"])),
+            "gsr": self.gsr_low + gsr_draw * self.gsr_span + stress * p["stress_gsr_gain"]
+        }
+
+    def __len__(self) -> int:
+        return len(self.generators)
+
+
+def monte_carlo(intensity, stress=0.0, sessions: int = 1000, seed: Optional[int] = None,
+                params: Dict = None, stress_level=None, session_keys: Sequence[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Simulate whole trajectories for a population of sessions.
+    intensity and stress are per-turn (turns,) or per-session (sessions, turns) arrays.
+    With session_keys, there is one session per key, seeded by session_seed(seed, key): with the
+    same seed as `biometric_simulation.seed`, each row is exactly what the live session of that id
+    would read for the same inputs. Without keys, the sessions draw independent streams spawned
+    from seed.
+    Returns (sessions, turns) arrays of hrv, heart_rate and gsr, plus the alert mask and
+    per-session alert rate when stress_level (the Memory stress level per turn) is given.
+    """
+    params = params or load_biometric_params()
+    simulator = BiometricSimulator(params)
+    if session_keys is not None:
+        sessions = len(session_keys)
+    intensity = np.broadcast_to(np.asarray(intensity, dtype=float), (sessions, np.shape(intensity)[-1]))
+    turns = intensity.shape[1]
+    stress = np.broadcast_to(np.asarray(stress, dtype=float), (sessions, turns))
+
+    # Each session's whole stream in one call; a stepped simulator reads the same values a block at a time
+    if session_keys is not None:
+        seeds = [session_seed(seed, key) for key in session_keys]
+    else:
+        seeds = np.random.SeedSequence(seed).spawn(sessions)
+    uniforms = np.stack([
+        np.random.Generator(np.random.PCG64(s)).random((turns, _CHANNELS)) for s in seeds
+    ])
+
+    # HRV is clamped every turn, so only the turn loop is sequential
+    hrv = np.empty((sessions, turns))
+    level = np.full(sessions, float(params["hrv_baseline"]))
+    for turn in range(turns):
+        level = simulator._readings(level, uniforms[:, turn], intensity[:, turn], stress[:, turn])["hrv"]
+        hrv[:, turn] = level
+    readings = simulator._readings(0.0, uniforms, intensity, stress)
+    result = {"hrv": hrv, "heart_rate": readings["heart_rate"], "gsr": readings["gsr"]}
+
+    if stress_level is not None:
+        stress_level = np.broadcast_to(np.asarray(stress_level, dtype=float), (sessions, turns))
+        alerts = biometric_alert(hrv, result["heart_rate"], stress_level, params["alert_thresholds"])
+        result["alerts"] = alerts
+        result["alert_rate"] = alerts.mean(axis=1)
+    return result
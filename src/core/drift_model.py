@@ -0,0 +1,148 @@
+import math
+from typing import Dict, List, Optional
+
+from core.lexicon import EMOTION_LEXICON
+
+EMOTION_STATES = tuple(EMOTION_LEXICON)
+
+# Typical share of each state across sessions, used until a session has its own baseline
+DEFAULT_POPULATION_PRIOR = {
+    "happy": 0.2, "sad": 0.1, "angry": 0.05, "anxious": 0.15, "confused": 0.1, "neutral": 0.4
+}
+
+POSITIVE_STATES = frozenset(["happy"])
+NEGATIVE_STATES = frozenset(["angry", "anxious", "sad"])
+
+
+def _decay_rate(half_life: float) -> float:
+    """Per-turn EWMA weight giving the requested half-life in turns"""
+    return 1.0 - 0.5 ** (1.0 / max(half_life, 0.5))
+
+
+def js_distance(p: List[float], q: List[float]) -> float:
+    """Jensen-Shannon distance: square root of the divergence in bits (0 = identical, 1 = disjoint)"""
+    total = 0.0
+    for pi, qi in zip(p, q):
+        mi = (pi + qi) / 2.0
+        if pi > 0:
+            total += pi * math.log2(pi / mi)
+        if qi > 0:
+            total += qi * math.log2(qi / mi)
+    return math.sqrt(max(total / 2.0, 0.0))
+
+
+class MarkovDriftModel:
+    """
+    Streaming emotional drift detector for one session.
+    Keeps a transition-count matrix plus a fast (recent) and a slow (baseline)
+    exponentially decayed state distribution, all updated in O(1) per turn.
+    Drift is the Jensen-Shannon distance of the recent distribution from the session baseline,
+    shrunk toward a population prior while the session is young, or a high
+    decayed rate of positive/negative swings.
+    """
+
+    def __init__(self, threshold: float = 0.5, recent_half_life: float = 3.0, baseline_half_life: float = 30.0,
+                 prior_strength: float = 5.0, min_turns: int = 3, population_prior: Dict = None):
+        self.states = EMOTION_STATES
+        self.index = {state: i for i, state in enumerate(self.states)}
+        size = len(self.states)
+
+        self.set_parameters(threshold, recent_half_life, baseline_half_life, prior_strength, min_turns)
+
+        prior = dict(DEFAULT_POPULATION_PRIOR, **(population_prior or {}))
+        prior_total = sum(prior.get(state, 0.0) for state in self.states) or 1.0
+        self.prior = [prior.get(state, 0.0) / prior_total for state in self.states]
+
+        self.transition_counts = [[0] * size for _ in range(size)]
+        self.recent = list(self.prior)
+        self.baseline = list(self.prior)
+        self.swing_rate = 0.0
+        self.turns = 0
+        self.last_state = None
+
+    def set_parameters(self, threshold: float, recent_half_life: float, baseline_half_life: float,
+                       prior_strength: float, min_turns: int):
+        """Change thresholds and decay rates; the state observed so far is kept"""
+        self.threshold = threshold
+        self.recent_rate = _decay_rate(recent_half_life)
+        self.baseline_rate = _decay_rate(baseline_half_life)
+        self.prior_strength = prior_strength
+        self.min_turns = min_turns
+
+    def observe(self, state: str) -> Dict:
+        """Fold in this turn's emotional state and score drift against the state before it"""
+        current = self.index.get(state, self.index["neutral"])
+        previous = self.last_state
+        if previous is not None:
+            self.transition_counts[previous][current] += 1
+
+        # Fast distribution first, so this turn counts toward "recent"; it starts at the prior
+        self.recent = [(1.0 - self.recent_rate) * value for value in self.recent]
+        self.recent[current] += self.recent_rate
+
+        swing = previous is not None and (
+            (self.states[previous] in POSITIVE_STATES and state in NEGATIVE_STATES) or
+            (self.states[previous] in NEGATIVE_STATES and state in POSITIVE_STATES)
+        )
+        self.swing_rate = (1.0 - self.recent_rate) * self.swing_rate + self.recent_rate * swing
+
+        reference = self._reference_distribution()
+        baseline_divergence = js_distance(self.recent, reference)
+        prior_divergence = js_distance(self.recent, self.prior)
+
+        # The baseline absorbs the turn only after it has been scored against it
+        # (a running mean until it has seen about one half-life window of turns)
+        rate = max(self.baseline_rate, 1.0 / (self.turns + 1))
+        self.baseline = [(1.0 - rate) * value for value in self.baseline]
+        self.baseline[current] += rate
+        self.turns += 1
+        self.last_state = current
+
+        drift_score = max(baseline_divergence, self.swing_rate)
+        result = {
+            "drift_detected": self.turns >= self.min_turns and drift_score >= self.threshold,
+            "drift_score": round(drift_score, 3),
+            "baseline_divergence": round(baseline_divergence, 3),
+            "prior_divergence": round(prior_divergence, 3),
+            "swing_rate": round(self.swing_rate, 3)
+        }
+        if result["drift_detected"]:
+            result["drift_type"] = "severe_volatility" if self.swing_rate >= baseline_divergence else "distribution_shift"
+        return result
+
+    def _reference_distribution(self) -> List[float]:
+        """Session baseline shrunk toward the population prior by the evidence it rests on"""
+        evidence = min(self.turns, 1.0 / self.baseline_rate)
+        if not evidence:
+            return self.prior
+        weight = evidence / (evidence + self.prior_strength)
+        return [weight * b + (1.0 - weight) * p for b, p in zip(self.baseline, self.prior)]
+
+    def transition_probabilities(self, smoothing: float = 1.0) -> List[List[float]]:
+        """Row-normalized transitions, Laplace-smoothed toward the population prior"""
+        rows = []
+        for counts in self.transition_counts:
+            total = sum(counts) + smoothing
+            rows.append([(count + smoothing * prior) / total for count, prior in zip(counts, self.prior)])
+        return rows
+
+    def most_likely_next(self) -> Optional[str]:
+        if self.last_state is None:
+            return None
+        row = self.transition_probabilities()[self.last_state]
+        return self.states[max(range(len(row)), key=row.__getitem__)]
+
+    def get_state(self) -> Dict:
+        """Matrix and distributions for analytics"""
+        return {
+            "states": list(self.states),
+            "turns": self.turns,
+            "transition_counts": [list(row) for row in self.transition_counts],
+            "transition_probabilities": [[round(value, 4) for value in row] for row in self.transition_probabilities()],
+            "recent_distribution": [round(value, 4) for value in self.recent],
+            "baseline_distribution": [round(value, 4) for value in self.baseline],
+            "population_prior": [round(value, 4) for value in self.prior],
+            "swing_rate": round(self.swing_rate, 4),
+            "most_likely_next": self.most_likely_next(),
+            "threshold": self.threshold
+        }
@@ -0,0 +1,168 @@
+import json
+import math
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.lexicon import EMOTION_LEXICON
+from core.turn_features import TurnFeatures
+
+
+class EmotionClassifier:
+    """
+    Lightweight multinomial naive Bayes emotion classifier.
+    Uses unigram, bigram and lexicon-hit features so it can run on every turn
+    in well under a millisecond, leaving the LLM for uncertain inputs.
+    """
+
+    def __init__(self, model: Dict):
+        self.labels = model["labels"]
+        self.log_priors = model["log_priors"]
+        self.log_likelihoods = model["log_likelihoods"]
+        self.log_unknown = model["log_unknown"]
+        self.metadata = model.get("metadata", {})
+        # Artifact the model was loaded from, so stored sessions can refer to it instead of copying it
+        self.model_path = None
+
+    @staticmethod
+    def featurize(text: str, turn_features: TurnFeatures = None) -> List[str]:
+        """Turn raw text into unigram, bigram and lexicon features"""
+        if turn_features is None:
+            turn_features = TurnFeatures(text)
+        tokens = turn_features.tokens
+
+        features = list(tokens)
+        features.extend(f"{tokens[i]} {tokens[i + 1]}" for i in range(len(tokens) - 1))
+
+        for state, hits in turn_features.lexicon_hits.items():
+            features.extend([f"lex:{state}"] * hits)
+
+        # Negated positives ("not great", "not fine") are a strong signal on their own
+        for i in range(len(tokens) - 1):
+            if tokens[i] in ("not", "never", "isn't", "don't") and tokens[i + 1] in EMOTION_LEXICON["happy"] + EMOTION_LEXICON["neutral"]:
+                features.append("neg:positive")
+
+        return features
+
+    @classmethod
+    def train(cls, samples: Iterable[Tuple[str, str]], alpha: float = 1.0) -> "EmotionClassifier":
+        """Train a classifier from (text, label) pairs"""
+        label_counts = {}
+        feature_counts = {}
+        vocabulary = set()
+
+        for text, label in samples:
+            label_counts[label] = label_counts.get(label, 0) + 1
+            counts = feature_counts.setdefault(label, {})
+            for feature in cls.featurize(text):
+                counts[feature] = counts.get(feature, 0) + 1
+                vocabulary.add(feature)
+
+        if not label_counts:
+            raise ValueError("Cannot train emotion classifier on an empty corpus")
+
+        labels = sorted(label_counts)
+        total_samples = sum(label_counts.values())
+        vocab_size = len(vocabulary)
+
+        log_priors = {label: math.log(label_counts[label] / total_samples) for label in labels}
+        log_likelihoods = {}
+        log_unknown = {}
+        for label in labels:
+            counts = feature_counts.get(label, {})
+            denominator = sum(counts.values()) + alpha * (vocab_size + 1)
+            log_likelihoods[label] = {
+                feature: round(math.log((count + alpha) / denominator), 5)
+                for feature, count in counts.items()
+            }
+            log_unknown[label] = math.log(alpha / denominator)
+
+        return cls({
+            "labels": labels,
+            "log_priors": log_priors,
+            "log_likelihoods": log_likelihoods,
+            "log_unknown": log_unknown,
+            "metadata": {"samples": total_samples, "vocabulary_size": vocab_size, "alpha": alpha}
+        })
+
+    @classmethod
+    def load(cls, model_path: str) -> "EmotionClassifier":
+        """Load a trained model artifact from disk"""
+        with open(model_path, 'r') as file:
+            classifier = cls(json.load(file))
+        classifier.model_path = model_path
+        return classifier
+
+    def save(self, model_path: str):
+        """Write the model artifact to disk"""
+        directory = os.path.dirname(model_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(model_path, 'w') as file:
+            json.dump({
+                "labels": self.labels,
+                "log_priors": self.log_priors,
+                "log_likelihoods": self.log_likelihoods,
+                "log_unknown": self.log_unknown,
+                "metadata": self.metadata
+            }, file, separators=(",", ":"))
+
+    def predict_proba(self, text: str, turn_features: TurnFeatures = None) -> Dict[str, float]:
+        """Return the posterior probability for every label"""
+        features = self.featurize(text, turn_features)
+
+        scores = {}
+        for label in self.labels:
+            likelihoods = self.log_likelihoods[label]
+            unknown = self.log_unknown[label]
+            scores[label] = self.log_priors[label] + sum(likelihoods.get(f, unknown) for f in features)
+
+        # Softmax in log space for numerical stability
+        best = max(scores.values())
+        exp_scores = {label: math.exp(score - best) for label, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+    def predict(self, text: str, turn_features: TurnFeatures = None) -> Tuple[str, float]:
+        """Return the most likely label and its confidence"""
+        probabilities = self.predict_proba(text, turn_features)
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label]
+
+
+# model path -> (file mtime, classifier or None); a loaded model is read-only, so one copy serves every session
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_emotion_classifier(model_path: str) -> Optional[EmotionClassifier]:
+    """The classifier at model_path, loaded once per process and shared by every session that
+    uses it; loaded again when the file changes (e.g. after retraining)"""
+    try:
+        mtime = os.path.getmtime(model_path) if model_path else None
+    except OSError:
+        mtime = None
+    if mtime is None:
+        return None
+    with _shared_lock:
+        cached = _shared.get(model_path)
+        if cached is None or cached[0] != mtime:
+            cached = _shared[model_path] = (mtime, load_emotion_classifier(model_path))
+        return cached[1]
+
+
+def shared_emotion_classifiers() -> List[EmotionClassifier]:
+    """Classifiers handed out by get_emotion_classifier, which no single session owns"""
+    with _shared_lock:
+        return [classifier for _, classifier in _shared.values() if classifier is not None]
+
+
+def load_emotion_classifier(model_path: str) -> Optional[EmotionClassifier]:
+    """Load the classifier artifact, returning None if it is missing or unreadable"""
+    if not model_path or not os.path.exists(model_path):
+        return None
+    try:
+        return EmotionClassifier.load(model_path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not load emotion classifier from {model_path}: {e}")
+        return None
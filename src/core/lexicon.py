@@ -0,0 +1,61 @@
+"""Shared keyword lexicons used by the rule-based analyzers"""
+
+EMOTION_LEXICON = {
+    "happy": ["joy", "excited", "content", "great", "amazing", "wonderful", "fantastic"],
+    "sad": ["down", "disappointed", "melancholic", "depressed", "awful", "terrible", "horrible"],
+    "angry": ["frustrated", "irritated", "enraged", "furious", "mad", "annoyed", "pissed"],
+    "anxious": ["worried", "nervous", "stressed", "overwhelmed", "panic", "afraid", "scared"],
+    "confused": ["lost", "unclear", "don't understand", "confused", "mixed up", "uncertain"],
+    "neutral": ["calm", "indifferent", "unmoved", "okay", "fine", "normal"]
+}
+
+# Phrases that should always be looked at by the LLM, whatever the local model says
+RISK_PHRASES = [
+    "keep thinking", "over and over", "again and again", "can't stop",
+    "stuck in my head", "going in circles", "going insane", "losing my mind",
+    "losing coherence", "coherence is lost", "hopeless", "can't go on",
+    "give up", "hurt myself", "nothing makes sense"
+]
+
+# Explicit recursion language used by the rule-based reasoning
+STRONG_RECURSION_INDICATORS = [
+    "keep thinking about this over and over",
+    "can't stop thinking about",
+    "stuck in my head",
+    "going in circles",
+    "same thoughts repeating"
+]
+
+# Looser recursion phrases Agent B counts on every turn
+RECURSION_PHRASES = ["keep thinking", "can't stop", "over and over", "again and again"]
+
+COHERENCE_LOSS_PHRASES = ["going insane", "losing my mind", "coherence is lost", "losing coherence"]
+
+POSITIVE_STATE_WORDS = ["great", "good", "fine"]
+
+# Only flag severe contradictions within the same sentence
+SEVERE_CONTRADICTION_PATTERNS = [
+    (r"i'm (happy|great|good) but .*(terrible|awful|horrible)", "severe_emotional_contradiction"),
+    (r"everything is (fine|good|okay) but .*(falling apart|terrible|awful)", "severe_state_contradiction"),
+    (r"i (love|hate) .* but .* (hate|love)", "severe_emotional_flip")
+]
+
+# Emotional intensity used to drive the biometric simulation
+BASE_INTENSITY = {
+    "happy": 0.3,
+    "sad": 0.7,
+    "angry": 0.8,
+    "anxious": 0.9,
+    "confused": 0.6,
+    "neutral": 0.1
+}
+
+# Per-turn stress contribution of each emotional state
+STRESS_FACTORS = {
+    "angry": 0.6,      # Reduced from 0.8
+    "anxious": 0.7,    # Reduced from 0.9
+    "sad": 0.4,        # Reduced from 0.6
+    "confused": 0.3,   # Reduced from 0.5
+    "happy": -0.3,     # Increased recovery
+    "neutral": -0.2    # Increased recovery
+}
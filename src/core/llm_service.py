@@ -1,8 +1,28 @@
-import openai
+import contextlib
+import contextvars
+import hashlib
 import os
+import threading
 import time
 from typing import Dict, List, Optional
-from utils.config import Config
+from core.metrics import FALLBACKS, LLM_ERRORS, LLM_LATENCY
+from core.prompt_builder import PromptHistory, count_tokens, get_prompt_builder
+from core.tracing import span
+from core.usage import get_usage_ledger
+from utils.config import Config, ConfigSnapshot, get_config_service
+
+# Set for turns run in degraded mode
+_degraded = contextvars.ContextVar("agentic_llm_degraded", default=False)
+
+@contextlib.contextmanager
+def degraded_scope(degraded: bool = True):
+    """Inside the block every service reports the LLM as unavailable, so analysis, monitoring and
+    responses take their rule-based and template paths. Other threads are unaffected."""
+    token = _degraded.set(degraded)
+    try:
+        yield degraded
+    finally:
+        _degraded.reset(token)
 
 class LLMService:
     """
@@ -12,19 +32,20 @@ class LLMService:
     
     def __init__(self):
         self.config = Config()
-        self.openai_config = self.config.get('openai', {})
         
-        # Set up OpenAI client (new v1.0+ format)
-        api_key = self.openai_config.get('api_key')
+        # OpenAI client (new v1.0+ format), created on first request: importing openai takes
+        # longer than the rest of startup
+        self._client_kwargs = None
+        self._client = None
+        self._available = None
+        self._probe = None
+        self._probe_lock = threading.Lock()
+        self.apply_settings(self.config.snapshot)
+        # Model settings follow edits to settings.yaml without a restart
+        get_config_service(self.config.config_file).subscribe(self.apply_settings)
         
-        if api_key:
-            self.client = openai.OpenAI(api_key=api_key)
-        else:
-            self.client = openai.OpenAI()  # Will use OPENAI_API_KEY env var
-            
-        self.model = self.openai_config.get('model', 'gpt-3.5-turbo')
-        self.temperature = self.openai_config.get('temperature', 0.7)
-        self.max_tokens = self.openai_config.get('max_tokens', 150)
+        self.usage = get_usage_ledger()
+        self.prompt_builder = get_prompt_builder()
         
         # Agent system prompts
         self.agent_a_system_prompt = """You are Agent A (Axis), a compatibility and tone mapping specialist in an agentic AI system for emotional wellness. Your role is to:
@@ -60,13 +81,29 @@ Guidelines:
 
 You will receive conversation analysis data. Only respond if intervention is warranted."""
 
-        self.emotional_analysis_prompt = """Analyze the following user input for emotional content and patterns:
+        # Fixed instructions for each call type. They are sent together with the system
+        # prompt as an identical first message on every call, so providers can serve that
+        # prefix from their prompt cache; everything that changes per turn goes after it.
+        self.agent_a_instructions = """Each turn you receive the conversation context, the emotional analysis, the recent conversation history and, last, the user's latest input.
+
+As Agent A, provide a helpful, empathetic response that:
+1. Acknowledges the conversation history and avoids repetition
+2. Addresses the user's current emotional state
+3. Provides appropriate support and engagement
+4. Builds naturally on previous exchanges
+
+Be natural, conversational, and vary your responses based on the context."""
 
-Input: "{user_input}"
-Conversation history: {conversation_history}
+        self.agent_b_intervention_instructions = """Each turn you receive the detected alerts and issues, the emotional analysis and, last, the user's latest input.
+
+As Agent B (the monitoring agent), provide a brief, gentle intervention to help the user regain emotional stability. Focus on grounding techniques or suggesting a pause. Keep it under 2 sentences."""
+
+        self.emotional_analysis_prompt = """You are an expert emotional analysis AI. Provide precise, clinical analysis in the exact JSON format requested.
+
+Analyze the user's latest input for emotional content and patterns, using the conversation history for context.
 
 Provide analysis in this exact JSON format:
-{{
+{
     "primary_emotion": "one of: happy, sad, angry, anxious, confused, neutral",
     "emotional_intensity": "scale 0.0-1.0",
     "contradiction_detected": "boolean",
@@ -74,46 +111,158 @@ Provide analysis in this exact JSON format:
     "coherence_assessment": "stable, drift_detected, recursion_risk, or coherence_lost",
     "key_concerns": "list of main emotional concerns",
     "intervention_needed": "boolean"
-}}
+}
 
 Be precise and clinical in your analysis."""
 
+        self.conversation_summary_prompt = """You are an expert conversation analyst. Provide clinical analysis in the exact JSON format requested.
+
+Analyze the conversation you are given and provide a summary in this JSON format:
+{
+    "summary": "brief overview of conversation themes",
+    "key_themes": ["list", "of", "main", "topics"],
+    "emotional_arc": ["progression", "of", "emotions"],
+    "concerning_patterns": ["any", "worrying", "patterns"],
+    "overall_coherence": "stable, declining, or fragmented"
+}"""
+
+        self.agent_b_monitoring_prompt = """You are a clinical monitoring assistant. Analyze conversations for genuine psychological concerns. Be conservative - only flag real issues, not normal emotional fluctuations.
+
+Analyze the conversation you are given for these specific patterns:
+
+1. **RECURSION**: User repeating same worries, thoughts, or concerns across multiple turns OR explicitly mentioning repetitive thinking (e.g., "I keep thinking", "can't stop", "over and over")
+
+2. **EMOTIONAL CONTRADICTION**: Clear contradictory emotional statements within same message OR rapid emotional swings between consecutive messages (e.g., "feeling great" then "actually not feeling great")
+
+3. **COHERENCE LOSS**: User expressing confusion about their own mental state, mentioning "losing coherence", "going insane", scattered thoughts, or responses that seem genuinely incoherent
+
+Be intelligent about context - normal conversation flow is NOT concerning. Only flag genuine issues.
+
+Respond with ONLY the issues found, one per line:
+- If recursion detected: "recursion"
+- If contradiction detected: "contradiction" 
+- If coherence loss detected: "coherence_loss"
+
+If no issues, respond with: "none"
+"""
+
+        self.prompt_prefixes = {
+            "agent_a": f"{self.agent_a_system_prompt}\n\n{self.agent_a_instructions}",
+            "agent_b_intervention": f"{self.agent_b_system_prompt}\n\n{self.agent_b_intervention_instructions}",
+            "emotional_analysis": self.emotional_analysis_prompt,
+            "conversation_summary": self.conversation_summary_prompt,
+            "agent_b_monitoring": self.agent_b_monitoring_prompt
+        }
+
+    def apply_settings(self, snapshot: ConfigSnapshot):
+        """Take the model, sampling and endpoint settings from a config snapshot"""
+        openai_settings = snapshot.openai
+        self.openai_config = snapshot.section('openai')
+        client_kwargs = {}
+        if openai_settings.api_key:
+            client_kwargs['api_key'] = openai_settings.api_key  # Otherwise uses the OPENAI_API_KEY env var
+        # Any OpenAI-compatible endpoint, e.g. the offline stand-in in src/tools/llm_stub.py
+        if openai_settings.base_url:
+            client_kwargs['base_url'] = openai_settings.base_url
+        # Bounded so a hung endpoint cannot hold an admission slot for the client's 10-minute default
+        client_kwargs['timeout'] = openai_settings.timeout_seconds
+        client_kwargs['max_retries'] = openai_settings.max_retries
+        if client_kwargs != self._client_kwargs:
+            # A new key or endpoint needs a new client and a new connection test
+            with self._probe_lock:
+                self._client_kwargs = client_kwargs
+                self._client = None
+                self._available = None
+                self._probe = None
+        self.model = openai_settings.model
+        self.temperature = openai_settings.temperature
+        self.max_tokens = openai_settings.max_tokens
+
+    @property
+    def client(self):
+        if self._client is None:
+            import openai
+            self._client = openai.OpenAI(**self._client_kwargs)
+        return self._client
+
+    def build_messages(self, call_type: str, dynamic_content: str) -> List[Dict]:
+        """Byte-stable system prefix for the call type followed by the per-turn content"""
+        return [
+            {"role": "system", "content": self.prompt_prefixes[call_type]},
+            {"role": "user", "content": dynamic_content}
+        ]
+
+    def get_prompt_prefix_status(self) -> Dict:
+        """Hash and size of each call type's stable prefix"""
+        return {
+            call_type: {
+                "hash": hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16],
+                "tokens": count_tokens(prefix)
+            }
+            for call_type, prefix in self.prompt_prefixes.items()
+        }
+
+    def create_chat_completion(self, call_type: str, messages: List[Dict], **kwargs):
+        """Send a chat completion request, recording latency, errors and token usage per call type"""
+        start = time.perf_counter()
+        try:
+            with span(f"llm.{call_type}", "llm", model=self.model) as llm_span:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    **kwargs
+                )
+                usage = getattr(response, 'usage', None)
+                llm_span.set("prompt_tokens", getattr(usage, 'prompt_tokens', 0))
+                llm_span.set("completion_tokens", getattr(usage, 'completion_tokens', 0))
+                llm_span.set("cached_tokens", getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', 0))
+        except Exception:
+            latency = time.perf_counter() - start
+            LLM_ERRORS.inc(call_type)
+            LLM_LATENCY.observe(latency, call_type)
+            self.usage.record(call_type, self.model, None, latency, error=True)
+            raise
+        
+        latency = time.perf_counter() - start
+        LLM_LATENCY.observe(latency, call_type)
+        failed = not getattr(response, 'choices', None)
+        if failed:
+            LLM_ERRORS.inc(call_type)
+        self.usage.record(call_type, self.model, usage, latency, error=failed)
+        return response
+
     def get_agent_a_response(self, user_input: str, emotional_analysis: Dict, conversation_context: Dict) -> str:
         """Get AI-powered response from Agent A"""
         
         # Build comprehensive context for the prompt
         context_summary = self._build_context_summary(conversation_context, emotional_analysis)
-        history_text = self._format_full_conversation_history(conversation_context)
+        history = conversation_context.get('prompt_history') or \
+            self._as_prompt_history(conversation_context.get('recent_interactions', []))
+        history_text = self.prompt_builder.render_history(
+            history, "agent_a", empty_text="No recent conversation history"
+        )
+        retrieved_text = self.prompt_builder.render_retrieved(
+            conversation_context.get('relevant_history', []), "agent_a_retrieval", exclude_text=history_text
+        )
+        retrieved_section = f"Relevant earlier conversation:\n{retrieved_text}\n\n" if retrieved_text else ""
         
-        user_prompt = f"""
-User input: "{user_input}"
-
-Recent conversation history:
-{history_text}
+        user_prompt = f"""Context: {context_summary}
 
 Emotional analysis:
 - Primary emotion: {emotional_analysis.get('emotional_state', 'neutral')}
 - Coherence status: {emotional_analysis.get('coherence_status', 'stable')}
 - Alerts: {', '.join(emotional_analysis.get('alerts', []))}
 
-Context: {context_summary}
-
-As Agent A, provide a helpful, empathetic response that:
-1. Acknowledges the conversation history and avoids repetition
-2. Addresses the user's current emotional state
-3. Provides appropriate support and engagement
-4. Builds naturally on previous exchanges
+{retrieved_section}Recent conversation history:
+{history_text}
 
-Be natural, conversational, and vary your responses based on the context.
+User input: "{self.prompt_builder.clip_input(user_input)}"
 """
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.agent_a_system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            response = self.create_chat_completion(
+                "agent_a",
+                messages=self.build_messages("agent_a", user_prompt),
                 temperature=self.temperature,
                 max_tokens=self.max_tokens
             )
@@ -131,6 +280,7 @@ Be natural, conversational, and vary your responses based on the context.
         except Exception as e:
             # Fallback to template response if OpenAI fails
             print(f"OpenAI service error, using fallback: {e}")
+            FALLBACKS.inc("llm_agent_a")
             return self._fallback_agent_a_response(emotional_analysis)
 
     def get_agent_b_intervention(self, user_input: str, emotional_analysis: Dict, monitoring_result: Dict) -> Optional[str]:
@@ -142,9 +292,7 @@ Be natural, conversational, and vary your responses based on the context.
         alerts = emotional_analysis.get('alerts', [])
         concerns = monitoring_result.get('recommendations', [])
         
-        user_prompt = f"""
-Analysis of concerning patterns:
-- User input: "{user_input}"
+        user_prompt = f"""Analysis of concerning patterns:
 - Alerts triggered: {', '.join(alerts)}
 - Concern level: {monitoring_result.get('concern_level', 'low')}
 - Detected issues: {', '.join(concerns)}
@@ -155,16 +303,13 @@ Emotional analysis:
 - Recursion detected: {emotional_analysis.get('recursion_detected', False)}
 - Drift detected: {emotional_analysis.get('drift_detected', False)}
 
-As Agent B (the monitoring agent), provide a brief, gentle intervention to help the user regain emotional stability. Focus on grounding techniques or suggesting a pause. Keep it under 2 sentences.
+User input: "{self.prompt_builder.clip_input(user_input)}"
 """
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.agent_b_system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+            response = self.create_chat_completion(
+                "agent_b_intervention",
+                messages=self.build_messages("agent_b_intervention", user_prompt),
                 temperature=0.5,  # Lower temperature for more consistent interventions
                 max_tokens=100
             )
@@ -178,26 +323,27 @@ As Agent B (the monitoring agent), provide a brief, gentle intervention to help
         except Exception as e:
             # Fallback intervention
             print(f"OpenAI Agent B service error, using fallback: {e}")
+            FALLBACKS.inc("llm_agent_b_intervention")
             return self._fallback_agent_b_intervention(emotional_analysis)
 
-    def enhance_emotional_analysis(self, user_input: str, conversation_history: List[Dict]) -> Dict:
+    def enhance_emotional_analysis(self, user_input: str, conversation_history) -> Dict:
         """Use LLM to enhance emotional analysis beyond keyword matching"""
         
-        # Format conversation history for context
-        history_text = self._format_conversation_history(conversation_history[-3:])  # Last 3 turns
-        
-        analysis_prompt = self.emotional_analysis_prompt.format(
-            user_input=user_input,
-            conversation_history=history_text
+        # Newest user turns that fit the analysis history budget
+        history_text = self.prompt_builder.render_history(
+            self._as_prompt_history(conversation_history), "emotional_analysis", user_only=True
         )
         
+        analysis_prompt = f"""Conversation history:
+{history_text}
+
+Input: "{self.prompt_builder.clip_input(user_input)}"
+"""
+        
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert emotional analysis AI. Provide precise, clinical analysis in the exact JSON format requested."},
-                    {"role": "user", "content": analysis_prompt}
-                ],
+            response = self.create_chat_completion(
+                "emotional_analysis",
+                messages=self.build_messages("emotional_analysis", analysis_prompt),
                 temperature=0.3,  # Low temperature for consistent analysis
                 max_tokens=200
             )
@@ -211,6 +357,7 @@ As Agent B (the monitoring agent), provide a brief, gentle intervention to help
                     return analysis
                 except json.JSONDecodeError:
                     # Fallback to basic analysis if JSON parsing fails
+                    FALLBACKS.inc("llm_emotional_analysis")
                     return self._fallback_emotional_analysis(user_input)
             else:
                 raise Exception("No choices in OpenAI response")
@@ -218,38 +365,23 @@ As Agent B (the monitoring agent), provide a brief, gentle intervention to help
         except Exception as e:
             # Fallback to rule-based analysis
             print(f"OpenAI emotional analysis error, using fallback: {e}")
+            FALLBACKS.inc("llm_emotional_analysis")
             return self._fallback_emotional_analysis(user_input)
 
-    def generate_conversation_summary(self, conversation_history: List[Dict]) -> Dict:
+    def generate_conversation_summary(self, conversation_history) -> Dict:
         """Generate AI-powered conversation summary"""
         
         if not conversation_history:
             return {"summary": "No conversation history", "key_themes": [], "emotional_arc": []}
             
-        history_text = self._format_conversation_history(conversation_history)
+        history_text = self.prompt_builder.render_history(
+            self._as_prompt_history(conversation_history), "conversation_summary", user_only=True
+        )
         
-        summary_prompt = f"""
-Analyze this conversation and provide a summary:
-
-{history_text}
-
-Provide analysis in this JSON format:
-{{
-    "summary": "brief overview of conversation themes",
-    "key_themes": ["list", "of", "main", "topics"],
-    "emotional_arc": ["progression", "of", "emotions"],
-    "concerning_patterns": ["any", "worrying", "patterns"],
-    "overall_coherence": "stable, declining, or fragmented"
-}}
-"""
-
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert conversation analyst. Provide clinical analysis in the exact JSON format requested."},
-                    {"role": "user", "content": summary_prompt}
-                ],
+            response = self.create_chat_completion(
+                "conversation_summary",
+                messages=self.build_messages("conversation_summary", f"Conversation:\n{history_text}"),
                 temperature=0.3,
                 max_tokens=300
             )
@@ -265,6 +397,7 @@ Provide analysis in this JSON format:
                 raise Exception("No choices in OpenAI response")
                 
         except Exception as e:
+            FALLBACKS.inc("llm_conversation_summary")
             return {"summary": "Analysis unavailable", "key_themes": [], "emotional_arc": []}
 
     def _build_context_summary(self, conversation_context: Dict, emotional_analysis: Dict) -> str:
@@ -287,48 +420,12 @@ Provide analysis in this JSON format:
             
         return "; ".join(context_parts) if context_parts else "Normal conversation state"
 
-    def _format_conversation_history(self, history: List[Dict]) -> str:
-        """Format conversation history for LLM prompts"""
-        
-        formatted = []
-        # Safe slicing - get last 5 entries
-        recent_history = history[-5:] if len(history) >= 5 else history
-        
-        for entry in recent_history:
-            if isinstance(entry, dict):
-                if 'interaction' in entry:
-                    formatted.append(f"User: {entry['interaction']}")
-                elif 'input' in entry:
-                    formatted.append(f"User: {entry['input']}")
-                    
-        return "\n".join(formatted) if formatted else "No recent history"
-
-    def _format_full_conversation_history(self, conversation_context: Dict) -> str:
-        """Format full conversation history including agent responses"""
-        
-        formatted = []
-        recent_interactions = conversation_context.get('recent_interactions', [])
-        recent_responses = conversation_context.get('recent_responses', [])
-        
-        # Interleave user inputs and agent responses chronologically
-        max_turns = min(len(recent_interactions), 3)  # Last 3 conversation turns
-        
-        for i in range(max_turns):
-            # Safe indexing for interactions
-            interaction_index = -(max_turns-i)
-            if abs(interaction_index) <= len(recent_interactions):
-                interaction = recent_interactions[interaction_index]
-                user_input = interaction.get('input', interaction.get('interaction', ''))
-                formatted.append(f"User: {user_input}")
-                
-            # Safe indexing for responses
-            if abs(interaction_index) <= len(recent_responses):
-                agent_resp = recent_responses[interaction_index]
-                agent_name = agent_resp.get('agent_name', 'Agent')
-                response_text = agent_resp.get('response', '')
-                formatted.append(f"{agent_name}: {response_text}")
-        
-        return "\n".join(formatted) if formatted else "No recent conversation history"
+    @staticmethod
+    def _as_prompt_history(conversation_history) -> PromptHistory:
+        """Accept a session's PromptHistory or a plain list of interaction dicts"""
+        if isinstance(conversation_history, PromptHistory):
+            return conversation_history
+        return PromptHistory.from_entries(conversation_history or [])
 
     def _fallback_agent_a_response(self, emotional_analysis: Dict) -> str:
         """Fallback response if OpenAI is unavailable"""
@@ -386,11 +483,40 @@ Provide analysis in this JSON format:
             "intervention_needed": False
         }
 
+    def start_probe(self):
+        """Run the connection test on a background thread so startup does not wait for it"""
+        with self._probe_lock:
+            if self._available is None and self._probe is None:
+                self._probe = threading.Thread(target=self._run_probe, name="llm-probe", daemon=True)
+                self._probe.start()
+
+    def _run_probe(self):
+        available = self.test_connection()
+        if self._available is None:
+            self._available = available
+
+    def is_available(self, wait: bool = True) -> Optional[bool]:
+        """Result of the connection test, run once per service so components sharing it probe once.
+        With wait=False, None while the test is still running. Always False inside degraded_scope()."""
+        if _degraded.get():
+            return False
+        if self._available is None:
+            if not wait:
+                return None
+            self.start_probe()
+            if self._probe is not None:
+                self._probe.join()
+        return bool(self._available)
+
+    def disable(self):
+        """Treat the API as unavailable without probing it, e.g. for offline soak runs"""
+        self._available = False
+
     def test_connection(self) -> bool:
         """Test OpenAI API connection"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self.create_chat_completion(
+                "connection_test",
                 messages=[{"role": "user", "content": "Test connection"}],
                 max_tokens=10
             )
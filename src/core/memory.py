@@ -1,35 +1,90 @@
 import time
-import random
 from typing import Dict, List, Optional
 
+from core.biometrics import BiometricSimulator, biometric_alert, load_biometric_params, session_seed
+from core.metrics import ALERTS, timed_stage
+from core.prompt_builder import PromptHistory
+from core.retrieval import TfidfIndex
+from core.turn_features import TurnFeatures, stress_delta
+from utils.config import Config, ConfigSnapshot, get_config_service
+
 class Memory:
-    def __init__(self):
+    # Whether the last stored interaction was in biometric alert; class default for stored sessions
+    # saved before it was tracked
+    biometric_alert_active = False
+
+    def __init__(self, session_id: str = "", settings: Dict = None):
+        # Parsed settings.yaml sections; read from the config file, and followed on reload, when not given
+        configured = settings is None
+        settings = Config().settings if configured else settings
+        
         self.past_interactions = []
         self.emotional_states = {}
         self.agent_responses = []
         self.biometric_data = []
         self.coherence_events = []
         
-        # Biometric simulation parameters
-        self.hrv_baseline = 50
+        # Pre-rendered user and agent turns for LLM prompts
+        self.prompt_history = PromptHistory()
+        
+        # Long-term recall of earlier turns that fell out of the recent window
+        retrieval_config = settings.get('memory_retrieval', {}) or {}
+        self.retrieval_index = TfidfIndex()
+        self.retrieval_top_k = retrieval_config.get('top_k', 3) if retrieval_config.get('enabled', True) else 0
+        
+        # Biometric simulation, seeded per session when `biometric_simulation.seed` is set
+        self.biometric_params = load_biometric_params(settings.get('biometric_simulation', {}) or {})
+        self.biometrics = BiometricSimulator(self.biometric_params)
+        self.biometric_slot = int(self.biometrics.add_sessions(
+            1, [session_seed(self.biometric_params["seed"], session_id)]
+        )[0])
+        self.hrv_baseline = self.biometric_params["hrv_baseline"]
         self.current_hrv = self.hrv_baseline
         self.stress_level = 0.0
+        self.stress_smoothing = self.biometric_params["stress_smoothing"]
+        
+        # Streamed wearable RR intervals; once attached, its latest window replaces the simulation
+        self.biometric_stream = None
+        self.biometric_alert_active = False
+        if configured:
+            # Alert thresholds and stress smoothing follow edits to settings.yaml without a restart
+            get_config_service().subscribe(self.apply_settings)
 
-    def store_interaction(self, interaction: str, emotional_analysis: Dict = None, turn_number: int = 0):
+    def apply_settings(self, snapshot: ConfigSnapshot):
+        """Take the biometric alert thresholds and stress smoothing from a reloaded config snapshot.
+        The other simulation parameters shape the session's stream, so they only reach new sessions."""
+        params = load_biometric_params(dict(snapshot.section('biometric_simulation')))
+        self.biometric_params = dict(self.biometric_params, alert_thresholds=params["alert_thresholds"],
+                                     stress_smoothing=params["stress_smoothing"])
+        self.stress_smoothing = params["stress_smoothing"]
+
+    @timed_stage("memory_write")
+    def store_interaction(self, interaction: str, emotional_analysis: Dict = None, turn_number: int = 0,
+                          features: TurnFeatures = None):
         """Store user interaction with enhanced metadata"""
         entry = {
             "interaction": interaction,
             "timestamp": time.time(),
             "turn_number": turn_number,
             "emotional_analysis": emotional_analysis,
-            "biometric_snapshot": self.get_current_biometrics()
+            "biometric_snapshot": self.get_current_biometrics(),
+            "features": features
         }
         self.past_interactions.append(entry)
+        self.prompt_history.add("User", interaction)
+        self.retrieval_index.add(interaction, len(self.past_interactions), "User",
+                                 features.tokens if features else None)
         
         # Update stress level based on emotional state
         if emotional_analysis:
-            self._update_stress_level(emotional_analysis)
+            self._update_stress_level(emotional_analysis, features)
+            # Counted when the alert starts, not on every turn it lasts
+            alert = self.is_biometric_alert()
+            if alert and not self.biometric_alert_active:
+                ALERTS.inc("biometric")
+            self.biometric_alert_active = alert
 
+    @timed_stage("memory_write")
     def store_agent_response(self, agent_name: str, response: str, response_type: str = "normal"):
         """Store agent response with metadata"""
         entry = {
@@ -40,6 +95,8 @@ class Memory:
             "turn_number": len(self.past_interactions)
         }
         self.agent_responses.append(entry)
+        self.prompt_history.add(agent_name, response)
+        self.retrieval_index.add(response, entry["turn_number"], agent_name)
 
     def store_coherence_event(self, event_type: str, details: Dict):
         """Store coherence-related events (drift, recursion, etc.)"""
@@ -61,15 +118,14 @@ class Memory:
 
     def simulate_biometric_response(self, emotional_intensity: float, stress_factor: float = 0.0):
         """Simulate biometric response to emotional state"""
-        # Simulate HRV changes based on emotional state
-        hrv_change = random.uniform(-10, 5) - (emotional_intensity * 15) - (stress_factor * 10)
-        self.current_hrv = max(20, min(80, self.current_hrv + hrv_change))
+        readings = self.biometrics.step_one(self.biometric_slot, emotional_intensity, stress_factor)
+        self.current_hrv = readings["hrv"]
         
         # Generate simulated biometric data
         biometric_entry = {
             "hrv": round(self.current_hrv, 1),
-            "heart_rate": random.randint(60, 100) + int(stress_factor * 20),
-            "gsr": random.uniform(0.1, 1.0) + stress_factor,
+            "heart_rate": readings["heart_rate"],
+            "gsr": readings["gsr"],
             "timestamp": time.time(),
             "stress_level": self.stress_level,
             "emotional_intensity": emotional_intensity
@@ -80,6 +136,19 @@ class Memory:
 
     def get_current_biometrics(self) -> Dict:
         """Get current biometric readings"""
+        window = self.biometric_stream.features() if self.biometric_stream is not None else None
+        if window:
+            # RMSSD stands in for HRV; GSR is not streamed, so keep the simulated value
+            return {
+                "hrv": window["rmssd"],
+                "heart_rate": window["heart_rate"],
+                "sdnn": window["sdnn"],
+                "gsr": self.biometric_data[-1]["gsr"] if self.biometric_data else 0.3,
+                "stress_level": self.stress_level,
+                "window_samples": window["window_samples"],
+                "source": "stream",
+                "timestamp": time.time()
+            }
         if self.biometric_data:
             return self.biometric_data[-1]
         else:
@@ -92,30 +161,16 @@ class Memory:
                 "timestamp": time.time()
             }
 
-    def _update_stress_level(self, emotional_analysis: Dict):
+    def _update_stress_level(self, emotional_analysis: Dict, features: TurnFeatures = None):
         """Update stress level based on emotional analysis - MORE CONSERVATIVE"""
-        stress_factors = {
-            "angry": 0.6,      # Reduced from 0.8
-            "anxious": 0.7,    # Reduced from 0.9  
-            "sad": 0.4,        # Reduced from 0.6
-            "confused": 0.3,   # Reduced from 0.5
-            "happy": -0.3,     # Increased recovery
-            "neutral": -0.2    # Increased recovery
-        }
-        
-        emotional_state = emotional_analysis.get("emotional_state", "neutral")
-        base_stress = stress_factors.get(emotional_state, 0.0)
-        
-        # Much more conservative stress from coherence issues
-        if emotional_analysis.get("coherence_status") == "coherence_lost":
-            base_stress += 0.2  # Reduced from 0.3
-        if emotional_analysis.get("recursion_detected"):
-            base_stress += 0.1  # Reduced from 0.2
-        if emotional_analysis.get("drift_detected"):
-            base_stress += 0.1  # Reduced from 0.2
+        if features is not None and features.stress_delta is not None:
+            base_stress = features.stress_delta
+        else:
+            base_stress = stress_delta(emotional_analysis)
             
         # Gradually adjust stress level with faster recovery
-        self.stress_level = max(0.0, min(1.0, self.stress_level * 0.7 + base_stress * 0.3))
+        self.stress_level = max(0.0, min(1.0, self.stress_level * (1.0 - self.stress_smoothing) +
+                                         base_stress * self.stress_smoothing))
 
     def get_past_interactions(self, limit: int = None) -> List[Dict]:
         """Get past interactions with optional limit"""
@@ -127,16 +182,27 @@ class Memory:
         """Get current emotional state for an agent"""
         return self.emotional_states.get(agent_name, None)
 
-    def get_conversation_context(self, turns: int = 3) -> Dict:
-        """Get recent conversation context for agents"""
+    def get_conversation_context(self, turns: int = 3, relevant_k: int = None) -> Dict:
+        """Get recent conversation context for agents, plus the earlier turns most relevant to the latest input"""
         recent_interactions = self.get_past_interactions(turns)
         recent_responses = self.agent_responses[-turns:] if len(self.agent_responses) >= turns else self.agent_responses
         recent_events = self.coherence_events[-turns:] if len(self.coherence_events) >= turns else self.coherence_events
         
+        relevant_k = self.retrieval_top_k if relevant_k is None else relevant_k
+        relevant_history = []
+        if relevant_k and self.past_interactions:
+            # Only look before the recent window, which the agents already see
+            relevant_history = self.retrieval_index.search(
+                self.past_interactions[-1]["interaction"], relevant_k,
+                before_turn=len(self.past_interactions) - turns + 1
+            )
+        
         return {
             "recent_interactions": recent_interactions,
             "recent_responses": recent_responses,
             "recent_events": recent_events,
+            "relevant_history": relevant_history,
+            "prompt_history": self.prompt_history,
             "current_biometrics": self.get_current_biometrics(),
             "stress_level": self.stress_level
         }
@@ -153,11 +219,9 @@ class Memory:
     def is_biometric_alert(self) -> bool:
         """Check if biometric data indicates stress - MORE CONSERVATIVE"""
         current = self.get_current_biometrics()
-        return (
-            current["hrv"] < 25 or          # Reduced from 35 - only very low HRV
-            current["heart_rate"] > 100 or  # Increased from 90 
-            self.stress_level > 0.85        # Increased from 0.7 - only very high stress
-        )
+        # Defaults: HRV < 25, heart rate > 100, stress > 0.85 (see `alert_thresholds`)
+        return bool(biometric_alert(current["hrv"], current["heart_rate"], self.stress_level,
+                                    self.biometric_params["alert_thresholds"]))
 
     def get_memory_summary(self) -> Dict:
         """Get summary of all stored memory"""
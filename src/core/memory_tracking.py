@@ -0,0 +1,96 @@
+import gc
+import linecache
+import os
+import sys
+import tracemalloc
+import types
+from typing import Dict, Iterable, List, Optional
+
+# Never counted towards a session's size: code and module-level objects every session shares
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                 types.MethodType, types.CodeType, types.FrameType)
+
+# Allocations made by the tracing machinery itself
+_IGNORED_FILES = (tracemalloc.__file__, linecache.__file__, "<frozen importlib._bootstrap>",
+                  "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+def start_tracing(frames: int = 1) -> bool:
+    """Start tracemalloc with the given traceback depth; False if it was already running"""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(max(1, int(frames)))
+    return True
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    """Snapshot of live allocations after a full collection, without tracemalloc's own"""
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot()
+    return snapshot.filter_traces([tracemalloc.Filter(False, pattern) for pattern in _IGNORED_FILES])
+
+
+def _site(traceback: tracemalloc.Traceback, group_by: str) -> str:
+    frame = traceback[0]
+    filename = os.path.normpath(frame.filename)
+    # Show paths relative to the source tree rather than the machine
+    marker = f"{os.sep}src{os.sep}"
+    if marker in filename:
+        filename = filename.split(marker, 1)[1]
+    if group_by == "filename":
+        return filename
+    return f"{filename}:{frame.lineno}"
+
+
+def top_allocators(snapshot: tracemalloc.Snapshot, limit: int = 20, group_by: str = "lineno",
+                   baseline: tracemalloc.Snapshot = None) -> List[Dict]:
+    """Allocation sites holding the most memory, or growing the most since baseline"""
+    group_by = "filename" if group_by == "filename" else "lineno"
+    if baseline is not None:
+        stats = snapshot.compare_to(baseline, group_by)
+        stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+        return [{
+            "site": _site(stat.traceback, group_by),
+            "size_bytes": stat.size,
+            "count": stat.count,
+            "size_diff_bytes": stat.size_diff,
+            "count_diff": stat.count_diff
+        } for stat in stats[:limit]]
+
+    return [{
+        "site": _site(stat.traceback, group_by),
+        "size_bytes": stat.size,
+        "count": stat.count
+    } for stat in snapshot.statistics(group_by)[:limit]]
+
+
+def deep_size(root, shared: Iterable = ()) -> int:
+    """
+    Bytes reachable from root, following gc referents.
+    Objects in `shared` (e.g. a service every session uses), classes, modules and functions
+    are not counted or followed, so the result approximates what freeing root would release.
+    """
+    seen = {id(obj) for obj in shared}
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj, 0)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+def tracing_summary(limit: int = 20, group_by: str = "lineno") -> Optional[Dict]:
+    """Current and peak traced memory with the top allocation sites, or None when not tracing"""
+    if not tracemalloc.is_tracing():
+        return None
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "traceback_frames": tracemalloc.get_traceback_limit(),
+        "top_allocators": top_allocators(take_snapshot(), limit, group_by)
+    }
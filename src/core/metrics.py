@@ -0,0 +1,277 @@
+import functools
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from core.tracing import span
+
+# Latency buckets in seconds, from sub-millisecond rule-based stages to slow LLM calls
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], labels: Tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set"""
+    parts = []
+    for name, value in zip(labelnames, labels):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in items]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {",".join(labels) or "total": value for labels, value in self._values.items()}
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with optional labels"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels) -> "_HistogramTimer":
+        """Context manager that observes the elapsed wall time"""
+        return _HistogramTimer(self, labels)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+    def snapshot(self) -> Dict:
+        """Count and mean latency per label set"""
+        with self._lock:
+            return {
+                ",".join(labels) or "total": {"count": s[2], "mean_seconds": round(s[1] / s[2], 6) if s[2] else 0.0}
+                for labels, s in self._series.items()
+            }
+
+
+class _HistogramTimer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def register(self, metric):
+        """Add a custom collector exposing name, documentation, metric_type, collect() and snapshot()"""
+        return self._register(metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """Compact dict view used by the CLI"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def process_rss_bytes() -> int:
+    """Current resident set size, or the peak RSS where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class ProcessMemoryCollector:
+    """Gauge read from the OS at scrape time"""
+
+    name = "agentic_process_resident_memory_bytes"
+    documentation = "Resident memory size of the serving process"
+    metric_type = "gauge"
+
+    def collect(self) -> List[str]:
+        return [f"{self.name} {process_rss_bytes()}"]
+
+    def snapshot(self) -> Dict:
+        return {"total": process_rss_bytes()}
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.register(ProcessMemoryCollector())
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "agentic_stage_latency_seconds", "Latency of each turn pipeline stage", ("stage",))
+LLM_LATENCY = REGISTRY.histogram(
+    "agentic_llm_request_latency_seconds", "Latency of LLM requests by call type", ("call_type",))
+LLM_ERRORS = REGISTRY.counter(
+    "agentic_llm_errors_total", "LLM requests that raised or returned no choices", ("call_type",))
+FALLBACKS = REGISTRY.counter(
+    "agentic_fallbacks_total", "Times a component fell back to rule-based behaviour", ("component",))
+CACHE_HITS = REGISTRY.counter(
+    "agentic_cache_hits_total", "Cached results reused instead of recomputed", ("cache",))
+ALERTS = REGISTRY.counter(
+    "agentic_alerts_total", "Alerts raised by source", ("source",))
+ANALYSIS_TIER = REGISTRY.counter(
+    "agentic_analysis_tier_total", "Emotional analyses by tier (local classifier or LLM)", ("tier",))
+ACTIVE_SESSIONS = REGISTRY.gauge(
+    "agentic_active_sessions", "Conversation sessions held in memory by the API")
+EVENT_STREAMS = REGISTRY.gauge(
+    "agentic_event_streams", "Open server-sent event streams")
+EVENTS_PUBLISHED = REGISTRY.counter(
+    "agentic_events_published_total", "Events pushed to session event streams by type", ("type",))
+ACTIVE_JOBS = REGISTRY.gauge(
+    "agentic_scenario_jobs_active", "Scenario jobs queued or running")
+JOBS_FINISHED = REGISTRY.counter(
+    "agentic_scenario_jobs_total", "Scenario jobs finished by outcome", ("status",))
+JOB_TURNS = REGISTRY.counter(
+    "agentic_scenario_turns_total", "Turns run by scenario jobs")
+TURNS_IN_FLIGHT = REGISTRY.gauge(
+    "agentic_turns_in_flight", "API turns admitted and running")
+TURNS_QUEUED = REGISTRY.gauge(
+    "agentic_turns_queued", "API turns waiting for admission")
+TURNS_REJECTED = REGISTRY.counter(
+    "agentic_turns_rejected_total", "API turns turned away with 429 by reason", ("reason",))
+ADMISSION_WAIT = REGISTRY.histogram(
+    "agentic_admission_wait_seconds", "Time API turns waited for admission")
+DEGRADED_MODE = REGISTRY.gauge(
+    "agentic_degraded_mode", "1 while new turns are routed to rule-based analysis and template responses")
+DEGRADED_TURNS = REGISTRY.counter(
+    "agentic_degraded_turns_total", "Turns run without the LLM because of degraded mode")
+
+
+def timed_stage(stage: str):
+    """Decorator recording a function's latency under the given pipeline stage (and as a trace span)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with span(stage):
+                    return func(*args, **kwargs)
+            finally:
+                STAGE_LATENCY.observe(time.perf_counter() - start, stage)
+        return wrapper
+    return decorator
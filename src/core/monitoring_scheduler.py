@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional
+
+
+class MonitoringScheduler:
+    """
+    Decides when Agent B's LLM-backed monitor actually needs to run.
+    The expensive check runs every `check_interval` turns, or immediately when a
+    cheap rule-based signal changes; verdicts are cached and reused in between.
+    """
+
+    def __init__(self, check_interval: int = 10, recursion_threshold: int = 2, stress_jump_threshold: float = 0.15):
+        self.set_parameters(check_interval, recursion_threshold, stress_jump_threshold)
+
+        # Signals observed on the previous turn
+        self.last_emotional_state = None
+        self.last_coherence_status = None
+        self.last_stress_level = None
+
+        # State since the last LLM run
+        self.turns_since_run = 0
+        self.recursion_hits = 0
+        self.cached_issues = None
+        self.cached_turn = None
+
+        self.llm_runs = 0
+        self.cache_reuses = 0
+        self.trigger_counts = {}
+
+    def set_parameters(self, check_interval: int, recursion_threshold: int, stress_jump_threshold: float):
+        """Change the interval and trigger thresholds; cached verdicts are kept"""
+        self.check_interval = max(1, int(check_interval))
+        self.recursion_threshold = max(1, int(recursion_threshold))
+        self.stress_jump_threshold = stress_jump_threshold
+
+    def observe(self, emotional_state: str, coherence_status: str, recursion_hits: int = 0,
+                stress_level: Optional[float] = None) -> Optional[str]:
+        """Record this turn's cheap signals and return why the LLM monitor should run, or None"""
+        self.turns_since_run += 1
+        self.recursion_hits += recursion_hits
+
+        trigger = None
+        if self.cached_issues is None:
+            trigger = "first_turn"
+        elif self.turns_since_run >= self.check_interval:
+            trigger = "interval"
+        elif emotional_state != self.last_emotional_state or coherence_status != self.last_coherence_status:
+            trigger = "state_change"
+        elif self.recursion_hits >= self.recursion_threshold:
+            trigger = "recursion"
+        elif (stress_level is not None and self.last_stress_level is not None and
+              abs(stress_level - self.last_stress_level) >= self.stress_jump_threshold):
+            trigger = "stress_jump"
+
+        self.last_emotional_state = emotional_state
+        self.last_coherence_status = coherence_status
+        if stress_level is not None:
+            self.last_stress_level = stress_level
+
+        if trigger:
+            self.trigger_counts[trigger] = self.trigger_counts.get(trigger, 0) + 1
+        else:
+            self.cache_reuses += 1
+        return trigger
+
+    def record_verdict(self, issues: List[str], turn_number: int):
+        """Cache a fresh LLM verdict and reset the interval"""
+        self.cached_issues = list(issues)
+        self.cached_turn = turn_number
+        self.turns_since_run = 0
+        self.recursion_hits = 0
+        self.llm_runs += 1
+
+    def cached_verdict(self) -> List[str]:
+        """Issues from the most recent LLM verdict"""
+        return list(self.cached_issues or [])
+
+    def get_stats(self) -> Dict:
+        """Scheduler activity for monitoring summaries"""
+        observed = self.llm_runs + self.cache_reuses
+        return {
+            "check_interval": self.check_interval,
+            "recursion_threshold": self.recursion_threshold,
+            "llm_runs": self.llm_runs,
+            "cached_verdicts": self.cache_reuses,
+            "llm_run_rate": round(self.llm_runs / observed, 3) if observed else 0.0,
+            "triggers": dict(self.trigger_counts),
+            "last_verdict_turn": self.cached_turn
+        }
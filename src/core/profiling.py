@@ -0,0 +1,267 @@
+import collections
+import cProfile
+import hmac
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+# Classes whose methods are broken out in profile summaries
+PROFILED_COMPONENTS = (
+    ("core.reasoning", "Reasoning"),
+    ("core.memory", "Memory"),
+    ("agents.specialized_agents", "AgentA"),
+    ("agents.specialized_agents", "AgentB"),
+    ("core.llm_service", "LLMService"),
+)
+
+
+def _component_index() -> Dict:
+    """Map (filename, first line, function name) of component methods to their class name"""
+    index = {}
+    for module_name, class_name in PROFILED_COMPONENTS:
+        module = sys.modules.get(module_name)
+        cls = getattr(module, class_name, None) if module else None
+        if cls is None:
+            continue
+        for klass in cls.__mro__:
+            if klass is object:
+                continue
+            for attribute in vars(klass).values():
+                func = attribute
+                while hasattr(func, "__wrapped__"):
+                    func = func.__wrapped__
+                code = getattr(func, "__code__", None)
+                if code is not None:
+                    index.setdefault((code.co_filename, code.co_firstlineno, code.co_name), class_name)
+    return index
+
+
+def _function_label(filename: str, lineno: int, funcname: str) -> str:
+    return f"{os.path.basename(filename)}:{lineno}({funcname})"
+
+
+class _SamplingProfiler(threading.Thread):
+    """Periodically samples one thread's Python stack; far cheaper than cProfile on hot code"""
+
+    def __init__(self, target_thread_id: int, interval: float):
+        super().__init__(name="agentic-sampling-profiler", daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.sample_count = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class _ProfileScope:
+    """Profiles the enclosed block and files the result with the profiler"""
+
+    def __init__(self, profiler: "RequestProfiler", label: str, mode: str):
+        self.profiler = profiler
+        self.label = label
+        self.mode = mode
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:6]}"
+        self.summary = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        if self.mode == "sampling":
+            self._sampler = _SamplingProfiler(threading.get_ident(), self.profiler.sampling_interval)
+            self._sampler.start()
+        else:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_time = time.perf_counter() - self.started
+        if self.mode == "sampling":
+            self._sampler.stop()
+            self.summary = self.profiler.record_sampling(self, self._sampler, wall_time)
+        else:
+            self._cprofile.disable()
+            self.summary = self.profiler.record_cprofile(self, self._cprofile, wall_time)
+        return False
+
+
+class RequestProfiler:
+    """
+    Opt-in profiler for single API requests or CLI turns.
+    cProfile runs write .pstats files; sampling runs write collapsed stacks
+    (.folded, flamegraph-compatible). Recent top-N summaries are kept in memory.
+    """
+
+    def __init__(self, output_dir: str = "logs/profiles", top_n: int = 25,
+                 sampling_interval_ms: float = 5.0, max_profiles: int = 50, admin_token: str = ""):
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.sampling_interval = sampling_interval_ms / 1000.0
+        self.max_profiles = max_profiles
+        self.admin_token = admin_token
+        self.recent = collections.deque(maxlen=max_profiles)
+        self._lock = threading.Lock()
+
+    def is_authorized(self, token: Optional[str]) -> bool:
+        """Profiling is only available when a token is configured and matches (compared in
+        constant time, so response timing does not reveal how much of a guess was right)"""
+        if not self.admin_token or token is None:
+            return False
+        return hmac.compare_digest(token.encode("utf-8"), self.admin_token.encode("utf-8"))
+
+    def profile(self, label: str, mode: str = "cprofile") -> _ProfileScope:
+        """Profile the enclosed block; mode is 'cprofile' or 'sampling'"""
+        return _ProfileScope(self, label, "sampling" if mode == "sampling" else "cprofile")
+
+    def record_cprofile(self, scope: _ProfileScope, profile: cProfile.Profile, wall_time: float) -> Dict:
+        path = self._output_path(scope.profile_id, "pstats")
+        stats = pstats.Stats(profile)
+        if path:
+            stats.dump_stats(path)
+
+        components = _component_index()
+        component_time = collections.defaultdict(float)
+        entries = []
+        for (filename, lineno, funcname), (_, total_calls, own_time, cumulative_time, _) in stats.stats.items():
+            component = components.get((filename, lineno, funcname))
+            if component:
+                component_time[component] += own_time
+            entries.append({
+                "function": _function_label(filename, lineno, funcname),
+                "component": component,
+                "calls": total_calls,
+                "tottime": round(own_time, 6),
+                "cumtime": round(cumulative_time, 6)
+            })
+        entries.sort(key=lambda entry: entry["cumtime"], reverse=True)
+
+        return self._store({
+            "profile_id": scope.profile_id,
+            "label": scope.label,
+            "mode": "cprofile",
+            "file": path,
+            "wall_time": round(wall_time, 6),
+            "profiled_time": round(stats.total_tt, 6),
+            "component_self_time": {name: round(value, 6) for name, value in component_time.items()},
+            "top_functions": entries[:self.top_n]
+        })
+
+    def record_sampling(self, scope: _ProfileScope, sampler: _SamplingProfiler, wall_time: float) -> Dict:
+        path = self._output_path(scope.profile_id, "folded")
+        if path:
+            with open(path, 'w') as file:
+                for stack, count in sampler.stacks.items():
+                    frames = ";".join(_function_label(*frame) for frame in stack)
+                    file.write(f"{frames} {count}\n")
+
+        components = _component_index()
+        inclusive = collections.Counter()
+        exclusive = collections.Counter()
+        component_samples = collections.Counter()
+        for stack, count in sampler.stacks.items():
+            exclusive[stack[-1]] += count
+            for frame in set(stack):
+                inclusive[frame] += count
+            # Attribute the sample to the innermost component frame
+            for frame in reversed(stack):
+                if frame in components:
+                    component_samples[components[frame]] += count
+                    break
+
+        total = max(sampler.sample_count, 1)
+        top = [{
+            "function": _function_label(*frame),
+            "component": components.get(frame),
+            "inclusive_pct": round(100.0 * count / total, 1),
+            "self_pct": round(100.0 * exclusive.get(frame, 0) / total, 1)
+        } for frame, count in inclusive.most_common(self.top_n)]
+
+        return self._store({
+            "profile_id": scope.profile_id,
+            "label": scope.label,
+            "mode": "sampling",
+            "file": path,
+            "wall_time": round(wall_time, 6),
+            "samples": sampler.sample_count,
+            "sampling_interval_ms": self.sampling_interval * 1000.0,
+            "component_samples_pct": {name: round(100.0 * count / total, 1) for name, count in component_samples.items()},
+            "top_functions": top
+        })
+
+    def get_summaries(self, limit: int = None) -> List[Dict]:
+        """Most recent profile summaries, newest first"""
+        with self._lock:
+            summaries = list(reversed(self.recent))
+        return summaries[:limit] if limit else summaries
+
+    def get_summary(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            return next((summary for summary in self.recent if summary["profile_id"] == profile_id), None)
+
+    def _store(self, summary: Dict) -> Dict:
+        with self._lock:
+            if len(self.recent) == self.recent.maxlen:
+                self._remove_file(self.recent[0].get("file"))
+            self.recent.append(summary)
+        return summary
+
+    def _output_path(self, profile_id: str, extension: str) -> Optional[str]:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+        except OSError as e:
+            print(f"Could not create profile directory {self.output_dir}: {e}")
+            return None
+        return os.path.join(self.output_dir, f"{profile_id}.{extension}")
+
+    @staticmethod
+    def _remove_file(path: Optional[str]):
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> RequestProfiler:
+    """Process-wide profiler configured from the `profiling` settings section"""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                try:
+                    from utils.config import Config
+                    profiling_config = Config().get('profiling', {}) or {}
+                except Exception as e:
+                    print(f"Profiling settings unavailable, using defaults: {e}")
+                    profiling_config = {}
+                _profiler = RequestProfiler(
+                    output_dir=profiling_config.get('output_dir', "logs/profiles"),
+                    top_n=profiling_config.get('top_n', 25),
+                    sampling_interval_ms=profiling_config.get('sampling_interval_ms', 5.0),
+                    max_profiles=profiling_config.get('max_profiles', 50),
+                    admin_token=str(profiling_config.get('admin_token', '') or '')
+                )
+    return _profiler
@@ -0,0 +1,178 @@
+import threading
+from typing import Dict, List, Optional
+
+# Exact token counts when tiktoken is installed; otherwise ~4 characters per token
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+TRUNCATION_MARKER = " … "
+
+# History tokens per call type when the `prompts` settings section does not override them
+DEFAULT_HISTORY_BUDGETS = {
+    "agent_a": 600,
+    "agent_a_retrieval": 300,
+    "agent_b_monitoring": 500,
+    "emotional_analysis": 300,
+    "conversation_summary": 1500,
+}
+
+
+def count_tokens(text: str) -> int:
+    """Token count of text, exact with tiktoken and approximate without it"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Shorten text to about max_tokens, keeping its start and end and cutting at word boundaries"""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    # Characters per token of this text, so the cut works with either counter
+    allowed_chars = max(int(len(text) * max_tokens / tokens) - len(TRUNCATION_MARKER), 8)
+    head_chars = allowed_chars * 2 // 3
+    tail_chars = allowed_chars - head_chars
+
+    head = text[:head_chars]
+    if " " in head:
+        head = head[:head.rfind(" ")]
+    tail = text[-tail_chars:] if tail_chars else ""
+    if " " in tail:
+        tail = tail[tail.find(" ") + 1:]
+    return head.rstrip() + TRUNCATION_MARKER + tail.lstrip()
+
+
+class RenderedTurn:
+    """One history line, truncated and token-counted once when it is added"""
+
+    __slots__ = ("speaker", "text", "tokens")
+
+    def __init__(self, speaker: str, text: str, max_tokens: int):
+        self.speaker = speaker
+        self.text = truncate_to_tokens(" ".join(text.split()), max_tokens)
+        # Counted with the "Speaker: " prefix and trailing newline
+        self.tokens = count_tokens(f"{speaker}: {self.text}") + 1
+
+
+class PromptHistory:
+    """Append-only, pre-rendered conversation history for one session"""
+
+    def __init__(self, max_turn_tokens: int = None):
+        self.max_turn_tokens = max_turn_tokens or get_prompt_builder().max_turn_tokens
+        self.turns: List[RenderedTurn] = []
+        self._synced_entries = 0
+
+    def add(self, speaker: str, text: str):
+        if text:
+            self.turns.append(RenderedTurn(speaker, text, self.max_turn_tokens))
+
+    def add_user_entries(self, entries: List[Dict]):
+        """Append user turns from stored interaction/history dicts not seen on earlier calls"""
+        if len(entries) < self._synced_entries:
+            # The source list was reset; start over (with a new list, so stored copies see the change)
+            self.turns = []
+            self._synced_entries = 0
+        for entry in entries[self._synced_entries:]:
+            if isinstance(entry, dict):
+                self.add("User", entry.get('interaction', entry.get('input', '')))
+        self._synced_entries = len(entries)
+
+    @classmethod
+    def from_entries(cls, entries: List[Dict]) -> "PromptHistory":
+        history = cls()
+        history.add_user_entries(entries)
+        return history
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+
+class PromptBuilder:
+    """Fills the history section of each prompt up to that call type's token budget"""
+
+    def __init__(self, history_budgets: Dict = None, max_turn_tokens: int = 200, max_input_tokens: int = 400):
+        self.history_budgets = dict(DEFAULT_HISTORY_BUDGETS, **(history_budgets or {}))
+        self.max_turn_tokens = max_turn_tokens
+        self.max_input_tokens = max_input_tokens
+
+    def budget(self, call_type: str) -> int:
+        return self.history_budgets.get(call_type, self.max_turn_tokens * 3)
+
+    def render_history(self, history: Optional[PromptHistory], call_type: str, user_only: bool = False,
+                       numbered: bool = False, empty_text: str = "No recent history") -> str:
+        """Newest turns that fit the call type's budget, rendered oldest first"""
+        if not history:
+            return empty_text
+        budget = self.budget(call_type)
+
+        selected = []
+        used = 0
+        for turn in reversed(history.turns):
+            if user_only and turn.speaker != "User":
+                continue
+            if used + turn.tokens > budget:
+                if not selected:
+                    # Even the newest turn is over budget; keep a shortened copy of it
+                    selected.append((turn.speaker, truncate_to_tokens(turn.text, max(budget - 4, 1))))
+                break
+            selected.append((turn.speaker, turn.text))
+            used += turn.tokens
+
+        if not selected:
+            return empty_text
+        selected.reverse()
+        if numbered:
+            return "\n".join(f"Turn {index}: {text}" for index, (_, text) in enumerate(selected, 1))
+        return "\n".join(f"{speaker}: {text}" for speaker, text in selected)
+
+    def render_retrieved(self, items: List[Dict], call_type: str, exclude_text: str = "") -> str:
+        """Retrieved earlier turns, best first, within the call type's budget"""
+        budget = self.budget(call_type)
+        lines = []
+        used = 0
+        for item in items:
+            text = truncate_to_tokens(" ".join(item["text"].split()), self.max_turn_tokens)
+            if text in exclude_text:
+                # Already part of the recent history section
+                continue
+            line = f"(turn {item['turn_number']}) {item['speaker']}: {text}"
+            tokens = count_tokens(line) + 1
+            if used + tokens > budget:
+                break
+            lines.append(line)
+            used += tokens
+        return "\n".join(lines)
+
+    def clip_input(self, user_input: str) -> str:
+        """Bound the current user input that is quoted verbatim in prompts"""
+        return truncate_to_tokens(user_input, self.max_input_tokens)
+
+
+_builder = None
+_builder_lock = threading.Lock()
+
+
+def get_prompt_builder() -> PromptBuilder:
+    """Process-wide prompt builder configured from the `prompts` settings section"""
+    global _builder
+    if _builder is None:
+        with _builder_lock:
+            if _builder is None:
+                try:
+                    from utils.config import Config
+                    prompts_config = Config().get('prompts', {}) or {}
+                except Exception as e:
+                    print(f"Prompt settings unavailable, using default budgets: {e}")
+                    prompts_config = {}
+                _builder = PromptBuilder(
+                    history_budgets=prompts_config.get('history_budgets', {}),
+                    max_turn_tokens=prompts_config.get('max_turn_tokens', 200),
+                    max_input_tokens=prompts_config.get('max_input_tokens', 400)
+                )
+    return _builder
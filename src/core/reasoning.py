@@ -1,33 +1,39 @@
-import re
+import random
 import time
 from typing import Dict, List, Tuple, Optional
 
+from core.emotion_classifier import get_emotion_classifier
+from core.lexicon import EMOTION_LEXICON
+from core.metrics import ANALYSIS_TIER, FALLBACKS, timed_stage
+from core.drift_model import MarkovDriftModel
+from core.prompt_builder import PromptHistory
+from core.shingles import ShingleIndex
+from core.turn_features import TurnFeatures
+
 class Reasoning:
-    def __init__(self):
-        self.emotional_states = {
-            "happy": ["joy", "excited", "content", "great", "amazing", "wonderful", "fantastic"],
-            "sad": ["down", "disappointed", "melancholic", "depressed", "awful", "terrible", "horrible"],
-            "angry": ["frustrated", "irritated", "enraged", "furious", "mad", "annoyed", "pissed"],
-            "anxious": ["worried", "nervous", "stressed", "overwhelmed", "panic", "afraid", "scared"],
-            "confused": ["lost", "unclear", "don't understand", "confused", "mixed up", "uncertain"],
-            "neutral": ["calm", "indifferent", "unmoved", "okay", "fine", "normal"]
-        }
+    def __init__(self, settings: Dict = None, use_llm: bool = True, llm_service=None):
+        """settings are parsed settings.yaml sections (read from the file when omitted);
+        use_llm=False keeps analysis rule-based without probing the LLM; llm_service
+        shares an existing service (and its connection test) instead of creating one"""
+        self.emotional_states = EMOTION_LEXICON
         
         # Track conversation history for drift detection
         self.conversation_history = []
+        self.prompt_history = PromptHistory()
         self.emotional_history = []
         self.recursion_patterns = []
         
         # Initialize LLM service for enhanced analysis
-        try:
-            from core.llm_service import LLMService
-            self.llm_service = LLMService()
-            self.llm_available = self.llm_service.test_connection()
-            print("OpenAI service initialized for enhanced emotional analysis")
-        except Exception as e:
-            print(f"OpenAI service unavailable, using rule-based analysis: {e}")
-            self.llm_service = None
-            self.llm_available = False
+        self.llm_service = None
+        self._llm_available = False
+        if use_llm:
+            self._init_llm_service(llm_service)
+        
+        # Local classifier decides which inputs are worth an LLM analysis call
+        self._init_emotion_classifier(settings, load_model=use_llm)
+        self._init_drift_detection(settings)
+        if settings is None:
+            self._subscribe_to_settings()
         
         # Drift detection patterns
         self.contradiction_patterns = [
@@ -42,34 +48,93 @@ class Reasoning:
             "stuck in my head", "repeating", "circle", "loop"
         ]
 
-    def analyze_input(self, user_input: str, turn_number: int = 0) -> Dict:
+    def _init_llm_service(self, llm_service=None):
+        if llm_service is not None:
+            self.llm_service = llm_service
+            self.llm_available = None
+            return
+        try:
+            from core.llm_service import LLMService
+            self.llm_service = LLMService()
+            self.llm_service.start_probe()
+            self.llm_available = None
+            print("OpenAI service initialized for enhanced emotional analysis")
+        except Exception as e:
+            print(f"OpenAI service unavailable, using rule-based analysis: {e}")
+            self.llm_service = None
+            self.llm_available = False
+
+    @property
+    def llm_available(self) -> bool:
+        """Whether the LLM can be used. Unless set explicitly, follows the shared service,
+        whose connection test is waited on here, at first use, rather than at construction"""
+        if self._llm_available is None:
+            return self.llm_service is not None and self.llm_service.is_available()
+        return self._llm_available
+
+    @llm_available.setter
+    def llm_available(self, value: Optional[bool]):
+        self._llm_available = value
+
+    @timed_stage("analysis")
+    def analyze_input(self, user_input: str, turn_number: int = 0, features: TurnFeatures = None) -> Dict:
         """Comprehensive emotional analysis with AI enhancement and drift detection"""
+        if features is None:
+            features = TurnFeatures(user_input)
         
         # Store in conversation history
         timestamp = time.time()
         self.conversation_history.append({
             "input": user_input,
             "turn": turn_number,
-            "timestamp": timestamp
+            "timestamp": timestamp,
+            "features": features
         })
+        self.prompt_history.add("User", user_input)
+        features.repetition = self.shingle_index.observe(features.tokens)
         
-        # Try LLM-enhanced analysis first
+        # Tiered analysis: the local classifier runs first and the LLM is only
+        # consulted when it is unsure or a risk phrase is present
         if self.llm_service and self.llm_available:
-            try:
-                llm_analysis = self.llm_service.enhance_emotional_analysis(
-                    user_input, 
-                    self.conversation_history
-                )
-                
-                # Merge LLM analysis with our pattern detection
-                analysis = self._merge_llm_and_rule_analysis(llm_analysis, user_input, turn_number)
-                
-            except Exception as e:
-                print(f"LLM analysis failed, using rule-based: {e}")
-                analysis = self._rule_based_analysis(user_input, turn_number)
+            local_prediction = self._local_emotion_prediction(user_input, features)
+            escalation_reason = self._escalation_reason(features, local_prediction)
+            self.tiering_stats["total"] += 1
+            
+            if escalation_reason:
+                self.tiering_stats["escalations"] += 1
+                self.tiering_stats["reasons"][escalation_reason] = self.tiering_stats["reasons"].get(escalation_reason, 0) + 1
+                try:
+                    llm_analysis = self.llm_service.enhance_emotional_analysis(
+                        user_input, 
+                        self.prompt_history
+                    )
+                    
+                    # Merge LLM analysis with our pattern detection
+                    analysis = self._merge_llm_and_rule_analysis(llm_analysis, user_input, turn_number, features)
+                    analysis["analysis_tier"] = "llm"
+                    ANALYSIS_TIER.inc("llm")
+                    analysis["escalation_reason"] = escalation_reason
+                    self._record_agreement(local_prediction, analysis["emotional_state"], escalation_reason)
+                    
+                except Exception as e:
+                    print(f"LLM analysis failed, using rule-based: {e}")
+                    FALLBACKS.inc("reasoning_analysis")
+                    analysis = self._rule_based_analysis(user_input, turn_number, features=features)
+            else:
+                label, confidence = local_prediction
+                analysis = self._rule_based_analysis(user_input, turn_number, emotional_state=label, features=features)
+                analysis["analysis_tier"] = "local"
+                ANALYSIS_TIER.inc("local")
+                analysis["local_confidence"] = round(confidence, 3)
         else:
             # Fall back to rule-based analysis
-            analysis = self._rule_based_analysis(user_input, turn_number)
+            analysis = self._rule_based_analysis(user_input, turn_number, features=features)
+            ANALYSIS_TIER.inc("rules")
+        
+        analysis["repetition"] = features.repetition
+        
+        # Intensity and stress deltas are shared with Memory and the biometric simulation
+        features.apply_analysis(analysis)
         
         # Store emotional state
         self.emotional_history.append({
@@ -81,8 +146,137 @@ class Reasoning:
         
         return analysis
 
-    def _merge_llm_and_rule_analysis(self, llm_analysis: Dict, user_input: str, turn_number: int) -> Dict:
+    def _init_drift_detection(self, settings: Dict = None):
+        """Streaming drift model and the n-gram index that spots phrases recurring across turns"""
+        if settings is not None:
+            drift_config = settings.get('emotional_drift', {}) or {}
+        else:
+            try:
+                from utils.config import Config
+                drift_config = Config().get('emotional_drift', {}) or {}
+            except Exception as e:
+                print(f"Drift settings unavailable, using defaults: {e}")
+                drift_config = {}
+        self.shingle_index = ShingleIndex(
+            n=drift_config.get('shingle_size', 3),
+            window=drift_config.get('shingle_window', 5),
+            threshold=drift_config.get('recursion_threshold', 2),
+            min_repetition=drift_config.get('recursion_min_repetition', 0.25)
+        )
+        self.drift_model = MarkovDriftModel(
+            threshold=drift_config.get('threshold', 0.5),
+            recent_half_life=drift_config.get('recent_half_life', 3),
+            baseline_half_life=drift_config.get('baseline_half_life', 30),
+            prior_strength=drift_config.get('prior_strength', 5),
+            min_turns=drift_config.get('min_turns', 3),
+            population_prior=drift_config.get('population_prior')
+        )
+
+    def _subscribe_to_settings(self):
+        try:
+            from utils.config import get_config_service
+            get_config_service().subscribe(self.apply_settings)
+        except Exception as e:
+            print(f"Settings reload unavailable, keeping startup thresholds: {e}")
+
+    def apply_settings(self, snapshot):
+        """Take drift and classifier thresholds from a reloaded config snapshot.
+        Phrase size and window shape the stored phrase index, so they only reach new sessions."""
+        drift = snapshot.emotional_drift
+        self.drift_model.set_parameters(drift.threshold, drift.recent_half_life, drift.baseline_half_life,
+                                        drift.prior_strength, drift.min_turns)
+        self.shingle_index.threshold = drift.recursion_threshold
+        self.shingle_index.min_repetition = drift.recursion_min_repetition
+        classifier_config = snapshot.section('emotion_classifier')
+        self.classifier_confidence_threshold = classifier_config.get('confidence_threshold', 0.8)
+        self.classifier_audit_rate = classifier_config.get('audit_rate', 0.0)
+
+    def _init_emotion_classifier(self, settings: Dict = None, load_model: bool = True):
+        """Load the local emotion classifier and its escalation settings"""
+        if settings is not None:
+            classifier_config = settings.get('emotion_classifier', {}) or {}
+        else:
+            try:
+                from utils.config import Config
+                classifier_config = Config().get('emotion_classifier', {}) or {}
+            except Exception as e:
+                print(f"Emotion classifier settings unavailable, escalating every input: {e}")
+                classifier_config = {}
+        
+        self.classifier_confidence_threshold = classifier_config.get('confidence_threshold', 0.8)
+        self.classifier_audit_rate = classifier_config.get('audit_rate', 0.0)
+        self.emotion_classifier = None
+        # Only consulted when deciding whether to escalate to the LLM
+        if load_model and classifier_config.get('enabled', False):
+            self.emotion_classifier = get_emotion_classifier(classifier_config.get('model_path'))
+        
+        self.tiering_stats = {
+            "total": 0,
+            "escalations": 0,
+            "reasons": {},
+            "compared": 0,
+            "agreements": 0,
+            "audited": 0,
+            "audit_agreements": 0
+        }
+
+    def _local_emotion_prediction(self, user_input: str, features: TurnFeatures = None) -> Optional[Tuple[str, float]]:
+        """Predict the emotional state with the local classifier"""
+        if not self.emotion_classifier:
+            return None
+        return self.emotion_classifier.predict(user_input, features)
+
+    def _escalation_reason(self, features: TurnFeatures, local_prediction: Optional[Tuple[str, float]]) -> Optional[str]:
+        """Decide whether an input needs LLM analysis, returning the reason or None"""
+        if local_prediction is None:
+            return "no_local_model"
+        
+        # Risk phrases and contradictions always go to the LLM
+        if features.risk_flag:
+            return "risk_flag"
+        
+        if local_prediction[1] < self.classifier_confidence_threshold:
+            return "low_confidence"
+        
+        # Spot-check a small share of confident predictions to keep agreement honest
+        if self.classifier_audit_rate and random.random() < self.classifier_audit_rate:
+            return "audit"
+        
+        return None
+
+    def _record_agreement(self, local_prediction: Optional[Tuple[str, float]], llm_state: str, escalation_reason: str):
+        """Track how often the local classifier agrees with the LLM"""
+        if local_prediction is None:
+            return
+        
+        agreed = local_prediction[0] == llm_state
+        self.tiering_stats["compared"] += 1
+        self.tiering_stats["agreements"] += agreed
+        if escalation_reason == "audit":
+            self.tiering_stats["audited"] += 1
+            self.tiering_stats["audit_agreements"] += agreed
+
+    def get_analysis_tier_metrics(self) -> Dict:
+        """Escalation and agreement metrics for the tiered analyzer"""
+        stats = self.tiering_stats
+        total = stats["total"]
+        return {
+            "classifier_loaded": self.emotion_classifier is not None,
+            "confidence_threshold": self.classifier_confidence_threshold,
+            "total_analyses": total,
+            "local_analyses": total - stats["escalations"],
+            "escalations": stats["escalations"],
+            "escalation_rate": round(stats["escalations"] / total, 3) if total else 0.0,
+            "escalation_reasons": dict(stats["reasons"]),
+            "agreement_rate": round(stats["agreements"] / stats["compared"], 3) if stats["compared"] else None,
+            "audit_agreement_rate": round(stats["audit_agreements"] / stats["audited"], 3) if stats["audited"] else None
+        }
+
+    def _merge_llm_and_rule_analysis(self, llm_analysis: Dict, user_input: str, turn_number: int,
+                                     features: TurnFeatures = None) -> Dict:
         """Merge LLM analysis with rule-based pattern detection"""
+        if features is None:
+            features = TurnFeatures(user_input)
         
         # Start with LLM analysis
         analysis = {
@@ -100,17 +294,15 @@ class Reasoning:
             "intervention_needed": llm_analysis.get("intervention_needed", False)
         }
         
-        # Add our rule-based drift detection
-        if len(self.emotional_history) >= 2:
-            drift_analysis = self._detect_emotional_drift()
-            analysis.update(drift_analysis)
+        # Add our streaming drift detection
+        analysis.update(self._detect_emotional_drift(analysis["emotional_state"]))
         
         # Additional rule-based recursion detection
-        if self._detect_recursion(user_input):
+        if self._detect_recursion(user_input, features):
             analysis["recursion_detected"] = True
         
         # Additional contradiction detection
-        rule_contradiction = self._detect_contradictions(user_input)
+        rule_contradiction = self._detect_contradictions(user_input, features)
         if rule_contradiction:
             analysis["contradiction_detected"] = True
             
@@ -122,11 +314,15 @@ class Reasoning:
         
         return analysis
 
-    def _rule_based_analysis(self, user_input: str, turn_number: int) -> Dict:
+    def _rule_based_analysis(self, user_input: str, turn_number: int, emotional_state: str = None,
+                             features: TurnFeatures = None) -> Dict:
         """Fallback rule-based analysis when LLM is unavailable"""
+        if features is None:
+            features = TurnFeatures(user_input)
         
-        # Basic emotional state detection
-        emotional_state = self._detect_emotional_state(user_input)
+        # Basic emotional state detection (unless the local classifier already decided)
+        if emotional_state is None:
+            emotional_state = self._detect_emotional_state(user_input, features)
         
         # Basic analysis structure
         analysis = {
@@ -142,16 +338,15 @@ class Reasoning:
             "llm_enhanced": False
         }
         
-        # Check for emotional drift if we have enough history
-        if len(self.emotional_history) >= 2:
-            analysis.update(self._detect_emotional_drift())
+        # Check for emotional drift against the session baseline
+        analysis.update(self._detect_emotional_drift(emotional_state))
             
         # Check for recursion patterns
-        if self._detect_recursion(user_input):
+        if self._detect_recursion(user_input, features):
             analysis["recursion_detected"] = True
             
         # Check for contradictions
-        contradiction_result = self._detect_contradictions(user_input)
+        contradiction_result = self._detect_contradictions(user_input, features)
         if contradiction_result:
             analysis["contradiction_detected"] = True
             
@@ -201,138 +396,51 @@ class Reasoning:
         else:
             return "stable"
 
-    def _detect_emotional_state(self, user_input: str) -> str:
+    def _detect_emotional_state(self, user_input: str, features: TurnFeatures = None) -> str:
         """Detect primary emotional state from input"""
-        user_input_lower = user_input.lower()
-        
-        # Score each emotional category
-        emotion_scores = {}
-        for state, keywords in self.emotional_states.items():
-            score = sum(1 for keyword in keywords if keyword in user_input_lower)
-            if score > 0:
-                emotion_scores[state] = score
-                
-        # Return the emotion with highest score, default to neutral
-        if emotion_scores:
-            return max(emotion_scores, key=emotion_scores.get)
-        return "neutral"
-
-    def _detect_emotional_drift(self) -> Dict:
-        """Detect if emotional state is drifting between turns - CONSERVATIVE"""
-        if len(self.emotional_history) < 3:  # Need at least 3 data points
-            return {"drift_detected": False}
-            
-        recent_emotions = [entry["state"] for entry in self.emotional_history[-4:]]  # Last 4 emotions
-        
-        # Only flag severe emotional volatility
-        # Check for rapid swings between extreme opposites
-        extreme_positive = ['happy']
-        extreme_negative = ['angry', 'anxious']
+        if features is None:
+            features = TurnFeatures(user_input)
         
-        extreme_swings = 0
-        for i in range(len(recent_emotions) - 1):
-            current = recent_emotions[i]
-            next_emotion = recent_emotions[i + 1]
-            
-            if ((current in extreme_positive and next_emotion in extreme_negative) or
-                (current in extreme_negative and next_emotion in extreme_positive)):
-                extreme_swings += 1
-        
-        # Only flag if multiple extreme swings in short period
-        if extreme_swings >= 2:
-            return {
-                "drift_detected": True,
-                "drift_type": "severe_volatility",
-                "drift_pattern": recent_emotions
-            }
-                
-        return {"drift_detected": False}
+        # Highest-scoring lexicon category, default to neutral
+        return features.lexicon_state
 
-    def _detect_recursion(self, user_input: str) -> bool:
+    def _detect_emotional_drift(self, emotional_state: str) -> Dict:
+        """Score this turn's emotional state against the session's streaming drift model"""
+        return self.drift_model.observe(emotional_state)
+
+    def _detect_recursion(self, user_input: str, features: TurnFeatures = None) -> bool:
         """Detect recursive thought patterns - CONSERVATIVE APPROACH"""
-        user_input_lower = user_input.lower()
+        if features is None:
+            features = TurnFeatures(user_input)
         
         # Only trigger on explicit recursion language
-        strong_recursion_indicators = [
-            "keep thinking about this over and over",
-            "can't stop thinking about",
-            "stuck in my head",
-            "going in circles",
-            "same thoughts repeating"
-        ]
-        
-        # Check for direct strong recursion indicators
-        for indicator in strong_recursion_indicators:
-            if indicator in user_input_lower:
-                self.recursion_patterns.append({
-                    "pattern": indicator,
-                    "turn": len(self.conversation_history),
-                    "timestamp": time.time()
-                })
-                return True
-        
-        # More conservative phrase repetition check
-        if len(self.conversation_history) >= 3:
-            recent_inputs = [entry["input"].lower() for entry in self.conversation_history[-3:]]
-            
-            # Only flag if user repeats EXACT same core concern 3+ times
-            current_core = self._extract_core_concern(user_input_lower)
-            if current_core:
-                repetition_count = sum(1 for prev_input in recent_inputs[:-1] 
-                                     if current_core in prev_input)
-                if repetition_count >= 2:  # Same core concern in 3+ recent inputs
-                    return True
+        if features.strong_recursion_indicator:
+            self.recursion_patterns.append({
+                "pattern": features.strong_recursion_indicator,
+                "turn": len(self.conversation_history),
+                "timestamp": time.time()
+            })
+            return True
+        
+        # Same phrase recurring across recent turns (shingle index, recursion_threshold earlier turns)
+        repetition = features.repetition
+        if repetition and repetition["recursion_detected"]:
+            self.recursion_patterns.append({
+                "pattern": repetition["recurring_phrases"][0],
+                "turn": len(self.conversation_history),
+                "timestamp": time.time()
+            })
+            return True
                         
         return False
 
-    def _extract_core_concern(self, text: str) -> str:
-        """Extract the core concern from user input"""
-        # Simple extraction - look for key worry phrases
-        concern_patterns = [
-            r"worried about (.+?)[\.\,\?]",
-            r"thinking about (.+?)[\.\,\?]",
-            r"concerned about (.+?)[\.\,\?]",
-            r"stressed about (.+?)[\.\,\?]"
-        ]
-        
-        for pattern in concern_patterns:
-            match = re.search(pattern, text)
-            if match:
-                return match.group(1).strip()
-        
-        return None
-
-    def _detect_contradictions(self, user_input: str) -> Optional[str]:
+    def _detect_contradictions(self, user_input: str, features: TurnFeatures = None) -> Optional[str]:
         """Detect contradictory statements - MUCH MORE CONSERVATIVE"""
-        user_input_lower = user_input.lower()
-        
-        # Only flag severe contradictions within the same sentence
-        severe_contradiction_patterns = [
-            (r"i'm (happy|great|good) but .*(terrible|awful|horrible)", "severe_emotional_contradiction"),
-            (r"everything is (fine|good|okay) but .*(falling apart|terrible|awful)", "severe_state_contradiction"),
-            (r"i (love|hate) .* but .* (hate|love)", "severe_emotional_flip")
-        ]
+        if features is None:
+            features = TurnFeatures(user_input)
         
-        for pattern, contradiction_type in severe_contradiction_patterns:
-            if re.search(pattern, user_input_lower):
-                return contradiction_type
-                
-        return None
-                
-        return None
-
-    def _find_common_phrases(self, text1: str, text2: str, min_length: int = 3) -> List[str]:
-        """Find common phrases between two texts"""
-        words1 = text1.split()
-        words2 = text2.split()
-        
-        common_phrases = []
-        for i in range(len(words1) - min_length + 1):
-            phrase = " ".join(words1[i:i+min_length])
-            if phrase in text2:
-                common_phrases.append(phrase)
-                
-        return common_phrases
+        # Only severe contradictions within the same sentence are matched
+        return features.contradiction_type
 
     def determine_response(self, emotional_state: str) -> str:
         """Generate appropriate response based on emotional state"""
@@ -346,6 +454,7 @@ class Reasoning:
         }
         return responses.get(emotional_state, "I'm here to listen.")
 
+    @timed_stage("summary")
     def get_conversation_summary(self) -> Dict:
         """Get a summary of the conversation for monitoring"""
         summary = {
@@ -353,13 +462,15 @@ class Reasoning:
             "emotional_progression": [entry["state"] for entry in self.emotional_history],
             "recursion_count": len(self.recursion_patterns),
             "last_emotional_state": self.emotional_history[-1]["state"] if self.emotional_history and len(self.emotional_history) > 0 else "unknown",
-            "openai_enhanced": self.llm_available
+            "openai_enhanced": self.llm_available,
+            "analysis_tiering": self.get_analysis_tier_metrics(),
+            "drift_model": self.drift_model.get_state()
         }
         
         # Add LLM-generated summary if available
         if self.llm_service and self.llm_available and len(self.conversation_history) > 2:
             try:
-                llm_summary = self.llm_service.generate_conversation_summary(self.conversation_history)
+                llm_summary = self.llm_service.generate_conversation_summary(self.prompt_history)
                 summary.update({
                     "ai_summary": llm_summary.get("summary", ""),
                     "key_themes": llm_summary.get("key_themes", []),
@@ -0,0 +1,92 @@
+import heapq
+import math
+from collections import Counter
+from typing import Dict, List
+
+from core.turn_features import TOKEN_PATTERN
+
+# Words too common in this domain to say anything about relevance
+STOPWORDS = frozenset("""
+a about after again all also am an and any are as at be because been but by can could did do does
+doing don't for from had has have having he her him his how i i'm i've if in into is it it's its
+just like me more my myself no not now of on or our out really so some than that that's the their
+them then there these they this to too up us very was we were what when where which while who why
+will with would you your you're
+""".split())
+
+
+class TfidfIndex:
+    """
+    Incremental TF-IDF retrieval over one session's turns, kept as an inverted index.
+    Documents use log-scaled, length-normalized term weights fixed when they are added;
+    queries are weighted by the current IDF (SMART lnc.ltc), so nothing is re-indexed
+    as the collection grows.
+    """
+
+    def __init__(self):
+        self.documents: List[Dict] = []
+        # term -> {doc_id: normalized document weight}
+        self.postings: Dict[str, Dict[int, float]] = {}
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+
+    def add(self, text: str, turn_number: int, speaker: str, tokens: List[str] = None) -> int:
+        """Index one user input or agent response; tokens may be passed in when already computed"""
+        doc_id = len(self.documents)
+        self.documents.append({"text": text, "turn_number": turn_number, "speaker": speaker})
+
+        if tokens is None:
+            terms = self.tokenize(text)
+        else:
+            terms = [token for token in tokens if token not in STOPWORDS and len(token) > 1]
+        self._index(doc_id, terms)
+        return doc_id
+
+    def index_documents(self, start: int = 0):
+        """Postings for documents[start:], e.g. documents restored from storage without their postings"""
+        for doc_id in range(start, len(self.documents)):
+            self._index(doc_id, self.tokenize(self.documents[doc_id]["text"]))
+
+    def _index(self, doc_id: int, terms: List[str]):
+        counts = Counter(terms)
+        weights = {term: 1.0 + math.log(count) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        for term, weight in weights.items():
+            self.postings.setdefault(term, {})[doc_id] = weight / norm
+
+    def search(self, query: str, k: int = 3, before_turn: int = None, min_score: float = 0.05) -> List[Dict]:
+        """Top-k documents by cosine similarity, optionally only those older than before_turn"""
+        if k <= 0 or not self.documents:
+            return []
+        total = len(self.documents)
+        query_weights = {}
+        for term, count in Counter(self.tokenize(query)).items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            query_weights[term] = (1.0 + math.log(count)) * math.log(1.0 + total / len(postings))
+        query_norm = math.sqrt(sum(weight * weight for weight in query_weights.values()))
+        if not query_norm:
+            return []
+
+        scores = {}
+        for term, query_weight in query_weights.items():
+            for doc_id, doc_weight in self.postings[term].items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + query_weight * doc_weight
+
+        documents = self.documents
+        candidates = (
+            (score, doc_id) for doc_id, score in scores.items()
+            if before_turn is None or documents[doc_id]["turn_number"] < before_turn
+        )
+        results = []
+        for score, doc_id in heapq.nlargest(k, candidates):
+            score /= query_norm
+            if score >= min_score:
+                results.append(dict(documents[doc_id], score=round(score, 4)))
+        return results
+
+    def __len__(self) -> int:
+        return len(self.documents)
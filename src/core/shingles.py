@@ -0,0 +1,79 @@
+import zlib
+from collections import deque
+from typing import Dict, List
+
+from core.retrieval import STOPWORDS
+
+
+class ShingleIndex:
+    """
+    Rolling index of hashed word n-gram shingles over a session's recent turns.
+    Each turn's n-grams are hashed in one pass and looked up in a count table of
+    the last `window` turns, so finding recurring phrases costs O(len(input))
+    instead of comparing every pair of turns word by word. The hash is CRC-32 of
+    the phrase rather than hash(), which is salted per process: a stored session
+    must still match its phrases in another worker or after a restart.
+
+    Only n-grams with two or more content words are indexed, so filler such as
+    "i feel like" never counts, and a turn is only flagged when a phrase recurs in
+    `threshold` earlier turns and at least `min_repetition` of its phrases recur.
+    """
+
+    # Content words an n-gram needs to be indexed (all of them for shorter n-grams)
+    MIN_CONTENT_WORDS = 2
+    # Default for indexes stored before min_repetition existed
+    min_repetition = 0.25
+
+    def __init__(self, n: int = 3, window: int = 5, threshold: int = 2, min_repetition: float = 0.25):
+        self.n = max(1, int(n))
+        self.window = max(1, int(window))
+        # Earlier turns a phrase must recur in before it counts as recursion
+        self.threshold = max(1, int(threshold))
+        # Share of the turn's phrases that must recur before it counts as recursion
+        self.min_repetition = max(0.0, float(min_repetition))
+        self.turns = deque()
+        # shingle hash -> number of turns in the window containing it
+        self.turn_counts = {}
+
+    def _shingles(self, tokens: List[str]) -> Dict[int, int]:
+        """Hash -> start position of every n-gram with enough content words"""
+        shingles = {}
+        needed = min(self.MIN_CONTENT_WORDS, self.n)
+        grams = zip(*(tokens[offset:] for offset in range(self.n)))
+        for start, gram in enumerate(grams):
+            if sum(word not in STOPWORDS for word in gram) >= needed:
+                shingles.setdefault(zlib.crc32(" ".join(gram).encode("utf-8")), start)
+        return shingles
+
+    def observe(self, tokens: List[str]) -> Dict:
+        """Score this turn against the recent window, then add it to the window"""
+        shingles = self._shingles(tokens)
+
+        recurring = {}
+        for shingle, start in shingles.items():
+            count = self.turn_counts.get(shingle, 0)
+            if count:
+                recurring[shingle] = (count, start)
+
+        max_recurrence = max((count for count, _ in recurring.values()), default=0)
+        repetition_score = len(recurring) / len(shingles) if shingles else 0.0
+        top = sorted(recurring.values(), key=lambda item: (-item[0], item[1]))[:5]
+        result = {
+            "repetition_score": round(repetition_score, 3),
+            "max_recurrence": max_recurrence,
+            "recurring_phrases": [" ".join(tokens[start:start + self.n]) for _, start in top],
+            "recursion_detected": max_recurrence >= self.threshold and repetition_score >= self.min_repetition
+        }
+
+        turn_counts = self.turn_counts
+        self.turns.append(tuple(shingles))
+        for shingle in shingles:
+            turn_counts[shingle] = turn_counts.get(shingle, 0) + 1
+        if len(self.turns) > self.window:
+            for shingle in self.turns.popleft():
+                remaining = turn_counts[shingle] - 1
+                if remaining:
+                    turn_counts[shingle] = remaining
+                else:
+                    del turn_counts[shingle]
+        return result
@@ -0,0 +1,89 @@
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# "import time:       212 |        345 |     yaml.reader" (microseconds; indentation is nesting depth)
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+
+
+class StartupTimer:
+    """Wall time of named startup phases, in the order they ran"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def parse_importtime(output: str) -> List[Dict]:
+    """Entries of `python -X importtime` output, in import order"""
+    entries = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                "module": module,
+                "self_ms": int(self_us) / 1000.0,
+                "cumulative_ms": int(cumulative_us) / 1000.0,
+                "depth": (len(indent) - 1) // 2
+            })
+    return entries
+
+
+def profile_imports(statement: str, cwd: str = None) -> Dict:
+    """Run `statement` in a fresh interpreter under -X importtime, with src on the path.
+    Returns the wall time of the whole run and the parsed import entries."""
+    code = f"import sys; sys.path.insert(0, {SRC_DIR!r}); {statement}"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed: {result.stderr.strip().splitlines()[-1:]}")
+    return {"statement": statement, "wall_seconds": wall, "imports": parse_importtime(result.stderr)}
+
+
+def summarize_imports(entries: List[Dict], top: int = 15) -> Dict:
+    """Total import time, slowest top-level imports (cumulative) and slowest single modules (self)"""
+    top_level = [entry for entry in entries if entry["depth"] == 0]
+    packages = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        packages[package] = packages.get(package, 0.0) + entry["self_ms"]
+    return {
+        "total_ms": round(sum(entry["cumulative_ms"] for entry in top_level), 1),
+        "modules": len(entries),
+        "top_level": sorted(top_level, key=lambda entry: entry["cumulative_ms"], reverse=True)[:top],
+        "by_package": sorted(({"package": name, "self_ms": round(ms, 1)} for name, ms in packages.items()),
+                             key=lambda entry: entry["self_ms"], reverse=True)[:top],
+        "slowest_self": sorted(entries, key=lambda entry: entry["self_ms"], reverse=True)[:top]
+    }
+
+
+def print_import_report(profile: Dict, top: int = 15):
+    summary = summarize_imports(profile["imports"], top)
+    print(f"\n{profile['statement']}: {profile['wall_seconds'] * 1000:.0f} ms wall, "
+          f"{summary['total_ms']:.0f} ms importing {summary['modules']} modules")
+    print("   Top-level imports (cumulative):")
+    for entry in summary["top_level"]:
+        print(f"   {entry['cumulative_ms']:9.1f} ms  {entry['module']}")
+    print("   By package (self):")
+    for entry in summary["by_package"]:
+        print(f"   {entry['self_ms']:9.1f} ms  {entry['package']}")
@@ -0,0 +1,231 @@
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+# The trace being recorded on the current thread/request, if any
+_current_trace = contextvars.ContextVar("agentic_current_trace", default=None)
+
+# Anchor perf_counter to wall time so events from different traces line up
+_WALL_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+def _now_us() -> float:
+    return (time.perf_counter_ns() + _WALL_OFFSET_NS) / 1000.0
+
+
+class Trace:
+    """Spans recorded for one turn, kept as Chrome trace-event dicts"""
+
+    __slots__ = ("trace_id", "name", "events")
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.events = []
+
+    def add_span(self, name: str, category: str, start_us: float, end_us: float, args: Dict = None):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round(start_us, 3),
+            "dur": round(end_us - start_us, 3),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": dict(args or {}, trace_id=self.trace_id)
+        }
+        self.events.append(event)
+
+
+class _Span:
+    """Context manager recording one complete ("X") event on the active trace"""
+
+    __slots__ = ("trace", "name", "category", "args", "start")
+
+    def __init__(self, trace: Trace, name: str, category: str, args: Dict):
+        self.trace = trace
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        args = self.args
+        if exc_type is not None:
+            args = dict(args, error=exc_type.__name__)
+        self.trace.add_span(self.name, self.category, self.start, _now_us(), args)
+        return False
+
+    def set(self, key: str, value):
+        """Attach an extra argument to the span"""
+        self.args[key] = value
+
+
+class _NullSpan:
+    """Shared no-op span used when the current turn is not being traced"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, key: str, value):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(name: str, category: str = "stage", **args):
+    """Open a span on the current trace; a no-op when the turn is not sampled"""
+    trace = _current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return _Span(trace, name, category, args)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+class _TraceScope:
+    """Root span of a turn; writes the trace out when the turn finishes"""
+
+    __slots__ = ("tracer", "trace", "root", "token")
+
+    def __init__(self, tracer: "Tracer", trace: Trace, args: Dict):
+        self.tracer = tracer
+        self.trace = trace
+        self.root = _Span(trace, trace.name, "turn", args)
+
+    def __enter__(self):
+        self.token = _current_trace.set(self.trace)
+        self.root.__enter__()
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        self.root.__exit__(exc_type, exc, tb)
+        _current_trace.reset(self.token)
+        self.tracer.export(self.trace)
+        return False
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class Tracer:
+    """
+    Samples turns and appends their spans to a size-rotated file in the
+    Chrome/Perfetto JSON array trace-event format (load it in ui.perfetto.dev
+    or chrome://tracing).
+    """
+
+    def __init__(self, sample_rate: float = 0.0, output_file: str = "logs/traces/trace.json",
+                 max_file_bytes: int = 20 * 1024 * 1024, backup_count: int = 5):
+        self.sample_rate = sample_rate
+        self.output_file = output_file
+        self.max_file_bytes = max_file_bytes
+        self.backup_count = backup_count
+        self.traces_written = 0
+        self._lock = threading.Lock()
+
+    def trace(self, name: str, force: bool = False, **args):
+        """Start tracing a turn if it is sampled (or forced); use as a context manager"""
+        if _current_trace.get() is not None:
+            # Already inside a trace: nest as a regular span instead
+            return span(name, "turn", **args)
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return _NULL_SCOPE
+        return _TraceScope(self, Trace(name), args)
+
+    def export(self, trace: Trace):
+        """Append a finished trace's events to the rotating trace file"""
+        if not trace.events:
+            return
+        # Parents finish after their children; order by start time for readability
+        events = sorted(trace.events, key=lambda event: event["ts"])
+        payload = "".join(json.dumps(event, default=str) + ",\n" for event in events)
+
+        try:
+            with self._lock:
+                directory = os.path.dirname(self.output_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._rotate_if_needed(len(payload))
+                new_file = not os.path.exists(self.output_file)
+                with open(self.output_file, 'a') as file:
+                    if new_file:
+                        # The array is left unterminated so traces can be appended; trace viewers accept this
+                        file.write("[\n")
+                    file.write(payload)
+                self.traces_written += 1
+        except OSError as e:
+            print(f"Could not write trace {trace.trace_id}: {e}")
+
+    def _rotate_if_needed(self, incoming_bytes: int):
+        if not os.path.exists(self.output_file):
+            return
+        if os.path.getsize(self.output_file) + incoming_bytes <= self.max_file_bytes:
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.output_file}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.output_file}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.output_file, f"{self.output_file}.1")
+        else:
+            os.remove(self.output_file)
+
+    def get_status(self) -> Dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "output_file": self.output_file,
+            "traces_written": self.traces_written
+        }
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer configured from the `tracing` settings section"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                try:
+                    from utils.config import Config
+                    tracing_config = Config().get('tracing', {}) or {}
+                except Exception as e:
+                    print(f"Tracing settings unavailable, tracing only forced requests: {e}")
+                    tracing_config = {}
+                _tracer = Tracer(
+                    sample_rate=tracing_config.get('sample_rate', 0.0),
+                    output_file=tracing_config.get('output_file', "logs/traces/trace.json"),
+                    max_file_bytes=int(tracing_config.get('max_file_mb', 20) * 1024 * 1024),
+                    backup_count=tracing_config.get('backup_count', 5)
+                )
+    return _tracer
@@ -0,0 +1,112 @@
+import re
+from typing import Dict
+
+from core.lexicon import (
+    BASE_INTENSITY, COHERENCE_LOSS_PHRASES, EMOTION_LEXICON,
+    POSITIVE_STATE_WORDS, RECURSION_PHRASES, RISK_PHRASES, SEVERE_CONTRADICTION_PATTERNS,
+    STRESS_FACTORS, STRONG_RECURSION_INDICATORS
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z']+")
+_CONTRADICTION_REGEXES = [(re.compile(pattern), label) for pattern, label in SEVERE_CONTRADICTION_PATTERNS]
+
+
+class TurnFeatures:
+    """
+    Everything the rule-based components need to know about one user input.
+    Built once per turn and handed to Reasoning, Memory and the agents so the
+    text is normalized and scanned a single time.
+    """
+
+    __slots__ = (
+        "text", "normalized", "tokens", "lexicon_hits", "lexicon_state",
+        "strong_recursion_indicator", "recursion_phrase_hits", "coherence_loss_phrase",
+        "contradiction_type", "has_positive_word", "negated_positive",
+        "risk_flag", "repetition", "intensity", "stress_delta", "stress_factor"
+    )
+
+    def __init__(self, text: str):
+        self.text = text
+        self.normalized = text.lower()
+        self.tokens = TOKEN_PATTERN.findall(self.normalized)
+        normalized = self.normalized
+
+        # Lexicon hits per emotional state (keyword presence, not occurrences)
+        self.lexicon_hits = {}
+        for state, keywords in EMOTION_LEXICON.items():
+            score = sum(1 for keyword in keywords if keyword in normalized)
+            if score > 0:
+                self.lexicon_hits[state] = score
+        self.lexicon_state = max(self.lexicon_hits, key=self.lexicon_hits.get) if self.lexicon_hits else "neutral"
+
+        # Matched patterns
+        self.strong_recursion_indicator = next(
+            (indicator for indicator in STRONG_RECURSION_INDICATORS if indicator in normalized), None
+        )
+        self.recursion_phrase_hits = sum(1 for phrase in RECURSION_PHRASES if phrase in normalized)
+        self.coherence_loss_phrase = next(
+            (phrase for phrase in COHERENCE_LOSS_PHRASES if phrase in normalized), None
+        )
+        self.contradiction_type = next(
+            (label for regex, label in _CONTRADICTION_REGEXES if regex.search(normalized)), None
+        )
+
+        self.has_positive_word = any(word in normalized for word in POSITIVE_STATE_WORDS)
+        self.negated_positive = "not" in normalized and self.has_positive_word
+        self.risk_flag = bool(self.contradiction_type) or any(phrase in normalized for phrase in RISK_PHRASES)
+
+        # Cross-turn phrase repetition, filled in by the session's shingle index
+        self.repetition = None
+
+        # Filled in once the turn's emotional analysis is known
+        self.intensity = None
+        self.stress_delta = None
+        self.stress_factor = None
+
+    def apply_analysis(self, emotional_analysis: Dict):
+        """Derive the intensity and stress deltas from the finished analysis"""
+        self.intensity = emotional_intensity(emotional_analysis)
+        self.stress_delta = stress_delta(emotional_analysis)
+        self.stress_factor = (emotional_analysis.get("coherence_status") != "stable") * 0.5
+
+    def to_dict(self) -> Dict:
+        """Plain-dict view for logging and analytics"""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def get_turn_features(entry: Dict) -> TurnFeatures:
+    """Return the features stored on a history entry, building them if absent"""
+    features = entry.get("features")
+    if features is None:
+        features = TurnFeatures(entry.get('interaction', entry.get('input', '')).strip())
+    return features
+
+
+def emotional_intensity(emotional_analysis: Dict) -> float:
+    """Calculate emotional intensity from analysis"""
+    intensity = BASE_INTENSITY.get(emotional_analysis.get("emotional_state", "neutral"), 0.5)
+
+    # Increase intensity based on coherence issues
+    if emotional_analysis.get("coherence_status") == "coherence_lost":
+        intensity += 0.3
+    if emotional_analysis.get("recursion_detected"):
+        intensity += 0.2
+    if emotional_analysis.get("drift_detected"):
+        intensity += 0.2
+
+    return min(1.0, intensity)
+
+
+def stress_delta(emotional_analysis: Dict) -> float:
+    """Stress contribution of one turn, before smoothing in Memory"""
+    base_stress = STRESS_FACTORS.get(emotional_analysis.get("emotional_state", "neutral"), 0.0)
+
+    # Much more conservative stress from coherence issues
+    if emotional_analysis.get("coherence_status") == "coherence_lost":
+        base_stress += 0.2  # Reduced from 0.3
+    if emotional_analysis.get("recursion_detected"):
+        base_stress += 0.1  # Reduced from 0.2
+    if emotional_analysis.get("drift_detected"):
+        base_stress += 0.1  # Reduced from 0.2
+
+    return base_stress
@@ -0,0 +1,204 @@
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from core.metrics import REGISTRY, _format_labels
+
+# Session the current request/turn is billed to
+_current_session = contextvars.ContextVar("agentic_current_session", default=None)
+
+UNATTRIBUTED_SESSION = "unattributed"
+
+# Seconds covered by the rolling throughput window
+THROUGHPUT_WINDOW = 60
+
+# Which call types belong to which agent, for per-agent status views
+AGENT_CALL_TYPES = {
+    "agent_a": ("agent_a",),
+    "agent_b": ("agent_b_monitoring", "agent_b_intervention"),
+    "reasoning": ("emotional_analysis", "conversation_summary"),
+}
+
+# Order of the per-key totals tuple
+_FIELDS = ("calls", "errors", "prompt_tokens", "completion_tokens", "cached_tokens", "latency_seconds")
+
+
+def current_session_id() -> Optional[str]:
+    return _current_session.get()
+
+
+@contextlib.contextmanager
+def session_scope(session_id: Optional[str]):
+    """Attribute LLM usage inside the block to the given session"""
+    token = _current_session.set(session_id)
+    try:
+        yield session_id
+    finally:
+        _current_session.reset(token)
+
+
+class UsageLedger:
+    """
+    Token and latency accounting per call type, model and session.
+    One lock guards both tables; it is held for a few dict updates per LLM call,
+    and readers copy the tables under it.
+    """
+
+    # Registry protocol, so the ledger renders alongside the other metrics on /metrics
+    name = "agentic_llm_tokens_total"
+    documentation = "LLM tokens by call type, model and kind (prompt, completion, cached)"
+    metric_type = "counter"
+    labelnames = ("call_type", "model", "kind")
+
+    def __init__(self, pricing: Dict = None):
+        # model -> {"prompt": USD per 1K tokens, "completion": USD per 1K tokens}
+        self.pricing = pricing or {}
+        self._lock = threading.Lock()
+        # (call_type, model, session) -> tuple ordered as _FIELDS
+        self._totals = {}
+        # (epoch second, call_type) -> (calls, prompt_tokens, completion_tokens)
+        self._window = {}
+
+    def record(self, call_type: str, model: str, usage=None, latency: float = 0.0, error: bool = False,
+               session_id: Optional[str] = None):
+        """Record one chat completion; usage is the response's `usage` object (or None)"""
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        session = session_id or current_session_id() or UNATTRIBUTED_SESSION
+
+        key = (call_type, model, session)
+        now = int(time.time())
+        with self._lock:
+            calls, errors, prompt, completion, cached, seconds = self._totals.get(key, (0, 0, 0, 0, 0, 0.0))
+            self._totals[key] = (calls + 1, errors + int(error), prompt + prompt_tokens,
+                                 completion + completion_tokens, cached + cached_tokens, seconds + latency)
+
+            window = self._window
+            calls, prompt, completion = window.get((now, call_type), (0, 0, 0))
+            window[(now, call_type)] = (calls + 1, prompt + prompt_tokens, completion + completion_tokens)
+            if len(window) > 2 * THROUGHPUT_WINDOW:
+                for stale in [bucket for bucket in window if bucket[0] <= now - THROUGHPUT_WINDOW]:
+                    del window[stale]
+
+    def _copy_totals(self) -> Dict:
+        with self._lock:
+            return self._totals.copy()
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """Estimated USD cost, or None when the model has no configured price"""
+        price = self.pricing.get(model)
+        if not price:
+            return None
+        return (prompt_tokens * price.get("prompt", 0.0) + completion_tokens * price.get("completion", 0.0)) / 1000.0
+
+    def throughput(self, call_types: Iterable[str] = None) -> Dict:
+        """Calls and tokens over the last minute"""
+        call_types = set(call_types) if call_types else None
+        cutoff = int(time.time()) - THROUGHPUT_WINDOW
+        with self._lock:
+            window = self._window.copy()
+        calls = prompt = completion = 0
+        for (second, call_type), (c, p, k) in window.items():
+            if second > cutoff and (call_types is None or call_type in call_types):
+                calls += c
+                prompt += p
+                completion += k
+        return {
+            "calls_per_minute": calls,
+            "prompt_tokens_per_minute": prompt,
+            "completion_tokens_per_minute": completion,
+            "tokens_per_minute": prompt + completion
+        }
+
+    def summary(self, call_types: Iterable[str] = None, session_id: str = None, top_sessions: int = 5) -> Dict:
+        """Usage totals grouped by call type, model and session, optionally filtered"""
+        call_types = set(call_types) if call_types else None
+        by_call_type, by_model, by_session = {}, {}, {}
+        total = self._empty_group()
+
+        for (call_type, model, session), values in self._copy_totals().items():
+            if call_types is not None and call_type not in call_types:
+                continue
+            if session_id is not None and session != session_id:
+                continue
+            cost = self.estimate_cost(model, values[2], values[3])
+            for group, name in ((by_call_type, call_type), (by_model, model), (by_session, session)):
+                self._accumulate(group.setdefault(name, self._empty_group()), values, cost)
+            self._accumulate(total, values, cost)
+
+        for group in (by_call_type, by_model, by_session, {"total": total}):
+            for entry in group.values():
+                entry["avg_latency_seconds"] = round(entry["latency_seconds"] / entry["calls"], 4) if entry["calls"] else 0.0
+                entry["latency_seconds"] = round(entry["latency_seconds"], 4)
+                entry["cached_ratio"] = round(entry["cached_tokens"] / entry["prompt_tokens"], 3) if entry["prompt_tokens"] else 0.0
+
+        # Most expensive sessions first (by tokens when no pricing is configured)
+        ranked_sessions = sorted(by_session.items(),
+                                 key=lambda item: (item[1]["cost_usd"] or 0.0, item[1]["total_tokens"]),
+                                 reverse=True)
+        return {
+            "total": total,
+            "by_call_type": by_call_type,
+            "by_model": by_model,
+            "top_sessions": dict(ranked_sessions[:top_sessions]),
+            "session_count": len(by_session),
+            "throughput": self.throughput(call_types)
+        }
+
+    def collect(self) -> List[str]:
+        """Prometheus lines for agentic_llm_tokens_total (sessions are left out to bound cardinality)"""
+        tokens = {}
+        for (call_type, model, _), values in self._copy_totals().items():
+            for kind, index in (("prompt", 2), ("completion", 3), ("cached", 4)):
+                key = (call_type, model, kind)
+                tokens[key] = tokens.get(key, 0) + values[index]
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+                for labels, value in sorted(tokens.items())]
+
+    def snapshot(self) -> Dict:
+        return self.summary()["by_call_type"]
+
+    @staticmethod
+    def _empty_group() -> Dict:
+        group = dict.fromkeys(_FIELDS, 0)
+        group["latency_seconds"] = 0.0
+        group["total_tokens"] = 0
+        group["cost_usd"] = 0.0
+        return group
+
+    @staticmethod
+    def _accumulate(group: Dict, values: tuple, cost: Optional[float]):
+        for field, value in zip(_FIELDS, values):
+            group[field] += value
+        group["total_tokens"] += values[2] + values[3]
+        # Cost is unknown as soon as one contributing model has no price
+        if cost is None or group["cost_usd"] is None:
+            group["cost_usd"] = None
+        else:
+            group["cost_usd"] = round(group["cost_usd"] + cost, 6)
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Process-wide usage ledger configured from the `usage` settings section"""
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                try:
+                    from utils.config import Config
+                    usage_config = Config().get('usage', {}) or {}
+                except Exception as e:
+                    print(f"Usage settings unavailable, reporting tokens without cost: {e}")
+                    usage_config = {}
+                ledger = UsageLedger(pricing=usage_config.get('pricing', {}))
+                REGISTRY.register(ledger)
+                _ledger = ledger
+    return _ledger
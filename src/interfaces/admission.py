@@ -0,0 +1,241 @@
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from core.metrics import (ADMISSION_WAIT, DEGRADED_MODE, DEGRADED_TURNS, TURNS_IN_FLIGHT, TURNS_QUEUED,
+                          TURNS_REJECTED)
+from utils.config import ConfigSnapshot, get_config, get_config_service
+
+
+class Admission:
+    """One admitted turn: whether it runs degraded, and whether it is a probe of the full path"""
+
+    __slots__ = ("degraded", "probe", "waited", "started", "counted")
+
+    def __init__(self, degraded: bool = False, probe: bool = False, waited: float = 0.0, counted: bool = True):
+        self.degraded = degraded
+        self.probe = probe
+        self.waited = waited
+        self.started = time.monotonic()
+        # False when admitted while admission control was off, so it holds no slot
+        self.counted = counted
+
+
+class AdmissionController:
+    """
+    Bounds the API turns running at once. A turn over max_in_flight waits up to max_wait seconds
+    for a slot, in a queue of at most max_queue; a turn that cannot be admitted is turned away
+    (429) with a Retry-After estimated from recent turn latency.
+
+    Degraded mode starts when degrade_queue_depth turns are waiting or the smoothed latency of
+    full turns passes degrade_latency; while no slot is free, the time since the last one was taken
+    counts as latency too, since turns that hang never finish to report theirs. New turns then run without the LLM,
+    outside the full-path slots: up to max_degraded_in_flight at once are admitted straight away,
+    and turns already waiting take that path too. One probe turn every probe_interval seconds still
+    takes a free full-path slot to keep measuring it. Degraded mode ends once a full-path slot is free,
+    the queue is under half of degrade_queue_depth and the latency is back under recover_latency
+    (an empty queue alone means little while degraded turns are what drain it).
+    """
+
+    def __init__(self, enabled: bool = True, max_in_flight: int = 8, max_queue: int = 32,
+                 max_wait: float = 10.0, degrade_queue_depth: int = 16, degrade_latency: float = 8.0,
+                 recover_latency: float = 3.0, probe_interval: float = 5.0, smoothing: float = 0.3,
+                 max_degraded_in_flight: int = 64):
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.degraded_in_flight = 0
+        # Start times of the full-path turns holding slots
+        self._running = {}
+        self.waiting = 0
+        self.latency = 0.0
+        self.degraded = False
+        self.degraded_since = None
+        self._next_probe = 0.0
+        self._probing = False
+        self.set_parameters(enabled, max_in_flight, max_queue, max_wait, degrade_queue_depth,
+                            degrade_latency, recover_latency, probe_interval, smoothing, max_degraded_in_flight)
+
+    def set_parameters(self, enabled: bool, max_in_flight: int, max_queue: int, max_wait: float,
+                       degrade_queue_depth: int, degrade_latency: float, recover_latency: float,
+                       probe_interval: float, smoothing: float, max_degraded_in_flight: int = 64):
+        with self._condition:
+            self.enabled = enabled
+            self.max_in_flight = max(1, int(max_in_flight))
+            self.max_queue = max(0, int(max_queue))
+            self.max_wait = max(0.0, float(max_wait))
+            self.degrade_queue_depth = max(1, int(degrade_queue_depth))
+            self.degrade_latency = float(degrade_latency)
+            self.recover_latency = min(float(recover_latency), self.degrade_latency)
+            self.probe_interval = float(probe_interval)
+            self.smoothing = min(max(float(smoothing), 0.01), 1.0)
+            self.max_degraded_in_flight = max(1, int(max_degraded_in_flight))
+            # A raised limit can admit waiting turns at once
+            self._condition.notify_all()
+
+    def apply_settings(self, snapshot: ConfigSnapshot):
+        """Take new limits and thresholds from a reloaded config snapshot"""
+        self.set_parameters(**admission_parameters(snapshot.section('admission')))
+
+    def acquire(self) -> Optional[Admission]:
+        """Admit a turn, waiting for a slot if needed; None when it should be turned away"""
+        if not self.enabled:
+            return Admission(counted=False)
+        with self._condition:
+            self._update_mode()
+            admission = self._admit(0.0)
+            if admission is None:
+                if self.waiting >= self.max_queue:
+                    TURNS_REJECTED.inc("queue_full")
+                    return None
+                start = time.monotonic()
+                deadline = start + self.max_wait
+                self.waiting += 1
+                TURNS_QUEUED.set(self.waiting)
+                self._update_mode()
+                try:
+                    while admission is None:
+                        now = time.monotonic()
+                        admission = self._admit(now - start)
+                        if admission is not None:
+                            break
+                        if now >= deadline:
+                            TURNS_REJECTED.inc("wait_timeout")
+                            return None
+                        # Wake when held slots would count as slow enough to switch to degraded mode
+                        self._condition.wait(min(deadline, self._stall_deadline()) - now)
+                        self._update_mode()
+                finally:
+                    self.waiting -= 1
+                    TURNS_QUEUED.set(self.waiting)
+        ADMISSION_WAIT.observe(admission.waited)
+        if admission.degraded:
+            DEGRADED_TURNS.inc()
+        return admission
+
+    def release(self, admission: Admission, turns: int = 1):
+        """Free the turn's slot; full turns update the smoothed latency (per turn, when one
+        admission ran several)"""
+        if not admission.counted:
+            return
+        elapsed = (time.monotonic() - admission.started) / max(turns, 1)
+        with self._condition:
+            if admission.degraded:
+                self.degraded_in_flight = max(0, self.degraded_in_flight - 1)
+            else:
+                self._running.pop(admission, None)
+                self.in_flight = max(0, self.in_flight - 1)
+                TURNS_IN_FLIGHT.set(self.in_flight)
+                self.latency += self.smoothing * (elapsed - self.latency)
+            if admission.probe:
+                self._probing = False
+            self._update_mode()
+            # Waiters may want either kind of slot
+            self._condition.notify_all()
+
+    def route(self) -> bool:
+        """Whether a turn run outside admission (e.g. a background job) should run degraded"""
+        return self.enabled and self.degraded
+
+    def _admit(self, waited: float) -> Optional[Admission]:
+        """Admission for a turn if one of its kind of slot is free (caller holds the condition)"""
+        now = time.monotonic()
+        if self.degraded:
+            probe = not self._probing and now >= self._next_probe and self.in_flight < self.max_in_flight
+            if not probe:
+                if self.degraded_in_flight >= self.max_degraded_in_flight:
+                    return None
+                self.degraded_in_flight += 1
+                return Admission(degraded=True, waited=waited)
+        if self.in_flight >= self.max_in_flight:
+            return None
+        admission = Admission(waited=waited)
+        if self.degraded:
+            admission.probe = self._probing = True
+            self._next_probe = now + self.probe_interval
+        self.in_flight += 1
+        TURNS_IN_FLIGHT.set(self.in_flight)
+        self._running[admission] = admission.started
+        return admission
+
+    def _stall_latency(self) -> float:
+        """How long every full-path slot has been held, or 0 while one is free"""
+        if self.in_flight < self.max_in_flight or not self._running:
+            return 0.0
+        return time.monotonic() - max(self._running.values())
+
+    def _stall_deadline(self) -> float:
+        """When held slots will count as slower than degrade_latency (monotonic time)"""
+        if self.degraded or self.in_flight < self.max_in_flight or not self._running:
+            return math.inf
+        return max(self._running.values()) + self.degrade_latency
+
+    def _update_mode(self):
+        latency = max(self.latency, self._stall_latency())
+        if not self.degraded:
+            if self.waiting >= self.degrade_queue_depth or latency > self.degrade_latency:
+                self.degraded = True
+                self.degraded_since = time.time()
+                self._next_probe = time.monotonic() + self.probe_interval
+                DEGRADED_MODE.set(1)
+                print(f"Entering degraded mode: {self.waiting} turns waiting, "
+                      f"turn latency {latency:.2f}s; new turns run without the LLM")
+                # Waiting turns can now run degraded
+                self._condition.notify_all()
+        elif (self.waiting < self.degrade_queue_depth / 2 and latency <= self.recover_latency
+              and self.in_flight < self.max_in_flight):
+            self.degraded = False
+            self.degraded_since = None
+            DEGRADED_MODE.set(0)
+            print(f"Leaving degraded mode: turn latency {latency:.2f}s")
+
+    def retry_after(self) -> int:
+        """Seconds a turned-away client should wait: time for the queue ahead of it to drain"""
+        drain = max(self.latency, 0.5) * (self.waiting + 1) / self.max_in_flight
+        return min(60, max(1, math.ceil(drain)))
+
+    def status(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "in_flight": self.in_flight,
+            "degraded_in_flight": self.degraded_in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "turn_latency_seconds": round(self.latency, 3),
+            "degraded": self.degraded,
+            "degraded_since": self.degraded_since
+        }
+
+
+def admission_parameters(admission_config: Dict) -> Dict:
+    """AdmissionController keyword arguments from the `admission` settings section"""
+    return {
+        "enabled": admission_config.get('enabled', True),
+        "max_in_flight": admission_config.get('max_in_flight', 8),
+        "max_queue": admission_config.get('max_queue', 32),
+        "max_wait": admission_config.get('max_wait_seconds', 10.0),
+        "degrade_queue_depth": admission_config.get('degrade_queue_depth', 16),
+        "degrade_latency": admission_config.get('degrade_latency_seconds', 8.0),
+        "recover_latency": admission_config.get('recover_latency_seconds', 3.0),
+        "probe_interval": admission_config.get('probe_interval_seconds', 5.0),
+        "smoothing": admission_config.get('latency_smoothing', 0.3),
+        "max_degraded_in_flight": admission_config.get('max_degraded_in_flight', 64)
+    }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission() -> AdmissionController:
+    """Process-wide admission controller configured from the `admission` settings section,
+    following edits to it without a restart"""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                controller = AdmissionController(**admission_parameters(get_config().section('admission')))
+                get_config_service().subscribe(controller.apply_settings)
+                _controller = controller
+    return _controller
@@ -1,33 +1,116 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, render_template_string
+from contextlib import nullcontext
 import sys
 import os
+import json
+import threading
 import time
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
 
 # Add src directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from agents.specialized_agents import AgentA, AgentB
-from core.memory import Memory
-from core.reasoning import Reasoning
-from utils.config import load_config
+from core.biometric_stream import SAMPLE_DTYPES, get_biometric_streams
+from core.llm_service import degraded_scope
+from core.memory_tracking import start_tracing, tracing_summary
+from core.metrics import REGISTRY, process_rss_bytes, timed_stage
+from core.profiling import get_profiler
+from core.tracing import current_trace_id, get_tracer
+from core.turn_features import TurnFeatures
+from core.usage import get_usage_ledger, session_scope
+from interfaces.admission import Admission, get_admission
+from interfaces.events import format_event, get_event_bus
+from interfaces.jobs import JobManager, ScenarioJob, load_scenario_file, parse_scenarios, resolve_scenario_file
+from interfaces.responses import FastJSONProvider, compress_response, parse_fields, select_fields, subfields, wants
+from interfaces.session_store import SessionConflict, create_session_store
+from interfaces.sessions import ConversationSession, SessionRegistry
+from utils.config import get_config, get_config_service
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+
+config = get_config()
+session_memory_ceiling = int(config.api.session_memory_ceiling_mb * 2**20)
+
+# Built on first request (or in the background by create_app), not at import
+_llm_service = None
+_sessions = None
+_state_lock = threading.Lock()
+
+def get_sessions() -> SessionRegistry:
+    """Conversation state per session id (X-Session-ID header, session_id field or query parameter)"""
+    global _llm_service, _sessions
+    if _sessions is None:
+        with _state_lock:
+            if _sessions is None:
+                # One LLM service (and one connection test) shared by every session's components
+                try:
+                    from core.llm_service import LLMService
+                    _llm_service = LLMService()
+                except Exception as e:
+                    print(f"Warning: LLM service unavailable, using fallback responses: {e}")
+                store = create_session_store(config.api.session_store, config.api.session_store_path)
+                if store is not None:
+                    # Conversations are shared, but streamed samples and event channels are not
+                    print("Note: biometric streams and /api/events stay in the worker that receives them; "
+                          "route each session's requests to one worker (sticky sessions) to use them")
+                _sessions = SessionRegistry(
+                    config.settings['agent_parameters'],
+                    _llm_service,
+                    max_sessions=config.api.max_sessions,
+                    idle_timeout=config.api.session_idle_seconds,
+                    store=store
+                )
+    return _sessions
+
+def get_llm_service():
+    """The shared LLM service, or None when it could not be created"""
+    get_sessions()
+    return _llm_service
+
+_jobs = None
+_jobs_lock = threading.Lock()
 
-# Initialize the AI system
-config = load_config()
-memory = Memory()
-reasoning = Reasoning()
+def get_jobs() -> JobManager:
+    """Background scenario jobs, run on the worker pool configured in the `jobs` section"""
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                jobs_config = config.section('jobs')
+                _jobs = JobManager(
+                    job_session,
+                    run_job_turn,
+                    workers=jobs_config.get('workers', 4),
+                    max_jobs=jobs_config.get('max_jobs', 100),
+                    retention=jobs_config.get('retention_seconds', 3600),
+                    max_turns=jobs_config.get('max_turns', 10000),
+                    on_update=publish_job_event
+                )
+    return _jobs
 
-# Initialize agents
-agent_a_config = config['agent_parameters']['agent_a']
-agent_b_config = config['agent_parameters']['agent_b']
+def create_app(preload: bool = False) -> Flask:
+    """The app, ready to serve at once. With preload, the LLM client, connection test and
+    the default session are built on a background thread instead of by the first request."""
+    # Apply settings.yaml edits (model settings, thresholds) while serving
+    get_config_service().start_watching()
+    if preload:
+        threading.Thread(target=_preload, name="api-preload", daemon=True).start()
+    return app
 
-agent_a = AgentA(name=agent_a_config['name'], tone=agent_a_config['tone'])
-agent_b = AgentB(name=agent_b_config['name'], tone=agent_b_config['tone'])
+def _preload():
+    service = get_llm_service()
+    if service is not None:
+        service.start_probe()
+        service.client  # imports openai off the request path
+    get_sessions().get('api')
 
-# Global turn counter for the API
-turn_counter = 0
+# Allocation tracing for /admin/memory; costs CPU on every allocation, so off unless configured
+tracemalloc_frames = config.section('profiling').get('tracemalloc_frames', 0)
+if tracemalloc_frames:
+    start_tracing(tracemalloc_frames)
 
 @app.route('/', methods=['GET'])
 def dashboard():
@@ -89,6 +172,32 @@ def dashboard():
         </div>
         
         <script>
+            // Alerts, biometrics and status are pushed over /api/events while it is connected
+            const sessionId = 'dashboard-' + Math.random().toString(36).slice(2);
+            let currentStatus = {};
+            let streaming = false;
+            
+            function connectEvents() {
+                const events = new EventSource('/api/events?session_id=' + sessionId);
+                events.onopen = () => { streaming = true; };
+                events.onerror = () => { streaming = false; };
+                events.addEventListener('status', event => {
+                    currentStatus = Object.assign(currentStatus, JSON.parse(event.data));
+                    updateStatus(currentStatus);
+                });
+                events.addEventListener('alert', event => {
+                    showAlerts([JSON.parse(event.data).message]);
+                });
+                events.addEventListener('biometric_alert', event => {
+                    const data = JSON.parse(event.data);
+                    showAlerts([data.active ? 'Biometric alert: heart rate ' + Math.round(data.heart_rate) +
+                                ' bpm, HRV ' + Math.round(data.hrv) : 'Biometric alert cleared']);
+                });
+                events.addEventListener('reset', () => {
+                    currentStatus = {};
+                });
+            }
+            
             function handleKeyPress(event) {
                 if (event.key === 'Enter') {
                     sendMessage();
@@ -104,9 +213,9 @@ def dashboard():
                 addToConversation('You: ' + message, 'user');
                 
                 try {
-                    const response = await fetch('/api/send_input', {
+                    const response = await fetch('/api/send_input?view=' + (streaming ? 'replies' : 'minimal'), {
                         method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
+                        headers: { 'Content-Type': 'application/json', 'X-Session-ID': sessionId },
                         body: JSON.stringify({ input: message })
                     });
                     
@@ -121,14 +230,14 @@ def dashboard():
                         addToConversation('Agent B (Monitor): ' + data.agent_b_response, 'intervention');
                     }
                     
-                    // Display alerts
-                    if (data.alerts && data.alerts.length > 0) {
-                        showAlerts(data.alerts);
+                    // Alerts and status arrive as events while streaming
+                    if (!streaming) {
+                        if (data.alerts && data.alerts.length > 0) {
+                            showAlerts(data.alerts);
+                        }
+                        updateStatus(data.status);
                     }
                     
-                    // Update status
-                    updateStatus(data.status);
-                    
                 } catch (error) {
                     console.error('Error:', error);
                     addToConversation('System Error: Could not process message', 'error');
@@ -137,9 +246,11 @@ def dashboard():
             
             async function getStatus() {
                 try {
-                    const response = await fetch('/api/system_status');
-                    const data = await response.json();
-                    updateStatus(data);
+                    const response = await fetch('/api/system_status?view=minimal', {
+                        headers: { 'X-Session-ID': sessionId }
+                    });
+                    currentStatus = await response.json();
+                    updateStatus(currentStatus);
                 } catch (error) {
                     console.error('Error:', error);
                 }
@@ -147,11 +258,24 @@ def dashboard():
             
             async function runDemo() {
                 try {
-                    const response = await fetch('/api/run_demo', { method: 'POST' });
-                    const data = await response.json();
+                    // Runs as a background job in this session; turns are shown as they finish
+                    const response = await fetch('/api/jobs', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json', 'X-Session-ID': sessionId },
+                        body: JSON.stringify({})
+                    });
+                    const job = await response.json();
+                    if (!response.ok) {
+                        addToConversation('Demo Error: ' + job.error, 'error');
+                        return;
+                    }
                     
-                    if (data.demo_results) {
-                        data.demo_results.forEach(result => {
+                    let shown = 0;
+                    while (true) {
+                        const data = await (await fetch(job.status_url)).json();
+                        const turns = data.results[0].turns;
+                        for (; shown < turns.length; shown++) {
+                            const result = turns[shown];
                             addToConversation('Demo: ' + result.input, 'user');
                             if (result.agent_a_response) {
                                 addToConversation('Agent A: ' + result.agent_a_response, 'agent');
@@ -159,10 +283,12 @@ def dashboard():
                             if (result.agent_b_response) {
                                 addToConversation('Agent B: ' + result.agent_b_response, 'intervention');
                             }
-                            if (result.alerts && result.alerts.length > 0) {
+                            if (!streaming && result.alerts && result.alerts.length > 0) {
                                 showAlerts(result.alerts);
                             }
-                        });
+                        }
+                        if (['completed', 'failed', 'cancelled'].includes(data.status)) break;
+                        await new Promise(resolve => setTimeout(resolve, 1000));
                     }
                     
                 } catch (error) {
@@ -199,204 +325,588 @@ def dashboard():
                     <p><strong>Emotional Progression:</strong> ${(status.emotional_progression || []).join(' → ')}</p>
                 `;
             }
+            
+            connectEvents();
         </script>
     </body>
     </html>
     """
     return dashboard_html
 
+def trace_forced() -> bool:
+    """Whether the caller asked for this request to be traced regardless of sampling"""
+    return request.headers.get('X-Trace', '').lower() in ('1', 'true', 'yes')
+
+# Fields kept by each endpoint's views; "full" (the default) returns everything.
+# "minimal" is what the dashboard reads.
+MINIMAL_STATUS_FIELDS = ('total_interactions', 'coherence_events', 'stress_level', 'llm_available',
+                         'emotional_progression')
+RESPONSE_VIEWS = {
+    'send_input': {'minimal': ('agent_a_response', 'agent_b_response', 'alerts') +
+                              tuple(f'status.{field}' for field in MINIMAL_STATUS_FIELDS),
+                   # Just the replies, for a dashboard that gets alerts and status as events
+                   'replies': ('agent_a_response', 'agent_b_response')},
+    'system_status': {'minimal': MINIMAL_STATUS_FIELDS},
+    'run_demo': {'minimal': ('demo_results',)}
+}
+
+def requested_fields(endpoint: str) -> Optional[List[str]]:
+    """Fields the caller asked for with ?fields=a,b.c or ?view=minimal|full (either may also be sent
+    in the JSON body); None for the full response"""
+    body = request.get_json(silent=True) or {}
+    fields = parse_fields(request.args.get('fields') or body.get('fields'))
+    if fields is not None:
+        return fields
+    view = request.args.get('view') or body.get('view') or get_config().api.default_view
+    views = RESPONSE_VIEWS[endpoint]
+    return list(views[view]) if view in views else None
+
+def trimmed(payload: Dict, fields: Optional[List[str]]) -> Dict:
+    return payload if fields is None else select_fields(payload, fields)
+
+def request_session_id() -> str:
+    """Session that the request's LLM usage is attributed to"""
+    body = request.get_json(silent=True) or {}
+    return (request.headers.get('X-Session-ID') or body.get('session_id') or
+            request.args.get('session_id') or 'api')
+
+def current_session() -> ConversationSession:
+    """Conversation state for the request's session"""
+    return get_sessions().get(request_session_id())
+
+def admin_authorized() -> bool:
+    """Whether the request carries the configured admin token"""
+    return get_profiler().is_authorized(request.headers.get('X-Admin-Token'))
+
+@app.after_request
+def add_diagnostic_headers(response):
+    """Tell the caller which trace and profile recorded their request"""
+    trace_id = getattr(request, 'trace_id', None)
+    if trace_id:
+        response.headers['X-Trace-Id'] = trace_id
+    profile_id = getattr(request, 'profile_id', None)
+    if profile_id:
+        response.headers['X-Profile-Id'] = profile_id
+    return response
+
+@app.after_request
+def compress(response):
+    """gzip (brotli when installed) larger JSON and HTML responses for clients that accept it"""
+    api_settings = get_config().api
+    return compress_response(response, request.accept_encodings, api_settings.compression_min_bytes,
+                             api_settings.compression_level)
+
+def overloaded():
+    """429 for a turn that could not be admitted, with when to retry"""
+    retry_after = get_admission().retry_after()
+    response = jsonify({'error': 'Server busy, retry later', 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def conflict(error: SessionConflict):
+    """Another worker ran a turn of the session at the same time; nothing of this one was kept"""
+    return jsonify({'error': str(error), 'retry': True}), 409
+
+def mark_degraded(response, admission: Admission):
+    """Tell the caller the turn ran without the LLM"""
+    if admission.degraded:
+        response.headers['X-Degraded'] = '1'
+    return response
+
 @app.route('/api/send_input', methods=['POST'])
 def send_input():
     """Process user input through the agentic AI system"""
-    global turn_counter
-    
     try:
-        user_input = request.json.get('input', '')
+        user_input = (request.json or {}).get('input', '')
         if not user_input:
             return jsonify({'error': 'No input provided'}), 400
         
-        turn_counter += 1
-        
-        # Process through reasoning system
-        emotional_analysis = reasoning.analyze_input(user_input, turn_counter)
-        
-        # Calculate emotional intensity and simulate biometrics
-        emotional_intensity = calculate_emotional_intensity(emotional_analysis)
-        stress_factor = emotional_analysis.get("coherence_status") != "stable"
-        biometric_data = memory.simulate_biometric_response(emotional_intensity, stress_factor * 0.5)
-        
-        # Store interaction
-        memory.store_interaction(user_input, emotional_analysis, turn_counter)
-        
-        # Get memory context
-        memory_context = memory.get_conversation_context()
+        # Profile this one request when an authorized X-Profile header is sent
+        profile_scope = nullcontext()
+        profile_token = request.headers.get('X-Profile')
+        if profile_token:
+            profiler = get_profiler()
+            if not profiler.is_authorized(profile_token):
+                return jsonify({'error': 'Profiling not authorized'}), 403
+            profile_scope = profiler.profile("send_input", request.headers.get('X-Profile-Mode', 'cprofile'))
         
-        # Agent A responds
-        agent_a_response = agent_a.respond(user_input, emotional_analysis, memory_context)
-        memory.store_agent_response(agent_a.name, agent_a_response, "supportive")
-        
-        # Agent B monitors and potentially intervenes
-        monitoring_result = agent_b.monitor_emotional_drift(
-            memory.get_past_interactions(), 
-            emotional_analysis
-        )
-        
-        agent_b_response = None
-        if monitoring_result.get("intervention_needed"):
-            agent_b_response = agent_b.recursive_response(
-                user_input, emotional_analysis, monitoring_result
-            )
-            if agent_b_response:
-                memory.store_agent_response(agent_b.name, agent_b_response, "intervention")
-        
-        # Prepare response
-        response_data = {
-            'agent_a_response': agent_a_response,
-            'agent_b_response': agent_b_response,
-            'emotional_analysis': emotional_analysis,
-            'alerts': emotional_analysis.get('alerts', []),
-            'biometric_data': biometric_data,
-            'monitoring_result': monitoring_result,
-            'status': get_system_status_data()
-        }
+        fields = requested_fields('send_input')
+        session = current_session()
+        admission = get_admission().acquire()
+        if admission is None:
+            return overloaded()
+        try:
+            with degraded_scope(admission.degraded), profile_scope, get_sessions().turn(session), \
+                    session_scope(session.session_id), \
+                    get_tracer().trace("send_input", force=trace_forced(), turn=session.turn_counter + 1):
+                request.trace_id = current_trace_id()
+                turn = run_turn(session, user_input)
+                publish_turn_events(session, turn)
+                
+                # Prepare response
+                response_data = {
+                    'agent_a_response': turn['agent_a_response'],
+                    'agent_b_response': turn['agent_b_response'],
+                    'emotional_analysis': turn['emotional_analysis'],
+                    'alerts': turn['emotional_analysis'].get('alerts', []),
+                    'biometric_data': turn['biometric_data'],
+                    'monitoring_result': turn['monitoring_result']
+                }
+                if wants(fields, 'status'):
+                    response_data['status'] = get_system_status_data(session, subfields(fields, 'status'))
+        finally:
+            get_admission().release(admission)
         
-        return jsonify(response_data)
+        if getattr(profile_scope, 'profile_id', None):
+            request.profile_id = profile_scope.profile_id
+        return mark_degraded(jsonify(trimmed(response_data, fields)), admission)
         
+    except SessionConflict as e:
+        return conflict(e)
     except Exception as e:
         return jsonify({'error': f'Processing error: {str(e)}'}), 500
 
 @app.route('/api/system_status', methods=['GET'])
 def get_system_status():
     """Get comprehensive system status"""
-    return jsonify(get_system_status_data())
+    fields = requested_fields('system_status')
+    return jsonify(trimmed(get_system_status_data(current_session(), fields), fields))
+
+DEMO_SCENARIOS = [
+    "I'm feeling great today, everything is going well!",
+    "Actually, I'm not sure... maybe I'm not feeling that great",
+    "I keep thinking about this over and over, I can't stop worrying about it",
+    "I love my job but I also hate it, I don't know what to think",
+    "I'm fine, everything is fine, but nothing feels right"
+]
 
 @app.route('/api/run_demo', methods=['POST'])
 def run_demo():
-    """Run automated demo scenarios"""
-    global turn_counter
-    
-    demo_scenarios = [
-        "I'm feeling great today, everything is going well!",
-        "Actually, I'm not sure... maybe I'm not feeling that great",
-        "I keep thinking about this over and over, I can't stop worrying about it",
-        "I love my job but I also hate it, I don't know what to think",
-        "I'm fine, everything is fine, but nothing feels right"
-    ]
-    
+    """Run automated demo scenarios within the request (POST /api/jobs runs them in the background)"""
     demo_results = []
     
     try:
-        for scenario in demo_scenarios:
-            turn_counter += 1
-            
-            # Process scenario
-            emotional_analysis = reasoning.analyze_input(scenario, turn_counter)
-            emotional_intensity = calculate_emotional_intensity(emotional_analysis)
-            stress_factor = emotional_analysis.get("coherence_status") != "stable"
-            
-            memory.simulate_biometric_response(emotional_intensity, stress_factor * 0.5)
-            memory.store_interaction(scenario, emotional_analysis, turn_counter)
-            
-            memory_context = memory.get_conversation_context()
-            
-            # Get agent responses
-            agent_a_response = agent_a.respond(scenario, emotional_analysis, memory_context)
-            memory.store_agent_response(agent_a.name, agent_a_response, "supportive")
-            
-            monitoring_result = agent_b.monitor_emotional_drift(
-                memory.get_past_interactions(), 
-                emotional_analysis
-            )
-            
-            agent_b_response = None
-            if monitoring_result.get("intervention_needed"):
-                agent_b_response = agent_b.recursive_response(
-                    scenario, emotional_analysis, monitoring_result
-                )
-                if agent_b_response:
-                    memory.store_agent_response(agent_b.name, agent_b_response, "intervention")
-            
-            demo_results.append({
-                'input': scenario,
-                'agent_a_response': agent_a_response,
-                'agent_b_response': agent_b_response,
-                'alerts': emotional_analysis.get('alerts', []),
-                'emotional_state': emotional_analysis.get('emotional_state', 'neutral')
-            })
+        fields = requested_fields('run_demo')
+        session = current_session()
+        # The demo's turns share one admission
+        admission = get_admission().acquire()
+        if admission is None:
+            return overloaded()
+        try:
+            for scenario in DEMO_SCENARIOS:
+                with degraded_scope(admission.degraded), get_sessions().turn(session), \
+                        session_scope(session.session_id), get_tracer().trace("demo_turn", force=trace_forced(), turn=session.turn_counter + 1):
+                    turn = run_turn(session, scenario)
+                    publish_turn_events(session, turn)
+                
+                demo_results.append({
+                    'input': scenario,
+                    'agent_a_response': turn['agent_a_response'],
+                    'agent_b_response': turn['agent_b_response'],
+                    'alerts': turn['emotional_analysis'].get('alerts', []),
+                    'emotional_state': turn['emotional_analysis'].get('emotional_state', 'neutral')
+                })
+        finally:
+            get_admission().release(admission, turns=len(DEMO_SCENARIOS))
         
-        return jsonify({
-            'demo_results': demo_results,
-            'final_status': get_system_status_data()
-        })
+        response_data = {'demo_results': demo_results}
+        if wants(fields, 'final_status'):
+            response_data['final_status'] = get_system_status_data(session, subfields(fields, 'final_status'))
+        return mark_degraded(jsonify(trimmed(response_data, fields)), admission)
         
+    except SessionConflict as e:
+        return conflict(e)
     except Exception as e:
         return jsonify({'error': f'Demo error: {str(e)}'}), 500
 
+def run_turn(session: ConversationSession, user_input: str) -> Dict:
+    """Run one turn of the session through analysis, memory and both agents"""
+    memory, reasoning = session.memory, session.reasoning
+    agent_a, agent_b = session.agent_a, session.agent_b
+    session.turn_counter += 1
+    turn_counter = session.turn_counter
+    
+    # Process through reasoning system
+    features = TurnFeatures(user_input)
+    emotional_analysis = reasoning.analyze_input(user_input, turn_counter, features)
+    
+    # Simulate biometrics from the turn's emotional intensity; streamed samples take precedence
+    memory.biometric_stream = get_biometric_streams().get(session.session_id)
+    memory.simulate_biometric_response(features.intensity, features.stress_factor)
+    biometric_data = memory.get_current_biometrics()
+    
+    # Store interaction
+    memory.store_interaction(user_input, emotional_analysis, turn_counter, features)
+    
+    # Get memory context
+    memory_context = memory.get_conversation_context()
+    
+    # Agent A responds
+    agent_a_response = agent_a.respond(user_input, emotional_analysis, memory_context)
+    memory.store_agent_response(agent_a.name, agent_a_response, "supportive")
+    
+    # Agent B monitors and potentially intervenes
+    monitoring_result = agent_b.monitor_emotional_drift(
+        memory.get_past_interactions(), 
+        emotional_analysis,
+        memory.stress_level
+    )
+    
+    agent_b_response = None
+    if monitoring_result.get("intervention_needed"):
+        agent_b_response = agent_b.recursive_response(
+            user_input, emotional_analysis, monitoring_result
+        )
+        if agent_b_response:
+            memory.store_agent_response(agent_b.name, agent_b_response, "intervention")
+    
+    return {
+        'agent_a_response': agent_a_response,
+        'agent_b_response': agent_b_response,
+        'emotional_analysis': emotional_analysis,
+        'biometric_data': biometric_data,
+        'monitoring_result': monitoring_result
+    }
+
+def publish_biometrics(session: ConversationSession):
+    """Push the session's current readings, and the biometric alert when it switches on or off"""
+    bus = get_event_bus()
+    channel = bus.channel(session.session_id)
+    if channel is None:
+        return
+    readings = session.memory.get_current_biometrics()
+    bus.publish(session.session_id, 'biometrics', readings)
+    alert = session.memory.is_biometric_alert()
+    if alert != channel.biometric_alert:
+        channel.biometric_alert = alert
+        bus.publish(session.session_id, 'biometric_alert', {'active': alert, **readings})
+
+def publish_turn_events(session: ConversationSession, turn: Dict):
+    """Push a turn's alerts, biometrics and status changes to the session's event streams.
+    Nothing is computed when no dashboard is watching the session."""
+    bus = get_event_bus()
+    if not bus.watched(session.session_id):
+        return
+    for alert in turn['emotional_analysis'].get('alerts', []):
+        bus.publish(session.session_id, 'alert', {'message': alert, 'source': 'analysis',
+                                                  'turn': session.turn_counter})
+    for alert in turn['monitoring_result'].get('alerts_generated', []):
+        bus.publish(session.session_id, 'alert', {'message': alert, 'source': 'agent_b',
+                                                  'turn': session.turn_counter})
+    publish_biometrics(session)
+    bus.publish_status(session.session_id, stream_status(session))
+
+def stream_status(session: ConversationSession) -> Dict:
+    """The status fields pushed to event streams: the dashboard's minimal view"""
+    fields = list(MINIMAL_STATUS_FIELDS)
+    return select_fields(get_system_status_data(session, fields), fields)
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """Server-sent events for a session (?session_id=, since EventSource cannot send headers):
+    `alert`, `biometrics`, `biometric_alert` and `status` (only the fields that changed).
+    A new stream starts with the full status; a reconnect with Last-Event-ID replays what it missed,
+    or gets the full status when this worker's channel never issued that id."""
+    session_id = request_session_id()
+    return event_stream(session_id, 'status', lambda: stream_status(get_sessions().get(session_id)))
+
+def event_stream(channel_key: str, snapshot_type: str, snapshot: Callable[[], Dict],
+                 finished: Callable[[], bool] = None) -> Response:
+    """Server-sent event response for a bus channel. `snapshot` builds the full state sent first
+    (and again when a reconnect missed more than the ring holds); the stream ends once `finished`
+    returns True and nothing more is pending."""
+    bus = get_event_bus()
+    channel = bus.open_stream(channel_key)
+    if channel is None:
+        return jsonify({'error': 'Too many event streams'}), 503
+    events_config = get_config().section('events')
+    keepalive = float(events_config.get('keepalive_seconds', 15))
+    max_seconds = float(events_config.get('max_connection_seconds', 300))
+    resume_from = request.headers.get('Last-Event-ID', type=int)
+    
+    def full_state() -> bytes:
+        # Labelled with the channel's latest event id, so a reconnect resumes after it
+        return format_event(channel.last_id, snapshot_type, snapshot())
+    
+    def generate():
+        try:
+            # An id past the channel's latest was issued by an earlier channel or another worker
+            resumable = resume_from is not None and resume_from <= channel.last_id
+            after_id = resume_from if resumable else channel.last_id
+            yield b"retry: 3000\n\n" + (b"" if resumable else full_state())
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                events, complete = channel.read(after_id, keepalive)
+                if not complete:
+                    # Some missed events already left the ring
+                    after_id = channel.last_id
+                    yield full_state()
+                elif events:
+                    after_id = events[-1][0]
+                    yield b"".join(frame for _, frame in events)
+                elif finished is not None and finished():
+                    break
+                else:
+                    yield b": keepalive\n\n"
+        finally:
+            bus.close_stream(channel)
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def job_session(session_id: str, shared: bool) -> ConversationSession:
+    """Session for a job's scenario: the API session of that id, or a private one used only by the job"""
+    sessions = get_sessions()
+    if shared:
+        return sessions.get(session_id)
+    return ConversationSession(session_id, config.settings['agent_parameters'], _llm_service, stored=False)
+
+def run_job_turn(session: ConversationSession, user_input: str) -> Dict:
+    """One scenario turn, run like an API turn, with the biometric alert it left behind.
+    Job turns are bounded by the job workers rather than admitted, but follow degraded mode."""
+    with degraded_scope(get_admission().route()), get_sessions().turn(session), session_scope(session.session_id), \
+            get_tracer().trace("job_turn", turn=session.turn_counter + 1):
+        turn = run_turn(session, user_input)
+        publish_turn_events(session, turn)
+        turn['biometric_alert'] = session.memory.is_biometric_alert()
+    return turn
+
+def publish_job_event(job: ScenarioJob, event: str, index: Optional[int]):
+    """Push job progress to streams on /api/jobs/<id>/events"""
+    bus = get_event_bus()
+    channel_key = f"job:{job.id}"
+    if not bus.watched(channel_key):
+        return
+    if event == 'scenario':
+        bus.publish(channel_key, 'scenario', job.to_dict(index, 1)['results'][0])
+    else:
+        bus.publish(channel_key, event, job.summary())
+
+def job_location(job: ScenarioJob) -> Dict:
+    return {'status_url': f'/api/jobs/{job.id}', 'events_url': f'/api/jobs/{job.id}/events'}
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a scenario job and return its id at once (202); poll the status URL or stream the events URL.
+    Send {"scenarios": [...]} in the transcript corpus format, {"scenario_file": "name.jsonl"} for a
+    file in `jobs.scenario_dir`, or JSONL as application/x-ndjson. With neither, the demo runs in the
+    caller's session. "session_id" runs every scenario in that session, in order; otherwise each
+    scenario gets a private session and they run in parallel."""
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            body = {}
+            records = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        else:
+            body = request.get_json(silent=True) or {}
+            records = body.get('scenarios')
+            if records is None and body.get('scenario_file'):
+                scenario_dir = config.section('jobs').get('scenario_dir', 'data')
+                records = load_scenario_file(resolve_scenario_file(scenario_dir, str(body['scenario_file'])))
+        name = body.get('name') or request.args.get('name') or body.get('scenario_file')
+        session_id = body.get('session_id') or request.args.get('session_id')
+        if records is None:
+            records = [{'id': 'demo', 'turns': DEMO_SCENARIOS}]
+            name = name or 'demo'
+            session_id = session_id or request_session_id()
+        scenarios = parse_scenarios(records, session_id)
+        job = get_jobs().submit(scenarios, name)
+    except (ValueError, OSError) as e:
+        return jsonify({'error': f'Invalid scenarios: {str(e)}'}), 400
+    if job is None:
+        return jsonify({'error': 'Too many jobs; wait for some to finish'}), 503
+    response = jsonify({**job.summary(), **job_location(job)})
+    response.status_code = 202
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Summaries of queued, running and recently finished jobs"""
+    jobs = get_jobs()
+    return jsonify({'jobs': jobs.summaries(), **jobs.status()})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """A job's progress and results so far. ?offset=&limit= page through scenarios; ?results=0 omits them"""
+    job = get_jobs().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if request.args.get('results') in ('0', 'false', 'no'):
+        return jsonify({**job.summary(), **job_location(job)})
+    offset = max(request.args.get('offset', default=0, type=int), 0)
+    limit = request.args.get('limit', default=100, type=int)
+    return jsonify({**job.to_dict(offset, limit), **job_location(job)})
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a job: running scenarios stop after their current turn, the rest are skipped"""
+    job = get_jobs().cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.summary())
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """Server-sent job events: `progress` after each turn, `scenario` with each finished scenario's
+    results and `done`. Starts with the current progress; ends soon after the job finishes."""
+    job = get_jobs().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return event_stream(f"job:{job.id}", 'progress', job.summary, lambda: job.finished)
+
+@app.route('/api/biometrics/ingest', methods=['POST'])
+def ingest_biometrics():
+    """Bulk-ingest RR intervals (kind=rr, ms) or heart rate (kind=hr, bpm) for a session.
+    Send raw little-endian samples as application/octet-stream with ?dtype=float32|float64|uint16,
+    or JSON {"samples": [...], "kind": "rr"}. Samples stay in this worker: with several workers,
+    a session's ingestion and turns have to reach the same one."""
+    kind = request.args.get('kind', 'rr')
+    try:
+        if request.mimetype == 'application/octet-stream':
+            dtype = SAMPLE_DTYPES.get(request.args.get('dtype', 'float32'))
+            if dtype is None:
+                return jsonify({'error': f"dtype must be one of {', '.join(SAMPLE_DTYPES)}"}), 400
+            payload = request.get_data(cache=False)
+            if len(payload) % dtype.itemsize:
+                return jsonify({'error': 'Payload is not a whole number of samples'}), 400
+            # Zero-copy view over the request body
+            samples = np.frombuffer(payload, dtype=dtype)
+        else:
+            body = request.get_json(silent=True) or {}
+            kind = body.get('kind', kind)
+            samples = np.asarray(body.get('samples', []), dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid samples: {str(e)}'}), 400
+    
+    if kind not in ('rr', 'hr'):
+        return jsonify({'error': "kind must be 'rr' or 'hr'"}), 400
+    if samples.ndim != 1 or not len(samples):
+        return jsonify({'error': 'No samples provided'}), 400
+    
+    session_id = request_session_id()
+    result = get_biometric_streams().ingest(session_id, samples, kind)
+    if get_event_bus().watched(session_id):
+        session = get_sessions().peek(session_id)
+        if session is not None:
+            session.memory.biometric_stream = get_biometric_streams().get(session_id)
+            publish_biometrics(session)
+    return jsonify(result)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose in-process metrics in the Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/analytics/transitions', methods=['GET'])
+def get_emotion_transitions():
+    """Emotion transition matrix and drift distributions for the session"""
+    return jsonify(current_session().reasoning.drift_model.get_state())
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Top-N summaries of recently profiled requests"""
+    if not admin_authorized():
+        return jsonify({'error': 'Admin token required'}), 403
+    limit = request.args.get('limit', default=10, type=int)
+    return jsonify({'profiles': get_profiler().get_summaries(limit)})
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Top-N summary of one profiled request"""
+    if not admin_authorized():
+        return jsonify({'error': 'Admin token required'}), 403
+    summary = get_profiler().get_summary(profile_id)
+    if summary is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return jsonify(summary)
+
+@app.route('/admin/memory', methods=['GET'])
+def get_memory_report():
+    """Process memory, top allocation sites (while tracemalloc runs) and the largest sessions.
+    ?limit=N sites, ?group_by=lineno|filename, ?sessions=N largest sessions (0 to skip the walk)"""
+    if not admin_authorized():
+        return jsonify({'error': 'Admin token required'}), 403
+    limit = request.args.get('limit', default=20, type=int)
+    top_sessions = request.args.get('sessions', default=10, type=int)
+    sessions = get_sessions()
+    report = {
+        'rss_bytes': process_rss_bytes(),
+        'tracing': tracing_summary(limit, request.args.get('group_by', 'lineno')),
+        'active_sessions': len(sessions),
+        'session_memory_ceiling_bytes': session_memory_ceiling
+    }
+    if top_sessions:
+        largest = sessions.memory_usage(top_sessions)
+        report['largest_sessions'] = largest
+        report['sessions_over_ceiling'] = [entry['session_id'] for entry in largest
+                                           if entry['bytes'] > session_memory_ceiling]
+    return jsonify(report)
+
+@app.route('/admin/memory/tracing', methods=['POST'])
+def start_memory_tracing():
+    """Start tracemalloc at runtime; body {"frames": N} sets the traceback depth"""
+    if not admin_authorized():
+        return jsonify({'error': 'Admin token required'}), 403
+    frames = (request.get_json(silent=True) or {}).get('frames', 1)
+    started = start_tracing(frames)
+    return jsonify({'tracing': True, 'started': started})
+
 @app.route('/api/reset_system', methods=['POST'])
 def reset_system():
-    """Reset the system state"""
-    global turn_counter
-    
+    """Reset the session's state"""
     try:
-        # Reset components
-        global memory, reasoning
-        memory = Memory()
-        reasoning = Reasoning()
-        turn_counter = 0
+        # The next request for this session starts with fresh components
+        session_id = request_session_id()
+        get_sessions().reset(session_id)
+        channel = get_event_bus().channel(session_id)
+        if channel is not None:
+            channel.last_status = None
+            channel.biometric_alert = False
+            channel.publish('reset', {})
         
         return jsonify({'message': 'System reset successfully'})
         
     except Exception as e:
         return jsonify({'error': f'Reset error: {str(e)}'}), 500
 
-def calculate_emotional_intensity(emotional_analysis: Dict) -> float:
-    """Calculate emotional intensity from analysis"""
-    base_intensity = {
-        "happy": 0.3,
-        "sad": 0.7,
-        "angry": 0.8,
-        "anxious": 0.9,
-        "confused": 0.6,
-        "neutral": 0.1
-    }
-    
-    intensity = base_intensity.get(emotional_analysis.get("emotional_state", "neutral"), 0.5)
+@timed_stage("status_build")
+def get_system_status_data(session: ConversationSession, fields: Optional[List[str]] = None) -> Dict:
+    """Get system status data for a session. With `fields`, the costlier parts nobody asked for
+    (the conversation summary, which may call the LLM, usage and prompt prefixes) are skipped."""
+    memory_summary = session.memory.get_memory_summary()
+    agent_a_status = session.agent_a.get_agent_status()
     
-    # Increase intensity based on coherence issues
-    if emotional_analysis.get("coherence_status") == "coherence_lost":
-        intensity += 0.3
-    if emotional_analysis.get("recursion_detected"):
-        intensity += 0.2
-    if emotional_analysis.get("drift_detected"):
-        intensity += 0.2
-        
-    return min(1.0, intensity)
-
-def get_system_status_data() -> Dict:
-    """Get system status data"""
-    memory_summary = memory.get_memory_summary()
-    conv_summary = reasoning.get_conversation_summary()
-    agent_a_status = agent_a.get_agent_status()
-    agent_b_status = agent_b.get_monitoring_summary()
-    
-    return {
+    status = {
         'total_interactions': memory_summary['total_interactions'],
         'coherence_events': memory_summary['coherence_events'],
         'stress_level': memory_summary['current_stress_level'],
         'biometric_alert': memory_summary['biometric_alert'],
         'emotional_progression': memory_summary['emotional_trend'],
         'llm_available': agent_a_status.get('llm_available', False),
-        'agent_a_responses': agent_a_status['response_count'],
-        'agent_b_alerts': agent_b_status['total_alerts'],
-        'recursion_count': conv_summary['recursion_count'],
-        'last_emotional_state': conv_summary['last_emotional_state'],
-        'turn_count': turn_counter
+        'agent_a_responses': agent_a_status['response_count']
     }
+    if wants(fields, 'agent_b_alerts'):
+        status['agent_b_alerts'] = session.agent_b.get_monitoring_summary()['total_alerts']
+    if wants(fields, 'recursion_count') or wants(fields, 'last_emotional_state'):
+        conv_summary = session.reasoning.get_conversation_summary()
+        status['recursion_count'] = conv_summary['recursion_count']
+        status['last_emotional_state'] = conv_summary['last_emotional_state']
+    status['turn_count'] = session.turn_counter
+    status['active_sessions'] = len(get_sessions())
+    if wants(fields, 'llm_usage'):
+        status['llm_usage'] = get_usage_ledger().summary()
+    if wants(fields, 'prompt_prefixes'):
+        status['prompt_prefixes'] = session.agent_a.llm_service.get_prompt_prefix_status() if session.agent_a.llm_service else {}
+    if wants(fields, 'admission'):
+        status['admission'] = get_admission().status()
+    return status
 
 if __name__ == '__main__':
     print("Starting Coherence Protocol Agentic AI API...")
     print("Web Dashboard: http://localhost:5000")
     print("API Endpoint: http://localhost:5000/api/send_input")
     print("System Status: http://localhost:5000/api/system_status")
+    print("Metrics: http://localhost:5000/metrics")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    create_app(preload=True).run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
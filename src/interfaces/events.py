@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from core.metrics import EVENT_STREAMS, EVENTS_PUBLISHED
+from interfaces.responses import dumps
+
+
+def format_event(event_id: int, event_type: str, data) -> bytes:
+    """One server-sent event frame"""
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event_type.encode('utf-8'), dumps(data))
+
+
+class SessionChannel:
+    """
+    Recent events of one session as ready-to-send frames. Each event is encoded once and every
+    stream reads the same bytes, so fan-out costs one encode plus a wake-up per stream.
+    The ring of recent frames lets a reconnecting stream resume from its Last-Event-ID.
+    """
+
+    def __init__(self, history: int = 100):
+        self.frames = deque(maxlen=history)
+        self.last_id = 0
+        self.condition = threading.Condition()
+        self.streams = 0
+        self.idle_since = time.time()
+        # Last values pushed, so status and alert state go out as changes only
+        self.last_status = None
+        self.biometric_alert = False
+
+    def publish(self, event_type: str, data) -> int:
+        with self.condition:
+            self.last_id += 1
+            self.frames.append((self.last_id, format_event(self.last_id, event_type, data)))
+            self.condition.notify_all()
+            event_id = self.last_id
+        EVENTS_PUBLISHED.inc(event_type)
+        return event_id
+
+    def read(self, after_id: int, timeout: float) -> Tuple[List[Tuple[int, bytes]], bool]:
+        """(id, frame) pairs newer than after_id, waiting up to timeout for one. The flag is False
+        when some were already dropped from the ring, or after_id is one this channel never issued
+        (it came from before a restart or prune, or from another worker), so the reader should
+        resynchronize."""
+        with self.condition:
+            if after_id > self.last_id:
+                return [], False
+            if self.last_id == after_id:
+                self.condition.wait(timeout)
+            complete = not self.frames or self.frames[0][0] <= after_id + 1
+            return [(event_id, frame) for event_id, frame in self.frames if event_id > after_id], complete
+
+
+class EventBus:
+    """
+    Per-session event channels for the dashboard's server-sent event streams.
+    Publishing to a session nobody is watching costs a dict lookup, so turns only compute
+    what they push when a stream is open. A channel is kept for `retention` seconds after its
+    last stream closes, so a reconnecting dashboard can catch up.
+    """
+
+    def __init__(self, history: int = 100, retention: float = 60.0, max_streams: int = 200):
+        self.history = history
+        self.retention = retention
+        self.max_streams = max_streams
+        self._channels = {}
+        self._streams = 0
+        self._lock = threading.Lock()
+
+    def channel(self, session_id: str) -> Optional[SessionChannel]:
+        return self._channels.get(session_id)
+
+    def watched(self, session_id: str) -> bool:
+        channel = self._channels.get(session_id)
+        return channel is not None and channel.streams > 0
+
+    def publish(self, session_id: str, event_type: str, data) -> Optional[int]:
+        """Push an event to the session's streams; None when nobody is listening"""
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return None
+        return channel.publish(event_type, data)
+
+    def publish_status(self, session_id: str, status: Dict) -> Optional[int]:
+        """Push the status fields that changed since the last status event"""
+        channel = self._channels.get(session_id)
+        if channel is None:
+            return None
+        previous = channel.last_status or {}
+        changes = {key: value for key, value in status.items() if previous.get(key) != value}
+        channel.last_status = status
+        return channel.publish('status', changes) if changes else None
+
+    def open_stream(self, session_id: str) -> Optional[SessionChannel]:
+        """Register a stream on the session's channel; None when the process is at max_streams"""
+        with self._lock:
+            if self._streams >= self.max_streams:
+                return None
+            self._prune()
+            channel = self._channels.get(session_id)
+            if channel is None:
+                channel = self._channels[session_id] = SessionChannel(self.history)
+            channel.streams += 1
+            self._streams += 1
+            EVENT_STREAMS.set(self._streams)
+        return channel
+
+    def close_stream(self, channel: SessionChannel):
+        with self._lock:
+            channel.streams -= 1
+            if channel.streams == 0:
+                channel.idle_since = time.time()
+            self._streams -= 1
+            EVENT_STREAMS.set(self._streams)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for session_id, channel in list(self._channels.items()):
+            if channel.streams == 0 and channel.idle_since < cutoff:
+                del self._channels[session_id]
+
+    def status(self) -> Dict:
+        return {"streams": self._streams, "channels": len(self._channels), "max_streams": self.max_streams}
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus() -> EventBus:
+    """Process-wide event bus configured from the `events` settings section"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                try:
+                    from utils.config import Config
+                    events_config = Config().get('events', {}) or {}
+                except Exception as e:
+                    print(f"Event settings unavailable, using defaults: {e}")
+                    events_config = {}
+                _bus = EventBus(
+                    history=events_config.get('history', 100),
+                    retention=events_config.get('retention_seconds', 60),
+                    max_streams=events_config.get('max_streams', 200)
+                )
+    return _bus
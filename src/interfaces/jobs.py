@@ -0,0 +1,313 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from core.metrics import ACTIVE_JOBS, JOB_TURNS, JOBS_FINISHED
+
+# Alerts a scenario turn can expect, as in data/threshold_corpus.jsonl
+DETECTORS = ("drift", "recursion", "distress")
+FINISHED = ("completed", "failed", "cancelled")
+
+
+class ScenarioError(ValueError):
+    """A scenario set that cannot be run: wrong shape, unknown expectations or too large"""
+
+
+def parse_scenarios(records, session_id: Optional[str] = None) -> List[Dict]:
+    """
+    Scenarios from records in the transcript corpus format:
+    {"id": "...", "session_id": "...", "turns": ["text", {"text": "...", "expect": ["drift"]}]}.
+    "expect" lists the alerts wanted on that turn; turns without it are run but not checked.
+    A scenario with a session_id (or every scenario, when session_id is given) runs in that API
+    session; otherwise it gets a private session of its own.
+    """
+    if not isinstance(records, list) or not records:
+        raise ScenarioError("scenarios must be a non-empty list")
+    scenarios = []
+    for index, record in enumerate(records, 1):
+        if isinstance(record, list):
+            record = {"turns": record}
+        if not isinstance(record, dict) or not isinstance(record.get("turns"), list) or not record["turns"]:
+            raise ScenarioError(f"scenario {index} needs a non-empty 'turns' list")
+        turns = []
+        for turn in record["turns"]:
+            if isinstance(turn, str):
+                turn = {"text": turn}
+            if not isinstance(turn, dict) or not isinstance(turn.get("text"), str) or not turn["text"].strip():
+                raise ScenarioError(f"scenario {index} has a turn without text")
+            expect = turn.get("expect")
+            if expect is not None:
+                if not isinstance(expect, list):
+                    raise ScenarioError(f"scenario {index}: 'expect' must be a list of alerts")
+                unknown = set(expect) - set(DETECTORS)
+                if unknown:
+                    raise ScenarioError(f"scenario {index} expects unknown alerts: {sorted(unknown)}")
+                expect = [detector for detector in DETECTORS if detector in expect]
+            turns.append({"text": turn["text"], "expect": expect})
+        scenarios.append({
+            "id": str(record.get("id", f"scenario-{index}")),
+            "session_id": session_id or record.get("session_id"),
+            "turns": turns
+        })
+    return scenarios
+
+
+def load_scenario_file(path: str) -> List:
+    """Records of a scenario file: JSONL (one scenario per line), or a JSON or YAML list"""
+    with open(path, 'r') as file:
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in file if line.strip()]
+        if path.endswith('.json'):
+            return json.load(file)
+        import yaml
+        try:
+            return yaml.safe_load(file)
+        except yaml.YAMLError as e:
+            raise ScenarioError(f"{path} is not valid YAML: {e}")
+
+
+def resolve_scenario_file(scenario_dir: str, name: str) -> str:
+    """Path of a named scenario file, which must be inside scenario_dir"""
+    base = os.path.realpath(scenario_dir)
+    path = os.path.realpath(os.path.join(base, name))
+    if os.path.commonpath([base, path]) != base:
+        raise ScenarioError(f"scenario_file must be inside {scenario_dir}")
+    if not os.path.isfile(path):
+        raise ScenarioError(f"No scenario file named {name!r}")
+    return path
+
+
+def detector_scores(counts: Dict) -> Dict:
+    """Precision and recall per detector from tp/fp/fn counts"""
+    scores = {}
+    for detector, count in counts.items():
+        precision = count["tp"] / (count["tp"] + count["fp"]) if count["tp"] + count["fp"] else 0.0
+        recall = count["tp"] / (count["tp"] + count["fn"]) if count["tp"] + count["fn"] else 0.0
+        scores[detector] = {**count, "precision": round(precision, 3), "recall": round(recall, 3)}
+    return scores
+
+
+class ScenarioJob:
+    """One submitted scenario set, its progress and the results so far"""
+
+    def __init__(self, scenarios: List[Dict], name: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name or f"{len(scenarios)} scenarios"
+        self.scenarios = scenarios
+        self.results = [{"id": scenario["id"], "session_id": scenario["session_id"], "status": "pending",
+                         "turns": []} for scenario in scenarios]
+        self.status = "queued"
+        self.turns_total = sum(len(scenario["turns"]) for scenario in scenarios)
+        self.turns_done = 0
+        self.scenarios_done = 0
+        self.errors = 0
+        self.checked = 0
+        self.failed_checks = 0
+        self.detectors = {detector: {"tp": 0, "fp": 0, "fn": 0} for detector in DETECTORS}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.remaining_tasks = 0
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def record_turn(self, result: Dict, record: Dict, expect: Optional[List[str]]):
+        with self.lock:
+            result["turns"].append(record)
+            self.turns_done += 1
+            if expect is None:
+                return
+            self.checked += 1
+            self.failed_checks += not record["passed"]
+            for detector in DETECTORS:
+                if detector in record["raised"]:
+                    self.detectors[detector]["tp" if detector in expect else "fp"] += 1
+                elif detector in expect:
+                    self.detectors[detector]["fn"] += 1
+
+    def summary(self) -> Dict:
+        with self.lock:
+            return {
+                "job_id": self.id,
+                "name": self.name,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "scenarios": len(self.scenarios),
+                "scenarios_done": self.scenarios_done,
+                "turns_total": self.turns_total,
+                "turns_done": self.turns_done,
+                "progress": round(self.turns_done / self.turns_total, 3) if self.turns_total else 1.0,
+                "errors": self.errors,
+                "expectations": {"checked": self.checked, "failed": self.failed_checks,
+                                 "detectors": detector_scores(self.detectors)}
+            }
+
+    def to_dict(self, offset: int = 0, limit: Optional[int] = None) -> Dict:
+        """Summary plus the results of scenarios[offset:offset + limit], finished or not"""
+        data = self.summary()
+        end = None if limit is None else offset + limit
+        with self.lock:
+            data["results"] = [dict(result, turns=list(result["turns"])) for result in self.results[offset:end]]
+        data["offset"] = offset
+        return data
+
+
+class JobManager:
+    """
+    Runs scenario jobs on a pool of worker threads. Scenarios that share an API session run in
+    order as one task; every other scenario has a private session and runs as its own task, so
+    a job's scenarios proceed in parallel across workers. Tasks start in submission order.
+    Finished jobs are kept for `retention` seconds, and at most max_jobs jobs are held at once.
+    on_update(job, event, data) is called with "progress" after each turn, "scenario" (data is
+    the scenario's index) as each scenario ends and "done" when the job finishes.
+    """
+
+    def __init__(self, session_for: Callable, run_turn: Callable, workers: int = 4, max_jobs: int = 100,
+                 retention: float = 3600.0, max_turns: int = 10000, on_update: Callable = None):
+        self.session_for = session_for
+        self.run_turn = run_turn
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.retention = retention
+        self.max_turns = max_turns
+        self.on_update = on_update
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scenario-job")
+
+    def submit(self, scenarios: List[Dict], name: Optional[str] = None) -> Optional[ScenarioJob]:
+        """Queue a job and return it at once; None when max_jobs unfinished jobs are already held"""
+        job = ScenarioJob(scenarios, name)
+        if job.turns_total > self.max_turns:
+            raise ScenarioError(f"{job.turns_total} turns is over the limit of {self.max_turns} per job")
+        groups = {}
+        for index, scenario in enumerate(scenarios):
+            key = scenario["session_id"] if scenario["session_id"] is not None else ("private", index)
+            groups.setdefault(key, []).append(index)
+        with self._lock:
+            self._prune()
+            if len(self._jobs) >= self.max_jobs:
+                return None
+            self._jobs[job.id] = job
+            job.remaining_tasks = len(groups)
+            self._update_active()
+        for indexes in groups.values():
+            self._executor.submit(self._run_group, job, indexes)
+        return job
+
+    def get(self, job_id: str) -> Optional[ScenarioJob]:
+        return self._jobs.get(job_id)
+
+    def summaries(self) -> List[Dict]:
+        """Summaries of the held jobs, newest first"""
+        jobs = sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+        return [job.summary() for job in jobs]
+
+    def cancel(self, job_id: str) -> Optional[ScenarioJob]:
+        """Stop a job after its running turns; scenarios not yet started are skipped"""
+        job = self._jobs.get(job_id)
+        if job is not None and not job.finished:
+            job.cancelled.set()
+        return job
+
+    def _run_group(self, job: ScenarioJob, indexes: List[int]):
+        try:
+            for index in indexes:
+                self._run_scenario(job, index)
+        finally:
+            with job.lock:
+                job.remaining_tasks -= 1
+                done = job.remaining_tasks == 0
+                if done:
+                    if job.cancelled.is_set():
+                        job.status = "cancelled"
+                    elif job.errors == len(job.scenarios):
+                        job.status = "failed"
+                    else:
+                        job.status = "completed"
+                    job.finished_at = time.time()
+            if done:
+                JOBS_FINISHED.inc(job.status)
+                with self._lock:
+                    self._update_active()
+                self._notify(job, "done")
+
+    def _run_scenario(self, job: ScenarioJob, index: int):
+        scenario, result = job.scenarios[index], job.results[index]
+        with job.lock:
+            if job.cancelled.is_set():
+                result["status"] = "cancelled"
+                return
+            if job.status == "queued":
+                job.status = "running"
+                job.started_at = time.time()
+            result["status"] = "running"
+            if result["session_id"] is None:
+                result["session_id"] = f"job-{job.id}-{index}"
+        try:
+            session = self.session_for(result["session_id"], scenario["session_id"] is not None)
+            for turn in scenario["turns"]:
+                if job.cancelled.is_set():
+                    break
+                outcome = self.run_turn(session, turn["text"])
+                analysis = outcome["emotional_analysis"]
+                raised = [detector for detector, hit in (("drift", analysis.get("drift_detected")),
+                                                         ("recursion", analysis.get("recursion_detected")),
+                                                         ("distress", outcome.get("biometric_alert")))
+                          if hit]
+                record = {
+                    "input": turn["text"],
+                    "agent_a_response": outcome["agent_a_response"],
+                    "agent_b_response": outcome["agent_b_response"],
+                    "alerts": analysis.get("alerts", []),
+                    "emotional_state": analysis.get("emotional_state", "neutral"),
+                    "raised": raised
+                }
+                if turn["expect"] is not None:
+                    record["expected"] = turn["expect"]
+                    record["passed"] = raised == turn["expect"]
+                job.record_turn(result, record, turn["expect"])
+                JOB_TURNS.inc()
+                self._notify(job, "progress")
+            status = "cancelled" if job.cancelled.is_set() else "completed"
+        except Exception as e:
+            status = "failed"
+            result["error"] = str(e)
+        with job.lock:
+            result["status"] = status
+            job.scenarios_done += 1
+            job.errors += status == "failed"
+        self._notify(job, "scenario", index)
+
+    def _notify(self, job: ScenarioJob, event: str, data=None):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(job, event, data)
+        except Exception as e:
+            print(f"Warning: job update for {job.id} failed: {e}")
+
+    def _prune(self):
+        """Drop finished jobs past retention, then the oldest finished ones while at max_jobs"""
+        cutoff = time.time() - self.retention
+        finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at)
+        for job in finished:
+            if job.finished_at < cutoff or len(self._jobs) >= self.max_jobs:
+                del self._jobs[job.id]
+
+    def _update_active(self):
+        ACTIVE_JOBS.set(sum(not job.finished for job in self._jobs.values()))
+
+    def status(self) -> Dict:
+        return {"held": len(self._jobs), "active": sum(not job.finished for job in self._jobs.values()),
+                "workers": self.workers, "max_jobs": self.max_jobs, "max_turns": self.max_turns}
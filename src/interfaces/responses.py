@@ -0,0 +1,120 @@
+import gzip
+import json
+from typing import Dict, Iterable, List, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+# orjson is several times faster than the stdlib encoder; brotli compresses text better than gzip
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript")
+
+
+def _default(obj):
+    """Values neither encoder handles natively: numpy arrays and scalars, sets, then Flask's extras"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON, keys in insertion order"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider (jsonify, app.json) backed by dumps()"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def parse_fields(value) -> Optional[List[str]]:
+    """Field list from a comma-separated string or a JSON list; None when not given"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(field).strip() for field in value if str(field).strip()]
+
+
+def wants(fields: Optional[Iterable[str]], key: str) -> bool:
+    """Whether a response trimmed to `fields` includes `key` (or part of it); None means everything"""
+    if fields is None:
+        return True
+    return any(field == key or field.startswith(key + '.') or key.startswith(field + '.') for field in fields)
+
+
+def subfields(fields: Optional[List[str]], key: str) -> Optional[List[str]]:
+    """The part of `fields` inside `key` ("status.stress_level" -> "stress_level"); None for all of it"""
+    if fields is None or key in fields:
+        return None
+    prefix = key + '.'
+    return [field[len(prefix):] for field in fields if field.startswith(prefix)]
+
+
+def select_fields(payload: Dict, fields: Iterable[str]) -> Dict:
+    """Only the named keys of payload; dotted names ("status.stress_level") pick inside nested objects"""
+    selected = {}
+    for field in fields:
+        source, target = payload, selected
+        *parents, key = field.split('.')
+        for parent in parents:
+            source = source.get(parent) if isinstance(source, dict) else None
+            if not isinstance(source, dict):
+                break
+            child = target.get(parent)
+            if not isinstance(child, dict) or child is source:
+                # Copy rather than write into a nested object taken whole by an earlier field
+                child = target[parent] = dict(child) if isinstance(child, dict) else {}
+            target = child
+        else:
+            if isinstance(source, dict) and key in source:
+                target[key] = source[key]
+    return selected
+
+
+def choose_encoding(accept_encodings) -> Optional[str]:
+    """Best content coding the client accepts (werkzeug's request.accept_encodings)"""
+    if BROTLI_AVAILABLE and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response, accept_encodings, min_bytes: int = 1024, level: int = 6):
+    """Compress a text or JSON response in place when it is large enough and the client accepts it"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encodings)
+    data = response.get_data()
+    if encoding is None or len(data) < min_bytes:
+        return response
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=min(max(level, 0), 11), mode=brotli.MODE_TEXT)
+    else:
+        compressed = gzip.compress(data, compresslevel=min(max(level, 1), 9), mtime=0)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,272 @@
+import io
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from core.biometric_stream import RRStream
+from core.emotion_classifier import EmotionClassifier, get_emotion_classifier
+from core.llm_service import LLMService
+from utils.config import Config
+
+
+# Session lists that only ever grow by appending, as paths from the session state. Each save
+# journals the items appended since the previous one instead of rewriting the whole history.
+JOURNALED_LISTS = (
+    "memory.past_interactions", "memory.agent_responses", "memory.biometric_data", "memory.coherence_events",
+    "memory.prompt_history.turns", "memory.retrieval_index.documents",
+    "reasoning.conversation_history", "reasoning.prompt_history.turns", "reasoning.emotional_history",
+    "reasoning.recursion_patterns", "agent_b.prompt_history.turns",
+)
+
+# (turn, base, items) rows of a session's journal; a base row holds every list from the start
+JournalRow = Tuple[int, bool, bytes]
+
+
+class SessionConflict(Exception):
+    """Another worker saved the session after this one loaded it"""
+
+
+class SessionStore:
+    """
+    Session state shared by API worker processes, keyed by session id. Each session is a core
+    blob (its bounded state, rewritten on every save) plus a journal of rows holding the items
+    appended to its history lists, one row per save, so a save costs the size of the turn rather
+    than of the conversation.
+    Every save carries the turn number it was made at. A save names the turn number it was
+    loaded at and fails if the stored one has moved on, so two workers can never both extend
+    the same turn (optimistic concurrency: the loser reloads and the caller retries).
+    """
+
+    def version(self, session_id: str) -> Optional[int]:
+        """Stored turn number, None when the session is not stored"""
+        raise NotImplementedError
+
+    def load(self, session_id: str, after: int = 0) -> Optional[Tuple[int, bytes, List[JournalRow]]]:
+        """Stored turn number, core and the journal rows saved after turn `after`, read consistently"""
+        raise NotImplementedError
+
+    def save(self, session_id: str, expected: int, version: int, core: bytes, items: bytes, base: bool) -> bool:
+        """Store the core and a journal row at `version` if the stored turn is still `expected`
+        (0: not stored yet); a base row replaces the journal. False on a conflict."""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def expire(self, idle_seconds: float) -> int:
+        """Drop sessions not saved for idle_seconds; returns how many"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in one SQLite file, shared by every worker process on the host (WAL mode, so
+    loads do not wait for saves). Each thread has its own connection. The file is trusted:
+    it holds pickles, so it must not be writable by anyone the API does not trust.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, turn INTEGER NOT NULL, state BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS session_turns ("
+                "session_id TEXT NOT NULL, turn INTEGER NOT NULL, base INTEGER NOT NULL, items BLOB NOT NULL, "
+                "PRIMARY KEY (session_id, turn))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def version(self, session_id: str) -> Optional[int]:
+        row = self._connection().execute("SELECT turn FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, session_id: str, after: int = 0) -> Optional[Tuple[int, bytes, List[JournalRow]]]:
+        connection = self._connection()
+        # One read transaction, so a concurrent save cannot land between the two reads
+        connection.execute("BEGIN")
+        try:
+            row = connection.execute(
+                "SELECT turn, state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            journal = connection.execute(
+                "SELECT turn, base, items FROM session_turns WHERE session_id = ? AND turn > ? ORDER BY turn",
+                (session_id, after)).fetchall()
+        finally:
+            connection.commit()
+        return row[0], bytes(row[1]), [(turn, bool(base), bytes(items)) for turn, base, items in journal]
+
+    def save(self, session_id: str, expected: int, version: int, core: bytes, items: bytes, base: bool) -> bool:
+        with self._connection() as connection:
+            if expected == 0:
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO sessions (session_id, turn, state, updated_at) VALUES (?, ?, ?, ?)",
+                    (session_id, version, core, time.time()))
+            else:
+                cursor = connection.execute(
+                    "UPDATE sessions SET turn = ?, state = ?, updated_at = ? WHERE session_id = ? AND turn = ?",
+                    (version, core, time.time(), session_id, expected))
+            if cursor.rowcount != 1:
+                return False
+            if base:
+                connection.execute("DELETE FROM session_turns WHERE session_id = ?", (session_id,))
+            connection.execute("INSERT INTO session_turns (session_id, turn, base, items) VALUES (?, ?, ?, ?)",
+                               (session_id, version, int(base), items))
+            return True
+
+    def delete(self, session_id: str) -> bool:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM session_turns WHERE session_id = ?", (session_id,))
+            return connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount == 1
+
+    def expire(self, idle_seconds: float) -> int:
+        cutoff = time.time() - idle_seconds
+        with self._connection() as connection:
+            connection.execute("DELETE FROM session_turns WHERE session_id IN "
+                               "(SELECT session_id FROM sessions WHERE updated_at < ?)", (cutoff,))
+            return connection.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def _resolve(state: Dict, path: str):
+    component, *attributes = path.split(".")
+    obj = state[component]
+    for attribute in attributes:
+        obj = getattr(obj, attribute)
+    return obj
+
+
+class _StatePickler(pickle.Pickler):
+    def __init__(self, file, codec: "SessionCodec", local: Dict = None):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.codec = codec
+        # id -> reference of objects stored apart from this pickle (journaled lists, derived indexes)
+        self.local = local or {}
+
+    def persistent_id(self, obj):
+        reference = self.local.get(id(obj))
+        return reference if reference is not None else self.codec.reference(obj)
+
+
+class _StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, codec: "SessionCodec", local: Dict = None):
+        super().__init__(file)
+        self.codec = codec
+        self.local = local or {}
+
+    def persistent_load(self, reference):
+        if reference in self.local:
+            return self.local[reference]
+        return self.codec.resolve(reference)
+
+
+class SessionCodec:
+    """
+    Pickles session components. Process-wide objects they point at are written as references
+    and bound to this process's instances on load: the LLM service, Config objects and the
+    emotion classifier (read-only, so the process's one loaded copy serves every session). A session's
+    attached biometric stream lives in the worker that received the samples, so it is dropped;
+    each turn attaches the local one again.
+
+    The core pickle refers to the JOURNALED_LISTS rather than containing them, and leaves out the
+    retrieval index's postings, which are rebuilt from its documents on load.
+    """
+
+    def __init__(self, llm_service=None):
+        self.llm_service = llm_service
+
+    @staticmethod
+    def journaled(state: Dict) -> Dict[str, list]:
+        """The state's journaled lists by path"""
+        return {path: _resolve(state, path) for path in JOURNALED_LISTS}
+
+    def dumps(self, state: Dict) -> bytes:
+        """The core of the state: everything but the journaled lists and the retrieval postings"""
+        local = {id(items): ("journal", path) for path, items in self.journaled(state).items()}
+        local[id(state["memory"].retrieval_index.postings)] = ("postings",)
+        return self._dumps(state, local)
+
+    def dumps_items(self, lists: Dict[str, list], start: Dict[str, int]) -> bytes:
+        """A journal row: the items of each list from its start offset on"""
+        return self._dumps({path: items[start[path]:] for path, items in lists.items()})
+
+    def loads(self, core: bytes, rows: List[bytes], previous: Optional[Dict] = None) -> Dict:
+        """State from its core and journal rows. The rows either start with a base row, or follow
+        on from `previous`, the state as of the last row already applied, whose lists and postings
+        are then extended in place rather than rebuilt."""
+        journal = [self._loads(row) for row in rows]
+        lists = self.journaled(previous) if previous is not None else {path: [] for path in JOURNALED_LISTS}
+        index = previous["memory"].retrieval_index if previous is not None else None
+        indexed = len(index.documents) if index is not None else 0
+        local = {("journal", path): items for path, items in lists.items()}
+        local[("postings",)] = index.postings if index is not None else {}
+        state = self._loads(core, local)
+        for row in journal:
+            for path, items in row.items():
+                lists[path].extend(items)
+        state["memory"].retrieval_index.index_documents(indexed)
+        return state
+
+    def _dumps(self, obj, local: Dict = None) -> bytes:
+        buffer = io.BytesIO()
+        _StatePickler(buffer, self, local).dump(obj)
+        return buffer.getvalue()
+
+    def _loads(self, data: bytes, local: Dict = None):
+        return _StateUnpickler(io.BytesIO(data), self, local).load()
+
+    def reference(self, obj) -> Optional[Tuple]:
+        if isinstance(obj, LLMService):
+            return ("llm_service",)
+        if isinstance(obj, Config):
+            return ("config", obj.config_file)
+        if isinstance(obj, EmotionClassifier) and obj.model_path:
+            return ("classifier", obj.model_path)
+        if isinstance(obj, RRStream):
+            return ("biometric_stream",)
+        return None
+
+    def resolve(self, reference: Tuple):
+        kind = reference[0]
+        if kind == "llm_service":
+            return self.llm_service
+        if kind == "config":
+            return Config(reference[1])
+        if kind == "classifier":
+            return get_emotion_classifier(reference[1])
+        if kind == "biometric_stream":
+            return None
+        raise pickle.UnpicklingError(f"Unknown session state reference {reference!r}")
+
+
+def create_session_store(backend: str, path: str) -> Optional[SessionStore]:
+    """Store for the `api.session_store` setting; None for "local" (live sessions in this process only)"""
+    if backend == "local":
+        return None
+    if backend == "sqlite":
+        return SQLiteSessionStore(path)
+    raise ValueError(f"Unknown session store {backend!r}; expected local or sqlite")
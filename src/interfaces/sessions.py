@@ -0,0 +1,253 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from agents.specialized_agents import AgentA, AgentB
+from core.emotion_classifier import shared_emotion_classifiers
+from core.memory import Memory
+from core.memory_tracking import deep_size
+from core.metrics import ACTIVE_SESSIONS
+from core.reasoning import Reasoning
+from interfaces.session_store import SessionCodec, SessionConflict, SessionStore
+from utils.config import get_config
+
+
+class ConversationSession:
+    """One conversation's memory, reasoning, agents and turn counter"""
+
+    def __init__(self, session_id: str, agent_parameters: Dict, llm_service=None, stored: bool = True):
+        self.session_id = session_id
+        self.memory = Memory(session_id)
+        self.reasoning = Reasoning(llm_service=llm_service)
+        agent_a_config = agent_parameters['agent_a']
+        agent_b_config = agent_parameters['agent_b']
+        self.agent_a = AgentA(name=agent_a_config['name'], tone=agent_a_config['tone'], llm_service=llm_service)
+        self.agent_b = AgentB(name=agent_b_config['name'], tone=agent_b_config['tone'], llm_service=llm_service)
+        self.turn_counter = 0
+        self.last_active = time.time()
+        # Turns of one conversation run one at a time; different sessions run concurrently
+        self.lock = threading.Lock()
+        # Turn number of the stored state this copy was loaded from or saved as (0: never stored,
+        # -1: out of date), and whether it is kept in the session store at all
+        self.version = 0
+        self.stored = stored
+        # Journaled lists as of `version`, with their stored lengths; None until loaded or saved
+        self.journal = None
+
+    def get_state(self) -> Dict:
+        """The components that make up the conversation, for the session store"""
+        return {"memory": self.memory, "reasoning": self.reasoning, "agent_a": self.agent_a,
+                "agent_b": self.agent_b, "turn_counter": self.turn_counter}
+
+    def set_state(self, state: Dict, version: int):
+        """Replace the conversation with state loaded from the session store. Loaded components
+        are not subscribed to settings reloads, so they take the current settings here."""
+        self.memory = state["memory"]
+        self.reasoning = state["reasoning"]
+        self.agent_a = state["agent_a"]
+        self.agent_b = state["agent_b"]
+        self.turn_counter = state["turn_counter"]
+        self.version = version
+        snapshot = get_config()
+        self.memory.apply_settings(snapshot)
+        self.reasoning.apply_settings(snapshot)
+        self.agent_b.apply_settings(snapshot)
+
+    @classmethod
+    def restore(cls, session_id: str, state: Dict, version: int) -> "ConversationSession":
+        """Session rebuilt from stored state, without building fresh components first"""
+        session = cls.__new__(cls)
+        session.session_id = session_id
+        session.last_active = time.time()
+        session.lock = threading.Lock()
+        session.stored = True
+        session.journal = None
+        session.set_state(state, version)
+        return session
+
+
+class SessionRegistry:
+    """
+    Sessions keyed by session id, created on first use. Every session shares one LLM service,
+    so the connection test runs once per process rather than once per component per session.
+    The least recently used session is dropped past max_sessions, and sessions idle for
+    longer than idle_timeout seconds are dropped when the next one is created.
+
+    With a store, the sessions held here are a cache of the store, which is what worker
+    processes share: each turn (see turn()) first catches up with the stored state if another
+    worker has moved the conversation on, then saves its own. Sessions dropped from the cache
+    are loaded again on their next request.
+    """
+
+    # Stored sessions idle past idle_timeout are swept at most this often
+    EXPIRE_INTERVAL = 60.0
+
+    def __init__(self, agent_parameters: Dict, llm_service=None, max_sessions: int = 1000,
+                 idle_timeout: float = 3600.0, store: Optional[SessionStore] = None):
+        self.agent_parameters = agent_parameters
+        self.llm_service = llm_service
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.store = store
+        self.codec = SessionCodec(llm_service) if store is not None else None
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_expiry = 0.0
+
+    def get(self, session_id: str) -> ConversationSession:
+        """Session for the id, loaded from the store or created on first use"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_active = time.time()
+        if session is not None:
+            # Reads see other workers' turns too; a turn running here will save its own
+            if self.store is not None and session.lock.acquire(blocking=False):
+                try:
+                    self._sync(session)
+                finally:
+                    session.lock.release()
+            return session
+
+        # Built outside the lock: a new session reads settings and loads the classifier
+        session = self._load(session_id)
+        if session is None:
+            session = ConversationSession(session_id, self.agent_parameters, self.llm_service)
+        with self._lock:
+            # Another request for the same id may have won the race
+            existing = self._sessions.get(session_id)
+            if existing is not None:
+                return existing
+            self._sessions[session_id] = session
+            self._evict()
+            ACTIVE_SESSIONS.set(len(self._sessions))
+        return session
+
+    def peek(self, session_id: str) -> Optional[ConversationSession]:
+        return self._sessions.get(session_id)
+
+    def reset(self, session_id: str) -> bool:
+        """Forget a session, in every worker; the next request with its id starts fresh"""
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+            ACTIVE_SESSIONS.set(len(self._sessions))
+        if self.store is not None:
+            removed = self.store.delete(session_id) or removed
+        return removed
+
+    @contextmanager
+    def turn(self, session: ConversationSession):
+        """
+        Run one or more turns of the session exclusively, then save them to the store. The save
+        only succeeds if no other worker saved the session meanwhile; otherwise SessionConflict
+        is raised, this copy is marked out of date and the caller can retry with the newer state.
+        """
+        with session.lock:
+            if self.store is None or not session.stored:
+                yield session
+                return
+            self._sync(session)
+            try:
+                yield session
+            except BaseException:
+                # Partly applied turns are dropped; the next turn reloads the stored state
+                session.version = -1
+                raise
+            if session.turn_counter == session.version:
+                return
+            self._save(session)
+
+    def _save(self, session: ConversationSession):
+        """Save the core and a journal row of what the session's lists gained since the last save.
+        The first save, and any after a list was replaced or shortened, journals them in full."""
+        state = session.get_state()
+        lists = self.codec.journaled(state)
+        expected = max(session.version, 0)
+        journal = session.journal
+        base = expected == 0 or journal is None or any(
+            journal[path][0] is not items or len(items) < journal[path][1] for path, items in lists.items())
+        start = {path: 0 if base else journal[path][1] for path in lists}
+        if not self.store.save(session.session_id, expected, session.turn_counter, self.codec.dumps(state),
+                               self.codec.dumps_items(lists, start), base):
+            session.version = -1
+            raise SessionConflict(f"Session {session.session_id} was updated by another worker")
+        session.version = session.turn_counter
+        self._track(session)
+
+    def _track(self, session: ConversationSession):
+        """Note the session's journaled lists and lengths as those of its stored version"""
+        lists = self.codec.journaled(session.get_state())
+        session.journal = {path: (items, len(items)) for path, items in lists.items()}
+
+    def _decode(self, stored, previous: Optional[Dict] = None) -> Dict:
+        """State from a store load; rows from a base row on are applied to fresh lists"""
+        _, core, rows = stored
+        bases = [index for index, (_, base, _) in enumerate(rows) if base]
+        if bases:
+            rows, previous = rows[bases[-1]:], None
+        elif previous is None:
+            raise ValueError("Stored session has no base journal row")
+        return self.codec.loads(core, [items for _, _, items in rows], previous)
+
+    def _load(self, session_id: str) -> Optional[ConversationSession]:
+        if self.store is None:
+            return None
+        stored = self.store.load(session_id)
+        if stored is None:
+            return None
+        session = ConversationSession.restore(session_id, self._decode(stored), stored[0])
+        self._track(session)
+        return session
+
+    def _sync(self, session: ConversationSession):
+        """Bring a cached session up to the stored state (caller holds its lock)"""
+        version = self.store.version(session.session_id)
+        if version == session.version:
+            return
+        if version is None:
+            if session.version != 0:
+                # Reset by another worker
+                fresh = ConversationSession(session.session_id, self.agent_parameters, self.llm_service)
+                session.set_state(fresh.get_state(), 0)
+                session.journal = None
+            return
+        # A copy at a stored turn only needs the rows saved since; any other copy reloads in full
+        journal = session.journal
+        current = journal is not None and all(
+            journal[path][0] is items and len(items) == journal[path][1]
+            for path, items in self.codec.journaled(session.get_state()).items())
+        after = session.version if session.version > 0 and current else 0
+        stored = self.store.load(session.session_id, after)
+        if stored is None:
+            session.version = -1
+            return self._sync(session)
+        session.set_state(self._decode(stored, session.get_state() if after else None), stored[0])
+        self._track(session)
+
+    def memory_usage(self, top: int = None) -> List[Dict]:
+        """Approximate bytes held by each session (excluding the shared LLM service and emotion
+        classifier), largest first"""
+        with self._lock:
+            items = list(self._sessions.items())
+        shared = [self, self.llm_service] + shared_emotion_classifiers()
+        usage = [{"session_id": session_id, "bytes": deep_size(session, shared), "turns": session.turn_counter}
+                 for session_id, session in items]
+        usage.sort(key=lambda entry: entry["bytes"], reverse=True)
+        return usage[:top] if top else usage
+
+    def _evict(self):
+        cutoff = time.time() - self.idle_timeout
+        if self.store is not None and time.time() >= self._next_expiry:
+            self._next_expiry = time.time() + self.EXPIRE_INTERVAL
+            self.store.expire(self.idle_timeout)
+        while self._sessions:
+            session_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and oldest.last_active >= cutoff:
+                break
+            del self._sessions[session_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
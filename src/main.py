@@ -1,21 +1,38 @@
 # Contents of /agentic-ai-project/agentic-ai-project/src/main.py
 
+import argparse
+import os
 import sys
 import time
+import uuid
+from contextlib import nullcontext
 from typing import Dict, List
 
-# Add colorama for better terminal output
-try:
-    from colorama import init, Fore, Back, Style
-    init()
-    COLORS_AVAILABLE = True
-except ImportError:
-    COLORS_AVAILABLE = False
-
 from agents.specialized_agents import AgentA, AgentB
 from core.memory import Memory
+from core.metrics import REGISTRY, timed_stage
+from core.profiling import get_profiler
+from core.startup import StartupTimer, print_import_report, profile_imports
+from core.tracing import get_tracer
+from core.usage import get_usage_ledger, session_scope
 from core.reasoning import Reasoning
-from utils.config import load_config
+from core.turn_features import TurnFeatures
+from utils.config import get_config_service, load_config
+
+# colorama for better terminal output, imported on the first colored print
+_colorama = None
+
+def _load_colorama():
+    """The colorama module, initialized once; False when it is not installed"""
+    global _colorama
+    if _colorama is None:
+        try:
+            import colorama
+            colorama.init()
+            _colorama = colorama
+        except ImportError:
+            _colorama = False
+    return _colorama
 
 class AgenticAISystem:
     """
@@ -24,25 +41,40 @@ class AgenticAISystem:
     """
     
     def __init__(self):
-        self.config = load_config()
-        self.memory = Memory()
-        self.reasoning = Reasoning()
+        self.startup = StartupTimer()
+        with self.startup.phase("config"):
+            self.config = load_config()
+            # Apply settings.yaml edits (model settings, thresholds) without a restart
+            get_config_service().start_watching()
+        self.session_id = f"cli-{uuid.uuid4().hex[:8]}"
+        with self.startup.phase("memory"):
+            self.memory = Memory(self.session_id)
+        with self.startup.phase("llm_service"):
+            self.llm_service = self._start_llm_service()
+        with self.startup.phase("reasoning"):
+            self.reasoning = Reasoning(llm_service=self.llm_service)
         
         # Initialize agents with configuration
         agent_a_config = self.config['agent_parameters']['agent_a']
         agent_b_config = self.config['agent_parameters']['agent_b']
         
-        self.agent_a = AgentA(
-            name=agent_a_config['name'], 
-            tone=agent_a_config['tone']
-        )
-        
-        self.agent_b = AgentB(
-            name=agent_b_config['name'], 
-            tone=agent_b_config['tone']
-        )
+        with self.startup.phase("agents"):
+            self.agent_a = AgentA(
+                name=agent_a_config['name'], 
+                tone=agent_a_config['tone'],
+                llm_service=self.llm_service
+            )
+            
+            self.agent_b = AgentB(
+                name=agent_b_config['name'], 
+                tone=agent_b_config['tone'],
+                llm_service=self.llm_service
+            )
         
         self.turn_number = 0
+        self.force_trace_next = False
+        self.profile_turns_remaining = 0
+        self.profile_mode = "cprofile"
         self.demo_mode = self.config.get('simulation', {}).get('demo_mode', False)
         
         # Demo scenarios for testing (3 turns for concise demo)
@@ -52,11 +84,25 @@ class AgenticAISystem:
             "Wait... what? I can't focus... my thoughts are all jumbled up and nothing makes sense anymore"
         ]
 
+    def _start_llm_service(self):
+        """One LLM service for every component, its connection test running in the background
+        so the welcome banner does not wait for it"""
+        try:
+            from core.llm_service import LLMService
+            service = LLMService()
+            service.start_probe()
+            return service
+        except Exception as e:
+            print(f"Warning: LLM service unavailable, using fallback responses: {e}")
+            return None
+
     def print_colored(self, text: str, color: str = "white", style: str = "normal"):
         """Print colored text if colorama is available"""
-        if not COLORS_AVAILABLE:
+        colorama = _load_colorama()
+        if not colorama:
             print(text)
             return
+        Fore, Style = colorama.Fore, colorama.Style
             
         color_map = {
             "red": Fore.RED,
@@ -90,12 +136,12 @@ class AgenticAISystem:
         print(f"   • {self.agent_a.name} (Axis) - Compatibility & Tone Mapper")
         print(f"   • {self.agent_b.name} (M) - Silent Observer & Drift Monitor")
         
-        # Show LLM status
-        openai_status_a = getattr(self.agent_a, 'llm_available', False)
-        openai_status_b = getattr(self.agent_b, 'llm_available', False)
-        openai_reasoning = getattr(self.reasoning, 'llm_available', False)
+        # Show LLM status without waiting for the connection test
+        llm_status = self.llm_service.is_available(wait=False) if self.llm_service else False
         
-        if openai_status_a or openai_status_b or openai_reasoning:
+        if llm_status is None:
+            self.print_colored("CONNECTING: OpenAI connection test running, rule-based responses if it fails", "yellow", "bright")
+        elif llm_status:
             self.print_colored("AI-POWERED MODE: OpenAI LLM integration active", "bright_green", "bright")
         else:
             self.print_colored("FALLBACK MODE: Using rule-based responses", "yellow", "bright")
@@ -104,7 +150,7 @@ class AgenticAISystem:
             self.print_colored("\nDEMO MODE ACTIVE - Automated scenario testing", "yellow", "bright")
         else:
             print("\nStart typing to begin conversation...")
-            print("Type 'status' for system status, 'demo' for demo mode, 'api' for web interface, 'quit' to exit")
+            print("Type 'status' for system status, 'metrics' for latency metrics, 'demo' for demo mode, 'api' for web interface, 'quit' to exit")
         
         print("\n" + "-"*60)
 
@@ -112,44 +158,56 @@ class AgenticAISystem:
         """Process user input through the reasoning system"""
         self.turn_number += 1
         
+        # Normalize and scan the input once for every rule-based consumer
+        features = TurnFeatures(user_input)
+        
         # Analyze input for emotional state and drift patterns
-        emotional_analysis = self.reasoning.analyze_input(user_input, self.turn_number)
+        emotional_analysis = self.reasoning.analyze_input(user_input, self.turn_number, features)
         
         # Store interaction in memory with biometric simulation
-        emotional_intensity = self._calculate_emotional_intensity(emotional_analysis)
-        stress_factor = emotional_analysis.get("coherence_status") != "stable"
-        
         biometric_data = self.memory.simulate_biometric_response(
-            emotional_intensity, 
-            stress_factor * 0.5
+            features.intensity, 
+            features.stress_factor
         )
         
-        self.memory.store_interaction(user_input, emotional_analysis, self.turn_number)
+        self.memory.store_interaction(user_input, emotional_analysis, self.turn_number, features)
         
         return emotional_analysis
 
-    def _calculate_emotional_intensity(self, emotional_analysis: Dict) -> float:
-        """Calculate emotional intensity from analysis"""
-        base_intensity = {
-            "happy": 0.3,
-            "sad": 0.7,
-            "angry": 0.8,
-            "anxious": 0.9,
-            "confused": 0.6,
-            "neutral": 0.1
-        }
-        
-        intensity = base_intensity.get(emotional_analysis.get("emotional_state", "neutral"), 0.5)
-        
-        # Increase intensity based on coherence issues
-        if emotional_analysis.get("coherence_status") == "coherence_lost":
-            intensity += 0.3
-        if emotional_analysis.get("recursion_detected"):
-            intensity += 0.2
-        if emotional_analysis.get("drift_detected"):
-            intensity += 0.2
-            
-        return min(1.0, intensity)
+    def run_turn(self, user_input: str):
+        """Process one user turn end to end, tracing it when sampled"""
+        force_trace = self.force_trace_next
+        self.force_trace_next = False
+        
+        profile_scope = nullcontext()
+        if self.profile_turns_remaining > 0:
+            self.profile_turns_remaining -= 1
+            profile_scope = get_profiler().profile("cli_turn", self.profile_mode)
+        
+        with profile_scope, session_scope(self.session_id), \
+                get_tracer().trace("cli_turn", force=force_trace, turn=self.turn_number + 1):
+            emotional_analysis = self.process_user_input(user_input)
+            self.run_agent_responses(user_input, emotional_analysis)
+        
+        if getattr(profile_scope, 'summary', None):
+            self.display_profile_summary(profile_scope.summary)
+
+    def display_profile_summary(self, summary: Dict, limit: int = 10):
+        """Display the top functions of a profiled turn"""
+        self.print_colored(f"\nPROFILE {summary['profile_id']} ({summary['mode']}, {summary['wall_time'] * 1000:.1f} ms)", "magenta", "bright")
+        if summary.get('file'):
+            print(f"   Saved to {summary['file']}")
+        
+        component_times = summary.get('component_self_time') or summary.get('component_samples_pct') or {}
+        unit = "s" if summary['mode'] == "cprofile" else "%"
+        for component, value in sorted(component_times.items(), key=lambda item: item[1], reverse=True):
+            print(f"   • {component}: {value}{unit}")
+        
+        for entry in summary['top_functions'][:limit]:
+            if summary['mode'] == "cprofile":
+                print(f"   {entry['cumtime'] * 1000:9.2f} ms  {entry['calls']:>6}  {entry['function']}")
+            else:
+                print(f"   {entry['inclusive_pct']:8.1f} %  {entry['function']}")
 
     def run_agent_responses(self, user_input: str, emotional_analysis: Dict):
         """Run agent responses with monitoring"""
@@ -162,7 +220,8 @@ class AgenticAISystem:
         # Agent B monitors and potentially intervenes
         monitoring_result = self.agent_b.monitor_emotional_drift(
             self.memory.get_past_interactions(), 
-            emotional_analysis
+            emotional_analysis,
+            self.memory.stress_level
         )
         
         # Display Agent A response
@@ -179,6 +238,7 @@ class AgenticAISystem:
             biometrics = self.memory.get_current_biometrics()
             self.print_colored(f"\nBIOMETRIC ALERT: HRV: {biometrics['hrv']}, Stress: {biometrics['stress_level']:.1f}", "bright_red")
 
+    @timed_stage("status_build")
     def display_system_status(self):
         """Display comprehensive system status"""
         self.print_colored("\n" + "="*50, "magenta")
@@ -208,6 +268,55 @@ class AgenticAISystem:
         print(f"   • Recursion Events: {conv_summary['recursion_count']}")
         print(f"   • Emotional Progression: {' → '.join(conv_summary['emotional_progression'][-5:]) if conv_summary['emotional_progression'] else 'None'}")
 
+    def parse_profile_command(self, user_input: str) -> bool:
+        """Take 'profile [turns] [sampling]' as the profiling command; anything else, such as
+        "profile picture makes me sad", is an ordinary message and returns False"""
+        parts = user_input.lower().split()
+        if not parts or parts[0] != 'profile':
+            return False
+        arguments = parts[1:]
+        sampling = bool(arguments) and arguments[-1] == 'sampling'
+        if sampling:
+            arguments = arguments[:-1]
+        if len(arguments) > 1 or (arguments and not arguments[0].isdigit()):
+            return False
+        self.profile_turns_remaining = int(arguments[0]) if arguments else 1
+        self.profile_mode = "sampling" if sampling else "cprofile"
+        return True
+
+    def display_metrics(self):
+        """Display per-stage latency and pipeline counters"""
+        self.print_colored("\n" + "="*50, "magenta")
+        self.print_colored("METRICS", "magenta", "bright")
+        self.print_colored("="*50, "magenta")
+        
+        snapshot = REGISTRY.snapshot()
+        
+        print("\nStage Latency:")
+        for stage, stats in sorted(snapshot["agentic_stage_latency_seconds"].items()):
+            print(f"   • {stage}: {stats['count']} calls, mean {stats['mean_seconds'] * 1000:.2f} ms")
+        
+        print("\nLLM Requests:")
+        llm_latency = snapshot["agentic_llm_request_latency_seconds"]
+        if not llm_latency:
+            print("   • None")
+        for call_type, stats in sorted(llm_latency.items()):
+            errors = snapshot["agentic_llm_errors_total"].get(call_type, 0)
+            print(f"   • {call_type}: {stats['count']} calls, mean {stats['mean_seconds'] * 1000:.1f} ms, {errors:.0f} errors")
+        
+        usage = get_usage_ledger().summary(session_id=self.session_id)
+        throughput = usage['throughput']
+        print(f"\nLLM Usage (session {self.session_id}):")
+        for call_type, stats in sorted(usage['by_call_type'].items()):
+            cost = f", ${stats['cost_usd']:.4f}" if stats['cost_usd'] is not None else ""
+            print(f"   • {call_type}: {stats['prompt_tokens']} prompt + {stats['completion_tokens']} completion tokens{cost}")
+        print(f"   • last minute: {throughput['calls_per_minute']} calls, {throughput['tokens_per_minute']} tokens")
+        
+        print("\nCounters:")
+        for name in ("agentic_fallbacks_total", "agentic_cache_hits_total", "agentic_alerts_total", "agentic_analysis_tier_total"):
+            values = ", ".join(f"{label}={value:.0f}" for label, value in sorted(snapshot[name].items())) or "none"
+            print(f"   • {name}: {values}")
+
     def run_demo_mode(self):
         """Run automated demo with predefined scenarios"""
         self.print_colored("\nDEMO MODE: Testing Emotional Drift Detection", "bright_yellow", "bright")
@@ -218,8 +327,7 @@ class AgenticAISystem:
             self.print_colored(f"You: {scenario}", "white")
             
             # Process the scenario
-            emotional_analysis = self.process_user_input(scenario)
-            self.run_agent_responses(scenario, emotional_analysis)
+            self.run_turn(scenario)
             
             # Brief pause between scenarios
             time.sleep(1)
@@ -246,6 +354,16 @@ class AgenticAISystem:
                 elif user_input.lower() == 'status':
                     self.display_system_status()
                     continue
+                elif user_input.lower() == 'metrics':
+                    self.display_metrics()
+                    continue
+                elif self.parse_profile_command(user_input):
+                    print(f"Profiling the next {self.profile_turns_remaining} turn(s) with {self.profile_mode}")
+                    continue
+                elif user_input.lower() == 'trace':
+                    self.force_trace_next = True
+                    print(f"Next turn will be traced to {get_tracer().output_file}")
+                    continue
                 elif user_input.lower() == 'demo':
                     self.run_demo_mode()
                     continue
@@ -255,8 +373,8 @@ class AgenticAISystem:
                     print("Open your browser to: http://localhost:5000")
                     print("Press Ctrl+C to stop the server and return to terminal mode")
                     try:
-                        from interfaces.api import app
-                        app.run(debug=False, host='0.0.0.0', port=5000)
+                        from interfaces.api import create_app
+                        create_app(preload=True).run(debug=False, host='0.0.0.0', port=5000)
                     except KeyboardInterrupt:
                         self.print_colored("\nReturning to terminal mode...", "cyan")
                         continue
@@ -267,14 +385,16 @@ class AgenticAISystem:
                 elif user_input.lower() == 'help':
                     print("\nCommands:")
                     print("   • 'status' - Show system status")
+                    print("   • 'metrics' - Show stage latency and counters")
+                    print("   • 'trace' - Trace the next turn (Chrome trace format)")
+                    print("   • 'profile [N] [sampling]' - Profile the next N turns")
                     print("   • 'demo' - Run demo scenarios")
                     print("   • 'api' - Start web interface")
                     print("   • 'quit' - Exit system")
                     continue
                 
                 # Process user input
-                emotional_analysis = self.process_user_input(user_input)
-                self.run_agent_responses(user_input, emotional_analysis)
+                self.run_turn(user_input)
                 
             except Exception as e:
                 self.print_colored(f"\nError: {str(e)}", "red")
@@ -298,8 +418,37 @@ class AgenticAISystem:
             self.run_interactive_mode()
 
 
+def run_startup_profile(target: str, top: int = 15):
+    """Report import times (as `python -X importtime` would) and construction phases"""
+    statements = {
+        "cli": "import main",
+        "api": "from interfaces import api; api.create_app()"
+    }
+    for name in (("cli", "api") if target == "all" else (target,)):
+        print_import_report(profile_imports(statements[name], cwd=os.getcwd()), top)
+    
+    if target in ("cli", "all"):
+        system = AgenticAISystem()
+        ready = system.startup.elapsed()
+        print(f"\nAgenticAISystem(): {ready * 1000:.0f} ms until the welcome banner")
+        for phase, seconds in system.startup.phases.items():
+            print(f"   {seconds * 1000:9.1f} ms  {phase}")
+        if system.llm_service is not None:
+            available = system.llm_service.is_available()
+            print(f"   LLM connection test finished {system.startup.elapsed() * 1000:.0f} ms after start "
+                  f"in the background ({'available' if available else 'unavailable'})")
+
+
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Coherence Protocol agentic AI system")
+    parser.add_argument("--startup-profile", nargs="?", const="cli", choices=("cli", "api", "all"),
+                        help="Report import and initialization times instead of starting")
+    args = parser.parse_args()
+    if args.startup_profile:
+        run_startup_profile(args.startup_profile)
+        return
+    
     try:
         system = AgenticAISystem()
         system.run()
@@ -0,0 +1,240 @@
+"""
+Offline stand-in for the OpenAI Chat Completions API.
+
+Serves POST /v1/chat/completions with canned, well-formed answers for each of the system's
+call types (Agent A and B replies, emotional analysis and summary JSON, monitoring flags), picked
+from the system prompt, plus token usage with the system prompt reported as cached after its
+first use. Latency, jitter and an error rate are configurable so load tests can exercise slow
+calls, retries and fallbacks without network access.
+
+Usage:
+    python src/tools/llm_stub.py --port 8001 --latency-ms 300 --jitter-ms 100 --error-rate 0.02
+    # then set openai.base_url: "http://127.0.0.1:8001/v1" in config/settings.yaml
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.prompt_builder import count_tokens
+from core.turn_features import TurnFeatures
+
+AGENT_A_REPLIES = {
+    "happy": "That's wonderful to hear. What's been the best part of it for you?",
+    "sad": "I'm sorry it feels heavy right now. I'm here with you - what's weighing on you most?",
+    "angry": "It makes sense to feel frustrated about that. What would help you feel heard right now?",
+    "anxious": "That sounds stressful. Let's slow down for a moment - what feels most uncertain?",
+    "confused": "It's okay not to have it all sorted out. Which part feels most tangled?",
+    "neutral": "Thanks for sharing that with me. How are you feeling about it overall?",
+}
+
+AGENT_B_REPLY = "Let's pause for a moment and take a slow breath together before we continue."
+
+
+def _last_user_text(messages: List[Dict], tail: int = 600) -> str:
+    """End of the last user message, where the per-turn input goes"""
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return str(message.get("content", ""))[-tail:]
+    return ""
+
+
+def _emotional_analysis(features: TurnFeatures) -> Dict:
+    recursion = [phrase for phrase in ("keep thinking", "over and over", "can't stop", "again and again")
+                 if phrase in features.normalized]
+    if features.coherence_loss_phrase:
+        coherence = "coherence_lost"
+    elif recursion:
+        coherence = "recursion_risk"
+    elif features.contradiction_type:
+        coherence = "drift_detected"
+    else:
+        coherence = "stable"
+    return {
+        "primary_emotion": features.lexicon_state,
+        "emotional_intensity": round(min(1.0, 0.3 + 0.2 * sum(features.lexicon_hits.values())), 2),
+        "contradiction_detected": bool(features.contradiction_type),
+        "recursion_indicators": recursion,
+        "coherence_assessment": coherence,
+        "key_concerns": [features.lexicon_state] if features.lexicon_state != "neutral" else [],
+        "intervention_needed": coherence != "stable",
+    }
+
+
+def completion_content(messages: List[Dict]) -> str:
+    """Canned answer for the call type named by the system prompt"""
+    system = str(messages[0].get("content", "")) if messages and messages[0].get("role") == "system" else ""
+    features = TurnFeatures(_last_user_text(messages))
+
+    if system.startswith("You are an expert emotional analysis"):
+        return json.dumps(_emotional_analysis(features))
+    if system.startswith("You are an expert conversation analyst"):
+        return json.dumps({
+            "summary": "The user is working through everyday stressors and mixed feelings.",
+            "key_themes": ["work", "relationships", "wellbeing"],
+            "emotional_arc": ["neutral", features.lexicon_state],
+            "concerning_patterns": [],
+            "overall_coherence": "stable",
+        })
+    if system.startswith("You are a clinical monitoring assistant"):
+        issues = []
+        if features.recursion_phrase_hits or features.strong_recursion_indicator:
+            issues.append("recursion")
+        if features.contradiction_type:
+            issues.append("contradiction")
+        if features.coherence_loss_phrase:
+            issues.append("coherence_loss")
+        return "\n".join(issues) or "none"
+    if system.startswith("You are Agent B"):
+        return AGENT_B_REPLY
+    if system.startswith("You are Agent A"):
+        return AGENT_A_REPLIES.get(features.lexicon_state, AGENT_A_REPLIES["neutral"])
+    return "ok"
+
+
+class StubState:
+    """Settings and counters shared by the handler threads"""
+
+    def __init__(self, latency_ms: float, jitter_ms: float, error_rate: float, error_status: int, seed: int = None):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.seen_prefixes = set()
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def draw(self) -> Tuple[float, bool]:
+        """Delay for the next request and whether it fails"""
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.rng.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            failed = self.rng.random() < self.error_rate
+            self.errors += failed
+        return delay, failed
+
+    def cached_tokens(self, messages: List[Dict]) -> int:
+        """Tokens of the system prompt if it was sent before, as a provider prompt cache reports"""
+        if not messages or messages[0].get("role") != "system":
+            return 0
+        prefix = str(messages[0].get("content", ""))
+        key = hashlib.sha1(prefix.encode("utf-8")).hexdigest()
+        with self.lock:
+            seen = key in self.seen_prefixes
+            self.seen_prefixes.add(key)
+        return count_tokens(prefix) if seen else 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state: StubState = None
+    quiet = True
+
+    def _send_json(self, status: int, body: Dict):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/health"):
+            self._send_json(200, {"status": "ok", "requests": self.state.requests, "errors": self.state.errors})
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}})
+            return
+
+        delay, failed = self.state.draw()
+        time.sleep(delay)
+        if failed:
+            self._send_json(self.state.error_status,
+                            {"error": {"message": "Simulated upstream error", "type": "server_error"}})
+            return
+
+        messages = request.get("messages", [])
+        content = completion_content(messages)
+        prompt_tokens = sum(count_tokens(str(message.get("content", ""))) for message in messages)
+        completion_tokens = count_tokens(content)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": self.state.cached_tokens(messages)},
+            },
+        })
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8001, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+          error_rate: float = 0.0, error_status: int = 500, seed: int = None, quiet: bool = True) -> ThreadingHTTPServer:
+    """Start the stub on a background thread and return the server (call shutdown() to stop it)"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "state": StubState(latency_ms, jitter_ms, error_rate, error_status, seed),
+        "quiet": quiet,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible stand-in for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=250.0, help="Mean response delay")
+    parser.add_argument("--jitter-ms", type=float, default=75.0, help="Standard deviation of the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of failed requests (e.g. 429)")
+    parser.add_argument("--seed", type=int, help="Seed for delays and failures")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+                   args.error_status, args.seed, quiet=not args.verbose)
+    print(f"LLM stand-in listening on http://{args.host}:{args.port}/v1 "
+          f"(latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, error rate {args.error_rate:.1%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+HTTP load generator for the API.
+
+Synthetic users hold multi-turn conversations against /api/send_input, each in its own session
+(X-Session-ID), replaying transcripts from a JSONL corpus with think time between turns. Users
+also poll /api/system_status and now and then run /api/run_demo. Users arrive as:
+    closed    --users conversations at all times; a finished user is replaced at once
+    poisson   new users at --rate per second with exponential gaps, at most --users at once
+    constant  new users at --rate per second with even gaps, at most --users at once
+
+The report has throughput, p50/p95/p99 latency and mean response size per endpoint, error rates,
+the LLM error and fallback rates per turn (from /metrics) and the server's RSS over time.
+--view minimal and --accept-encoding gzip measure trimmed and compressed responses.
+
+To run fully offline, start the LLM stand-in and point the API at it:
+    python src/tools/llm_stub.py --port 8001                # openai.base_url: http://127.0.0.1:8001/v1
+    python src/interfaces/api.py
+    python src/tools/load_test.py --users 20 --duration 60 --arrival poisson --rate 2
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+ENDPOINTS = ("send_input", "system_status", "run_demo")
+
+# Counters read from /metrics before and after the run
+_FALLBACKS = "agentic_fallbacks_total"
+_LLM_ERRORS = "agentic_llm_errors_total"
+_RSS = "agentic_process_resident_memory_bytes"
+_SESSIONS = "agentic_active_sessions"
+
+
+def load_conversations(corpus_path: str) -> List[List[str]]:
+    """User turns of every transcript in a {"turns": [{"text": ...}]} JSONL corpus"""
+    conversations = []
+    with open(corpus_path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                turns = [turn["text"] for turn in json.loads(line).get("turns", [])]
+                if turns:
+                    conversations.append(turns)
+    if not conversations:
+        raise ValueError(f"No conversations in {corpus_path}")
+    return conversations
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def metric_totals(text: str) -> Dict[str, float]:
+    """Sum of every sample per metric name in a Prometheus text page (labels ignored)"""
+    totals = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        try:
+            series, value = line.rsplit(' ', 1)
+            name = series.split('{', 1)[0]
+            totals[name] = totals.get(name, 0.0) + float(value)
+        except ValueError:
+            continue
+    return totals
+
+
+class Recorder:
+    """Latencies and failures per endpoint, shared by all user threads"""
+
+    def __init__(self):
+        self.latencies = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.response_bytes = {endpoint: 0 for endpoint in ENDPOINTS}
+        self.error_samples = []
+        self.lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str] = None, size: int = 0):
+        with self.lock:
+            if error:
+                self.errors[endpoint] += 1
+                if len(self.error_samples) < 10:
+                    self.error_samples.append(f"{endpoint}: {error}")
+            else:
+                self.latencies[endpoint].append(seconds)
+                self.response_bytes[endpoint] += size
+
+
+class LoadTest:
+    def __init__(self, base_url: str, conversations: List[List[str]], users: int, duration: float,
+                 arrival: str = "closed", rate: float = 1.0, think_time: float = 1.0,
+                 status_ratio: float = 0.2, demo_ratio: float = 0.02, timeout: float = 60.0,
+                 sample_interval: float = 1.0, seed: int = None, view: str = None,
+                 accept_encoding: str = None):
+        self.base_url = base_url.rstrip('/')
+        self.conversations = conversations
+        self.users = users
+        self.duration = duration
+        self.arrival = arrival
+        self.rate = rate
+        self.think_time = think_time
+        self.status_ratio = status_ratio
+        self.demo_ratio = demo_ratio
+        self.timeout = timeout
+        self.sample_interval = sample_interval
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.view = view
+        self.accept_encoding = accept_encoding
+
+        self.recorder = Recorder()
+        self.rss_samples = []
+        self.turns = 0
+        self.users_started = 0
+        self.users_completed = 0
+        self.arrivals_dropped = 0
+        self.run_id = f"load-{int(time.time())}"
+        self._user_ids = itertools.count(1)
+        self._active = threading.Semaphore(users)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _request(self, method: str, path: str, body: Dict = None, session_id: str = None,
+                 accept_encoding: str = None) -> bytes:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        if session_id:
+            request.add_header('X-Session-ID', session_id)
+        if accept_encoding:
+            request.add_header('Accept-Encoding', accept_encoding)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.read()
+
+    def _call(self, endpoint: str, method: str, path: str, body: Dict = None, session_id: str = None):
+        if self.view:
+            path = f"{path}?view={self.view}"
+        start = time.perf_counter()
+        error = None
+        size = 0
+        try:
+            # Bytes as sent on the wire; compressed bodies are not decoded
+            size = len(self._request(method, path, body, session_id, self.accept_encoding))
+        except urllib.error.HTTPError as e:
+            error = f"HTTP {e.code}"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.recorder.record(endpoint, time.perf_counter() - start, error, size)
+
+    def _think(self, rng: random.Random):
+        if self.think_time > 0:
+            self._stop.wait(rng.expovariate(1.0 / self.think_time))
+
+    def _user(self, user_number: int):
+        """One synthetic user's whole conversation"""
+        rng = random.Random(None if self.seed is None else self.seed * 100003 + user_number)
+        session_id = f"{self.run_id}-{user_number}"
+        try:
+            for text in rng.choice(self.conversations):
+                if self._stop.is_set():
+                    return
+                self._call("send_input", "POST", "/api/send_input", {"input": text}, session_id)
+                with self._lock:
+                    self.turns += 1
+                if rng.random() < self.status_ratio:
+                    self._call("system_status", "GET", "/api/system_status", session_id=session_id)
+                if rng.random() < self.demo_ratio:
+                    self._call("run_demo", "POST", "/api/run_demo", {}, session_id)
+                self._think(rng)
+            with self._lock:
+                self.users_completed += 1
+        finally:
+            self._active.release()
+
+    def _start_user(self):
+        with self._lock:
+            self.users_started += 1
+        threading.Thread(target=self._user, args=(next(self._user_ids),), daemon=True).start()
+
+    def _arrivals(self, deadline: float):
+        while not self._stop.is_set() and time.time() < deadline:
+            if self.arrival == "closed":
+                # Blocks until a conversation finishes, keeping `users` in flight
+                if self._active.acquire(timeout=0.1):
+                    self._start_user()
+                continue
+            if self._active.acquire(blocking=False):
+                self._start_user()
+            else:
+                with self._lock:
+                    self.arrivals_dropped += 1
+            gap = self.rng.expovariate(self.rate) if self.arrival == "poisson" else 1.0 / self.rate
+            self._stop.wait(gap)
+
+    def _sample_server(self, started: float) -> Dict[str, float]:
+        try:
+            totals = metric_totals(self._request("GET", "/metrics").decode('utf-8'))
+        except Exception:
+            return {}
+        self.rss_samples.append({
+            "elapsed": round(time.time() - started, 1),
+            "rss_mb": round(totals.get(_RSS, 0.0) / 2**20, 1),
+            "sessions": int(totals.get(_SESSIONS, 0))
+        })
+        return totals
+
+    def run(self) -> Dict:
+        started = time.time()
+        before = self._sample_server(started)
+        deadline = started + self.duration
+        arrivals = threading.Thread(target=self._arrivals, args=(deadline,), daemon=True)
+        arrivals.start()
+        while time.time() < deadline:
+            self._stop.wait(min(self.sample_interval, max(0.0, deadline - time.time())))
+            self._sample_server(started)
+        self._stop.set()
+        arrivals.join()
+        # Let requests already in flight finish so their latencies count
+        for _ in range(self.users):
+            self._active.acquire(timeout=self.timeout)
+        elapsed = time.time() - started
+        after = self._sample_server(started)
+        return self.report(elapsed, before, after)
+
+    def report(self, elapsed: float, before: Dict, after: Dict) -> Dict:
+        endpoints = {}
+        for endpoint in ENDPOINTS:
+            latencies = sorted(self.recorder.latencies[endpoint])
+            errors = self.recorder.errors[endpoint]
+            total = len(latencies) + errors
+            endpoints[endpoint] = {
+                "requests": total,
+                "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+                "mean_response_bytes": round(self.recorder.response_bytes[endpoint] / len(latencies)) if latencies else 0,
+            }
+
+        turns = max(1, self.turns)
+        metrics_available = bool(before) and bool(after)
+        fallbacks = after.get(_FALLBACKS, 0.0) - before.get(_FALLBACKS, 0.0)
+        llm_errors = after.get(_LLM_ERRORS, 0.0) - before.get(_LLM_ERRORS, 0.0)
+        rss = [sample["rss_mb"] for sample in self.rss_samples]
+        return {
+            "config": {
+                "base_url": self.base_url, "users": self.users, "duration": self.duration,
+                "arrival": self.arrival, "rate": self.rate, "think_time": self.think_time,
+                "view": self.view or "full", "accept_encoding": self.accept_encoding
+            },
+            "elapsed_seconds": round(elapsed, 1),
+            "users_started": self.users_started,
+            "users_completed": self.users_completed,
+            "arrivals_dropped": self.arrivals_dropped,
+            "turns": self.turns,
+            "endpoints": endpoints,
+            "response_bytes_per_turn": round(sum(self.recorder.response_bytes.values()) / turns),
+            "fallbacks_per_turn": round(fallbacks / turns, 4) if metrics_available else None,
+            "llm_errors_per_turn": round(llm_errors / turns, 4) if metrics_available else None,
+            "rss_mb": {
+                "start": rss[0] if rss else None,
+                "peak": max(rss) if rss else None,
+                "end": rss[-1] if rss else None,
+                "samples": self.rss_samples
+            },
+            "error_samples": self.recorder.error_samples
+        }
+
+
+def print_report(report: Dict, timeline_rows: int = 12):
+    print(f"\nLoad test: {report['config']['arrival']} arrivals, up to {report['config']['users']} users, "
+          f"{report['elapsed_seconds']}s")
+    print(f"   Users started {report['users_started']}, completed {report['users_completed']}, "
+          f"arrivals dropped at the user cap {report['arrivals_dropped']}; {report['turns']} turns")
+
+    print(f"\n   {'endpoint':<15}{'requests':>9}{'req/s':>9}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'bytes':>9}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"   {endpoint:<15}{stats['requests']:>9}{stats['throughput_rps']:>9.2f}{stats['error_rate']:>9.1%}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+              f"{stats['mean_response_bytes']:>9}")
+    print(f"   Response bytes per turn {report['response_bytes_per_turn']} "
+          f"(view {report['config']['view']}, Accept-Encoding {report['config']['accept_encoding'] or 'none'})")
+
+    if report["fallbacks_per_turn"] is None:
+        print("\n   Fallback and LLM error rates unavailable (/metrics not reachable)")
+    else:
+        print(f"\n   Fallbacks per turn {report['fallbacks_per_turn']:.3f}   "
+              f"LLM errors per turn {report['llm_errors_per_turn']:.3f}")
+
+    samples = report["rss_mb"]["samples"]
+    if samples:
+        print(f"\n   Server RSS: start {report['rss_mb']['start']} MB, peak {report['rss_mb']['peak']} MB, "
+              f"end {report['rss_mb']['end']} MB")
+        step = max(1, -(-len(samples) // timeline_rows))
+        for sample in samples[::step]:
+            print(f"      t={sample['elapsed']:>6.1f}s  {sample['rss_mb']:>8.1f} MB  {sample['sessions']:>5} sessions")
+
+    if report["error_samples"]:
+        print("\n   Sample errors:")
+        for error in report["error_samples"]:
+            print(f"      {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent users against the API")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="API base URL")
+    parser.add_argument("--corpus", default="data/threshold_corpus.jsonl", help="JSONL transcripts to replay")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent users (closed) or the cap on them")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load")
+    parser.add_argument("--arrival", choices=("closed", "poisson", "constant"), default="closed")
+    parser.add_argument("--rate", type=float, default=1.0, help="New users per second for poisson/constant")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean seconds between a user's turns")
+    parser.add_argument("--status-ratio", type=float, default=0.2, help="Chance of a status poll after a turn")
+    parser.add_argument("--demo-ratio", type=float, default=0.02, help="Chance of a demo run after a turn")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between /metrics samples")
+    parser.add_argument("--seed", type=int, help="Seed for arrivals, transcripts and think times")
+    parser.add_argument("--view", choices=("full", "minimal"), help="Response view to request (default: the server's)")
+    parser.add_argument("--accept-encoding", help="Accept-Encoding to send, e.g. gzip or 'br, gzip'")
+    parser.add_argument("--stub-port", type=int,
+                        help="Also start the LLM stand-in on this port (the API's openai.base_url must point at it)")
+    parser.add_argument("--stub-latency-ms", type=float, default=250.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    stub = None
+    if args.stub_port:
+        from tools.llm_stub import serve
+        stub = serve(port=args.stub_port, latency_ms=args.stub_latency_ms, jitter_ms=args.stub_latency_ms / 3,
+                     error_rate=args.stub_error_rate, seed=args.seed)
+        print(f"LLM stand-in on http://127.0.0.1:{args.stub_port}/v1")
+
+    conversations = load_conversations(args.corpus)
+    print(f"Replaying {len(conversations)} conversations from {args.corpus} against {args.url}")
+    test = LoadTest(args.url, conversations, args.users, args.duration, args.arrival, args.rate,
+                    args.think_time, args.status_ratio, args.demo_ratio, args.timeout,
+                    args.sample_interval, args.seed, args.view, args.accept_encoding)
+    report = test.run()
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"\nWrote report to {args.output}")
+    if stub:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Run a scenario suite against a live API as a background job and report the results.
+
+The suite is a file in the transcript corpus format (JSONL, or a JSON or YAML list):
+{"id": "...", "turns": [{"text": "...", "expect": ["drift", "recursion", "distress"]}]}.
+It is posted to /api/jobs, whose progress is polled until the job finishes. Turns with "expect"
+are checked against the alerts raised, giving per-detector precision/recall and the failing turns.
+Each scenario runs in a private session, in parallel on the server's job workers, unless
+--session-id puts them all in one session.
+
+Usage:
+    python src/tools/run_scenarios.py --file data/threshold_corpus.jsonl
+    python src/tools/run_scenarios.py --server-file threshold_corpus.jsonl --strict --output results.json
+
+With --strict the exit status is 1 when any expectation fails or any scenario errors.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from interfaces.jobs import FINISHED, load_scenario_file
+
+
+def call(url: str, method: str = "GET", body: Dict = None, timeout: float = 30.0) -> Dict:
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"{method} {url}: {e.code} {e.read().decode('utf-8', 'replace')}")
+
+
+def fetch_results(url: str, job_id: str, page_size: int = 100) -> List[Dict]:
+    """Every scenario's results, a page at a time"""
+    results = []
+    while True:
+        page = call(f"{url}/api/jobs/{job_id}?offset={len(results)}&limit={page_size}")
+        results.extend(page["results"])
+        if not page["results"] or len(results) >= page["scenarios"]:
+            return results
+
+
+def failing_turns(results: List[Dict]) -> List[Dict]:
+    failures = []
+    for scenario in results:
+        for number, turn in enumerate(scenario["turns"], 1):
+            if turn.get("passed") is False:
+                failures.append({"scenario": scenario["id"], "turn": number, "input": turn["input"],
+                                 "expected": turn["expected"], "raised": turn["raised"]})
+    return failures
+
+
+def print_report(job: Dict, results: List[Dict], failures: List[Dict], max_failures: int = 20):
+    elapsed = (job["finished_at"] or time.time()) - (job["started_at"] or job["created_at"])
+    print(f"\nJob {job['job_id']} ({job['name']}): {job['status']} in {elapsed:.1f}s")
+    print(f"   Scenarios {job['scenarios_done']}/{job['scenarios']}, turns {job['turns_done']}/{job['turns_total']}, "
+          f"errors {job['errors']}")
+    for scenario in results:
+        if scenario.get("error"):
+            print(f"      {scenario['id']}: {scenario['error']}")
+
+    expectations = job["expectations"]
+    if not expectations["checked"]:
+        print("   No turns with expectations")
+        return
+    print(f"   Expectations: {expectations['checked'] - expectations['failed']}/{expectations['checked']} turns passed")
+    print(f"\n   {'detector':<12}{'tp':>6}{'fp':>6}{'fn':>6}{'precision':>11}{'recall':>9}")
+    for detector, score in expectations["detectors"].items():
+        print(f"   {detector:<12}{score['tp']:>6}{score['fp']:>6}{score['fn']:>6}"
+              f"{score['precision']:>11.3f}{score['recall']:>9.3f}")
+    if failures:
+        print(f"\n   Failing turns ({min(len(failures), max_failures)} of {len(failures)}):")
+        for failure in failures[:max_failures]:
+            print(f"      {failure['scenario']} #{failure['turn']}: expected {failure['expected']}, "
+                  f"raised {failure['raised']} - {failure['input'][:60]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a scenario suite against the API as a background job")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="API base URL")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="Local scenario file to upload")
+    source.add_argument("--server-file", help="Scenario file in the server's jobs.scenario_dir")
+    parser.add_argument("--name", help="Job name (default: the file name)")
+    parser.add_argument("--session-id", help="Run every scenario in this session, in order")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between progress checks")
+    parser.add_argument("--timeout", type=float, help="Cancel the job after this many seconds")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 on failed expectations or scenario errors")
+    parser.add_argument("--output", help="Write the job summary, results and failing turns as JSON")
+    args = parser.parse_args()
+
+    body = {"name": args.name or os.path.basename(args.file or args.server_file)}
+    if args.file:
+        body["scenarios"] = load_scenario_file(args.file)
+    else:
+        body["scenario_file"] = args.server_file
+    if args.session_id:
+        body["session_id"] = args.session_id
+
+    job = call(f"{args.url}/api/jobs", "POST", body)
+    print(f"Job {job['job_id']}: {job['scenarios']} scenarios, {job['turns_total']} turns")
+    status_url = f"{args.url}/api/jobs/{job['job_id']}"
+    deadline = time.monotonic() + args.timeout if args.timeout else None
+    try:
+        while job["status"] not in FINISHED:
+            time.sleep(args.poll_interval)
+            job = call(f"{status_url}?results=0")
+            print(f"   {job['status']:<10}{job['turns_done']:>7}/{job['turns_total']} turns  "
+                  f"{job['scenarios_done']}/{job['scenarios']} scenarios", end="\r", flush=True)
+            if deadline is not None and time.monotonic() > deadline and job["status"] not in FINISHED:
+                print(f"\nTimed out after {args.timeout}s, cancelling")
+                call(status_url, "DELETE")
+                deadline = None
+    except KeyboardInterrupt:
+        print("\nCancelling")
+        call(status_url, "DELETE")
+        while job["status"] not in FINISHED:
+            time.sleep(args.poll_interval)
+            job = call(f"{status_url}?results=0")
+    print()
+
+    results = fetch_results(args.url, job["job_id"])
+    failures = failing_turns(results)
+    print_report(job, results, failures)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({"job": job, "results": results, "failures": failures}, file, indent=2)
+        print(f"\nWrote results to {args.output}")
+    if args.strict and (failures or job["errors"] or job["status"] != "completed"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
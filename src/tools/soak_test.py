@@ -0,0 +1,279 @@
+"""
+Memory-growth soak test.
+
+Drives synthetic conversations through the API in-process (Flask test client) for a fixed time or
+number of turns, keeping --sessions conversations live and retiring each after --session-turns
+turns with /api/reset_system. Every --snapshot-every turns it takes a tracemalloc snapshot and
+measures every live session, then reports:
+    bytes per turn          growth of all traced memory, fitted over the run
+    bytes per session       what live sessions hold, measured by walking each one
+    unexplained growth      traced memory not held by live sessions; it should stay flat, so a
+                            positive slope points at a leak outside the session objects
+    allocation sites        growth per site since the first snapshot, per turn and per live session
+
+Exits with status 1 when a live session exceeds the per-session ceiling (api.session_memory_ceiling_mb,
+or --ceiling-mb) or unexplained growth exceeds --max-leak-per-turn.
+
+Usage:
+    python src/tools/soak_test.py --duration 3600 --sessions 50 --session-turns 300
+    python src/tools/soak_test.py --turns 20000 --snapshot-every 1000 --output soak.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.memory_tracking import start_tracing, take_snapshot, top_allocators
+from core.metrics import process_rss_bytes
+from tools.load_test import load_conversations
+
+MB = 2 ** 20
+
+
+def slope(xs: List[float], ys: List[float]) -> float:
+    """Least-squares slope of ys over xs"""
+    if len(xs) < 2:
+        return 0.0
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    if not variance:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance
+
+
+class SoakTest:
+    def __init__(self, api, conversations: List[List[str]], sessions: int, session_turns: int,
+                 snapshot_every: int, ceiling_bytes: int, status_every: int = 5, top: int = 15, seed: int = 7):
+        self.api = api
+        self.client = api.app.test_client()
+        self.conversations = conversations
+        self.session_count = sessions
+        self.session_turns = session_turns
+        self.snapshot_every = snapshot_every
+        self.ceiling_bytes = ceiling_bytes
+        self.status_every = status_every
+        self.top = top
+        self.rng = random.Random(seed)
+
+        self.turns = 0
+        self.sessions_created = 0
+        self.sessions_retired = 0
+        self.errors = 0
+        self.samples = []
+        self.violations = []
+        self.baseline = None
+        self.baseline_turns = 0
+        self.latest = None
+        # session id -> [turns sent, conversation, position]
+        self.live = {}
+        for _ in range(sessions):
+            self._open_session()
+
+    def _open_session(self):
+        self.sessions_created += 1
+        session_id = f"soak-{self.sessions_created}"
+        self.live[session_id] = [0, self.rng.choice(self.conversations), 0]
+
+    def _retire(self, session_id: str):
+        self.client.post('/api/reset_system', headers={'X-Session-ID': session_id})
+        del self.live[session_id]
+        self.sessions_retired += 1
+        self._open_session()
+
+    def step(self):
+        """Send one turn for a random live session"""
+        session_id = self.rng.choice(list(self.live))
+        state = self.live[session_id]
+        conversation = state[1]
+        text = conversation[state[2] % len(conversation)]
+        state[2] += 1
+        state[0] += 1
+
+        response = self.client.post('/api/send_input', json={'input': text}, headers={'X-Session-ID': session_id})
+        if response.status_code != 200:
+            self.errors += 1
+        if self.status_every and state[0] % self.status_every == 0:
+            self.client.get('/api/system_status', headers={'X-Session-ID': session_id})
+        self.turns += 1
+        if state[0] >= self.session_turns:
+            self._retire(session_id)
+
+    def sample(self, started: float) -> Dict:
+        """Snapshot traced memory and measure every live session"""
+        snapshot = take_snapshot()
+        traced = sum(stat.size for stat in snapshot.statistics("filename"))
+        usage = self.api.get_sessions().memory_usage()
+        session_bytes = sum(entry["bytes"] for entry in usage)
+        session_turns = sum(entry["turns"] for entry in usage)
+        largest = usage[0] if usage else {"session_id": None, "bytes": 0, "turns": 0}
+
+        row = {
+            "turns": self.turns,
+            "elapsed": round(time.time() - started, 1),
+            "traced_mb": round(traced / MB, 2),
+            "rss_mb": round(process_rss_bytes() / MB, 1),
+            "live_sessions": len(usage),
+            "sessions_mb": round(session_bytes / MB, 2),
+            "unexplained_mb": round((traced - session_bytes) / MB, 2),
+            "bytes_per_session": int(session_bytes / len(usage)) if usage else 0,
+            "bytes_per_session_turn": int(session_bytes / session_turns) if session_turns else 0,
+            "largest_session_mb": round(largest["bytes"] / MB, 2),
+            "largest_session_turns": largest["turns"],
+        }
+        self.samples.append(row)
+        for entry in usage:
+            if entry["bytes"] > self.ceiling_bytes:
+                self.violations.append(
+                    f"session {entry['session_id']} held {entry['bytes'] / MB:.1f} MB after {entry['turns']} turns "
+                    f"(ceiling {self.ceiling_bytes / MB:.1f} MB) at turn {self.turns}")
+
+        if self.baseline is None:
+            self.baseline = snapshot
+            self.baseline_turns = self.turns
+        self.latest = snapshot
+        return row
+
+    def run(self, duration: float, max_turns: int, warmup: int, progress: bool = True) -> Dict:
+        started = time.time()
+        for _ in range(warmup):
+            self.step()
+        self.sample(started)
+        if progress:
+            self._print_row(self.samples[-1], header=True)
+
+        deadline = started + duration if duration else None
+        while (not max_turns or self.turns < max_turns) and (deadline is None or time.time() < deadline):
+            self.step()
+            if self.turns % self.snapshot_every == 0:
+                self.sample(started)
+                if progress:
+                    self._print_row(self.samples[-1])
+        if self.samples[-1]["turns"] != self.turns:
+            self.sample(started)
+            if progress:
+                self._print_row(self.samples[-1])
+        return self.report(time.time() - started)
+
+    @staticmethod
+    def _print_row(row: Dict, header: bool = False):
+        if header:
+            print(f"   {'turns':>9}{'elapsed':>9}{'traced':>10}{'rss':>9}{'sessions':>9}{'held':>9}"
+                  f"{'other':>9}{'B/sess-turn':>13}{'largest':>9}")
+        print(f"   {row['turns']:>9}{row['elapsed']:>8.0f}s{row['traced_mb']:>8.1f}MB{row['rss_mb']:>7.1f}MB"
+              f"{row['live_sessions']:>9}{row['sessions_mb']:>7.1f}MB{row['unexplained_mb']:>7.1f}MB"
+              f"{row['bytes_per_session_turn']:>13}{row['largest_session_mb']:>7.1f}MB")
+
+    def report(self, elapsed: float) -> Dict:
+        measured = self.samples[1:] if len(self.samples) > 2 else self.samples
+        turns = [row["turns"] for row in measured]
+        traced_per_turn = slope(turns, [row["traced_mb"] * MB for row in measured])
+        unexplained_per_turn = slope(turns, [row["unexplained_mb"] * MB for row in measured])
+
+        sites = []
+        turns_since_baseline = max(1, self.turns - self.baseline_turns)
+        live_sessions = max(1, self.samples[-1]["live_sessions"])
+        for site in top_allocators(self.latest, self.top, baseline=self.baseline):
+            site["bytes_per_turn"] = round(site["size_diff_bytes"] / turns_since_baseline, 1)
+            site["bytes_per_live_session"] = int(site["size_bytes"] / live_sessions)
+            sites.append(site)
+
+        return {
+            "elapsed_seconds": round(elapsed, 1),
+            "turns": self.turns,
+            "turns_per_second": round(self.turns / elapsed, 1) if elapsed else 0.0,
+            "sessions_created": self.sessions_created,
+            "sessions_retired": self.sessions_retired,
+            "errors": self.errors,
+            "traced_bytes_per_turn": round(traced_per_turn, 1),
+            "unexplained_bytes_per_turn": round(unexplained_per_turn, 1),
+            "bytes_per_session": self.samples[-1]["bytes_per_session"],
+            "bytes_per_session_turn": self.samples[-1]["bytes_per_session_turn"],
+            "session_memory_ceiling_bytes": self.ceiling_bytes,
+            "ceiling_violations": self.violations,
+            "top_growth_sites": sites,
+            "samples": self.samples
+        }
+
+
+def print_report(report: Dict):
+    print(f"\nSoak: {report['turns']:,} turns in {report['elapsed_seconds']}s ({report['turns_per_second']} turns/s), "
+          f"{report['sessions_created']} sessions created, {report['sessions_retired']} retired, "
+          f"{report['errors']} errors")
+    print(f"   Traced memory growth      {report['traced_bytes_per_turn']:>10,.0f} B/turn")
+    print(f"   Unexplained growth        {report['unexplained_bytes_per_turn']:>10,.0f} B/turn (outside live sessions)")
+    print(f"   Held per live session     {report['bytes_per_session']:>10,} B "
+          f"({report['bytes_per_session_turn']:,} B per session turn)")
+
+    print("\n   Top growth by allocation site:")
+    print(f"      {'site':<58}{'growth':>11}{'B/turn':>10}{'B/session':>11}")
+    for site in report["top_growth_sites"]:
+        print(f"      {site['site'][-58:]:<58}{site['size_diff_bytes']:>11,}{site['bytes_per_turn']:>10,.1f}"
+              f"{site['bytes_per_live_session']:>11,}")
+
+    if report["ceiling_violations"]:
+        print(f"\n   {len(report['ceiling_violations'])} ceiling violation(s), first:")
+        for violation in report["ceiling_violations"][:5]:
+            print(f"      {violation}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak the API with synthetic traffic and report memory growth")
+    parser.add_argument("--duration", type=float, default=600.0, help="Seconds to run (0 for no limit)")
+    parser.add_argument("--turns", type=int, default=0, help="Stop after this many turns (0 for no limit)")
+    parser.add_argument("--sessions", type=int, default=20, help="Conversations kept live at once")
+    parser.add_argument("--session-turns", type=int, default=200, help="Turns before a conversation is retired")
+    parser.add_argument("--snapshot-every", type=int, default=500, help="Turns between memory snapshots")
+    parser.add_argument("--warmup", type=int, default=100, help="Turns before the baseline snapshot")
+    parser.add_argument("--frames", type=int, default=1, help="tracemalloc traceback depth")
+    parser.add_argument("--top", type=int, default=15, help="Allocation sites to report")
+    parser.add_argument("--ceiling-mb", type=float, help="Per-session ceiling (default api.session_memory_ceiling_mb)")
+    parser.add_argument("--max-leak-per-turn", type=float, help="Fail when unexplained growth exceeds this many B/turn")
+    parser.add_argument("--corpus", default="data/threshold_corpus.jsonl", help="JSONL transcripts to replay")
+    parser.add_argument("--llm", action="store_true", help="Use the configured LLM (or stand-in) instead of fallbacks")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+    if not args.duration and not args.turns:
+        parser.error("set --duration or --turns")
+
+    # Trace before the API builds its state so that is attributed too
+    start_tracing(args.frames)
+    from interfaces import api
+    llm_service = api.get_llm_service()
+    if llm_service is not None and not args.llm:
+        llm_service.disable()
+
+    ceiling = int(args.ceiling_mb * MB) if args.ceiling_mb else api.session_memory_ceiling
+    conversations = load_conversations(args.corpus)
+    print(f"Soaking with {args.sessions} live sessions of {args.session_turns} turns, "
+          f"snapshots every {args.snapshot_every} turns, ceiling {ceiling / MB:.1f} MB per session")
+
+    test = SoakTest(api, conversations, args.sessions, args.session_turns, args.snapshot_every, ceiling,
+                    top=args.top, seed=args.seed)
+    report = test.run(args.duration, args.turns, args.warmup)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"\nWrote report to {args.output}")
+
+    failed = bool(report["ceiling_violations"])
+    if args.max_leak_per_turn is not None and report["unexplained_bytes_per_turn"] > args.max_leak_per_turn:
+        print(f"\nUnexplained growth {report['unexplained_bytes_per_turn']:.0f} B/turn exceeds "
+              f"{args.max_leak_per_turn:.0f} B/turn")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
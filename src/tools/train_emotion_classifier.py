@@ -0,0 +1,75 @@
+"""
+Train the local emotion classifier from a labeled JSONL corpus.
+
+Each corpus line is {"text": "...", "label": "happy|sad|angry|anxious|confused|neutral"}.
+
+Usage:
+    python src/tools/train_emotion_classifier.py --corpus data/emotion_corpus.jsonl --output data/emotion_model.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from typing import List, Tuple
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.emotion_classifier import EmotionClassifier
+
+
+def load_corpus(corpus_path: str) -> List[Tuple[str, str]]:
+    """Read (text, label) pairs from a JSONL corpus"""
+    samples = []
+    with open(corpus_path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "text" not in record or "label" not in record:
+                raise ValueError(f"Line {line_number} is missing 'text' or 'label'")
+            samples.append((record["text"], record["label"]))
+    return samples
+
+
+def cross_validate(samples: List[Tuple[str, str]], folds: int, alpha: float, seed: int = 13) -> float:
+    """Estimate held-out accuracy with k-fold cross validation"""
+    shuffled = list(samples)
+    random.Random(seed).shuffle(shuffled)
+
+    correct = 0
+    for fold in range(folds):
+        held_out = shuffled[fold::folds]
+        training = [sample for i, sample in enumerate(shuffled) if i % folds != fold]
+        classifier = EmotionClassifier.train(training, alpha=alpha)
+        correct += sum(1 for text, label in held_out if classifier.predict(text)[0] == label)
+
+    return correct / len(shuffled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local emotion classifier")
+    parser.add_argument("--corpus", default="data/emotion_corpus.jsonl", help="Labeled JSONL corpus")
+    parser.add_argument("--output", default="data/emotion_model.json", help="Where to write the model artifact")
+    parser.add_argument("--alpha", type=float, default=1.0, help="Laplace smoothing strength")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds (0 to skip)")
+    args = parser.parse_args()
+
+    samples = load_corpus(args.corpus)
+    print(f"Loaded {len(samples)} labeled samples from {args.corpus}")
+
+    if args.folds > 1:
+        accuracy = cross_validate(samples, args.folds, args.alpha)
+        print(f"{args.folds}-fold cross-validation accuracy: {accuracy:.1%}")
+
+    classifier = EmotionClassifier.train(samples, alpha=args.alpha)
+    classifier.save(args.output)
+    print(f"Wrote model with {classifier.metadata['vocabulary_size']} features to {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Grid- or random-search detector thresholds against a labeled transcript corpus.
+
+Each corpus line is {"id": "...", "turns": [{"text": "...", "expect": ["drift", "recursion", "distress"]}]},
+where "expect" lists the alerts a reviewer wants raised on that turn. Every configuration replays the
+corpus through the rule-based pipeline (Reasoning without the LLM, then Memory's stress level and
+biometric alert) and is scored on per-detector precision/recall and overall alert rate.
+
+Turn features do not depend on the thresholds, so they are computed once and shared with every
+worker of the process pool. Biometric noise is seeded per transcript, so all configurations see
+the same simulated readings.
+
+Usage:
+    python src/tools/tune_thresholds.py --corpus data/threshold_corpus.jsonl --workers 4
+    python src/tools/tune_thresholds.py --search random --samples 300 --output config/tuned_thresholds.yaml
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import yaml
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.memory import Memory
+from core.reasoning import Reasoning
+from core.turn_features import TurnFeatures
+from utils.config import Config
+
+DETECTORS = ("drift", "recursion", "distress")
+
+# Dotted settings keys and the values searched for each
+DEFAULT_SEARCH_SPACE = {
+    "emotional_drift.threshold": [0.3, 0.4, 0.5, 0.6],
+    "emotional_drift.recent_half_life": [2, 3, 5],
+    "emotional_drift.recursion_threshold": [1, 2, 3],
+    "emotional_drift.shingle_size": [2, 3, 4],
+    "biometric_simulation.stress_smoothing": [0.3, 0.5],
+    "biometric_simulation.alert_thresholds.hrv": [20, 25, 30],
+    "biometric_simulation.alert_thresholds.stress_level": [0.6, 0.75, 0.85],
+}
+
+# Filled in each worker by the pool initializer
+_shared = {}
+
+
+def load_corpus(corpus_path: str) -> List[Tuple[str, List[Tuple[str, TurnFeatures, frozenset]]]]:
+    """Read transcripts and precompute the threshold-independent features of every turn"""
+    transcripts = []
+    with open(corpus_path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "turns" not in record:
+                raise ValueError(f"Line {line_number} is missing 'turns'")
+            turns = []
+            for turn in record["turns"]:
+                unknown = set(turn.get("expect", [])) - set(DETECTORS)
+                if unknown:
+                    raise ValueError(f"Line {line_number} expects unknown alerts: {sorted(unknown)}")
+                turns.append((turn["text"], TurnFeatures(turn["text"]), frozenset(turn.get("expect", []))))
+            transcripts.append((record.get("id", f"transcript-{line_number}"), turns))
+    return transcripts
+
+
+def with_overrides(settings: Dict, overrides: Dict) -> Dict:
+    """Copy of settings with dotted-key overrides applied"""
+    settings = copy.deepcopy(settings)
+    for dotted_key, value in overrides.items():
+        section = settings
+        *parents, key = dotted_key.split(".")
+        for parent in parents:
+            child = section.get(parent)
+            if not isinstance(child, dict):
+                child = section[parent] = {}
+            section = child
+        section[key] = value
+    return settings
+
+
+def nested(overrides: Dict) -> Dict:
+    """Dotted-key overrides as nested settings sections"""
+    return with_overrides({}, overrides)
+
+
+def _init_worker(settings: Dict, transcripts: List):
+    _shared["settings"] = settings
+    _shared["transcripts"] = transcripts
+
+
+def evaluate(overrides: Dict) -> Dict:
+    """Replay the corpus under one configuration and score every detector"""
+    settings = with_overrides(_shared["settings"], overrides)
+    counts = {detector: {"tp": 0, "fp": 0, "fn": 0} for detector in DETECTORS}
+    turns_total = 0
+    alert_turns = 0
+
+    for transcript_id, turns in _shared["transcripts"]:
+        reasoning = Reasoning(settings, use_llm=False)
+        memory = Memory(transcript_id, settings)
+        for turn_number, (text, features, expected) in enumerate(turns, 1):
+            analysis = reasoning.analyze_input(text, turn_number, features)
+            memory.simulate_biometric_response(features.intensity, features.stress_factor)
+            memory.store_interaction(text, analysis, turn_number, features)
+
+            raised = set()
+            if analysis.get("drift_detected"):
+                raised.add("drift")
+            if analysis.get("recursion_detected"):
+                raised.add("recursion")
+            if memory.is_biometric_alert():
+                raised.add("distress")
+
+            turns_total += 1
+            alert_turns += bool(raised)
+            for detector in DETECTORS:
+                if detector in raised:
+                    counts[detector]["tp" if detector in expected else "fp"] += 1
+                elif detector in expected:
+                    counts[detector]["fn"] += 1
+
+    scores = {}
+    for detector, count in counts.items():
+        precision = count["tp"] / (count["tp"] + count["fp"]) if count["tp"] + count["fp"] else 0.0
+        recall = count["tp"] / (count["tp"] + count["fn"]) if count["tp"] + count["fn"] else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        scores[detector] = {"precision": round(precision, 3), "recall": round(recall, 3), "f1": round(f1, 3)}
+
+    return {
+        "overrides": overrides,
+        "detectors": scores,
+        "mean_f1": round(sum(score["f1"] for score in scores.values()) / len(scores), 4),
+        "alert_rate": round(alert_turns / turns_total, 4) if turns_total else 0.0
+    }
+
+
+def build_configurations(space: Dict, search: str, samples: int, seed: int) -> List[Dict]:
+    """Every grid point, or a random sample of distinct ones"""
+    keys = list(space)
+    if search == "grid":
+        return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+    rng = random.Random(seed)
+    grid_size = 1
+    for key in keys:
+        grid_size *= len(space[key])
+    configurations = {}
+    while len(configurations) < min(samples, grid_size):
+        values = tuple(rng.choice(space[key]) for key in keys)
+        configurations.setdefault(values, dict(zip(keys, values)))
+    return list(configurations.values())
+
+
+def write_best(result: Dict, output_path: str, corpus_path: str, evaluated: int):
+    """Write the winning overrides as settings.yaml sections"""
+    header = (f"# Best of {evaluated} configurations on {corpus_path}: mean F1 {result['mean_f1']}, "
+              f"alert rate {result['alert_rate']}\n"
+              f"# Merge these sections into config/settings.yaml\n")
+    with open(output_path, 'w') as file:
+        file.write(header)
+        yaml.safe_dump(nested(result["overrides"]), file, sort_keys=False, default_flow_style=False)
+
+
+def print_results(results: List[Dict], top: int):
+    print(f"\nTop {min(top, len(results))} configurations (by mean F1, then lower alert rate):")
+    for rank, result in enumerate(results[:top], 1):
+        detectors = "  ".join(
+            f"{name} P{score['precision']:.2f}/R{score['recall']:.2f}" for name, score in result["detectors"].items()
+        )
+        print(f"  {rank:>2}. F1 {result['mean_f1']:.3f}  alerts {result['alert_rate']:.0%}  {detectors}")
+        print(f"      {', '.join(f'{key}={value}' for key, value in result['overrides'].items())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune drift, recursion, stress and biometric alert thresholds")
+    parser.add_argument("--corpus", default="data/threshold_corpus.jsonl", help="Labeled transcript corpus")
+    parser.add_argument("--space", help="YAML mapping of dotted settings keys to candidate values")
+    parser.add_argument("--search", choices=("grid", "random"), default="grid")
+    parser.add_argument("--samples", type=int, default=200, help="Configurations to try with --search random")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes in the pool")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for random search and biometric noise")
+    parser.add_argument("--top", type=int, default=5, help="Configurations to print")
+    parser.add_argument("--output", default="config/tuned_thresholds.yaml", help="Where to write the best settings")
+    parser.add_argument("--report", help="Optional JSON file with every configuration's scores")
+    args = parser.parse_args()
+
+    space = DEFAULT_SEARCH_SPACE
+    if args.space:
+        with open(args.space, 'r') as file:
+            space = yaml.safe_load(file)
+
+    settings = Config().settings
+    # Same biometric noise for every configuration so scores differ only by the thresholds
+    settings = with_overrides(settings, {"biometric_simulation.seed": args.seed})
+
+    transcripts = load_corpus(args.corpus)
+    configurations = build_configurations(space, args.search, args.samples, args.seed)
+    turn_count = sum(len(turns) for _, turns in transcripts)
+    print(f"Loaded {len(transcripts)} transcripts ({turn_count} turns) from {args.corpus}")
+    print(f"Evaluating {len(configurations)} configurations ({args.search} search) on {args.workers} worker(s)")
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(settings, transcripts)) as pool:
+            chunksize = max(1, len(configurations) // (args.workers * 8))
+            results = list(pool.imap_unordered(evaluate, configurations, chunksize=chunksize))
+    else:
+        _init_worker(settings, transcripts)
+        results = [evaluate(overrides) for overrides in configurations]
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.1f}s ({len(configurations) * turn_count / elapsed:,.0f} turns/s)")
+
+    results.sort(key=lambda result: (-result["mean_f1"], result["alert_rate"]))
+    print_results(results, args.top)
+
+    write_best(results[0], args.output, args.corpus, len(results))
+    print(f"\nWrote best settings to {args.output}")
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"Wrote {len(results)} results to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,340 @@
+import copy
+import dataclasses
 import os
-import yaml
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
 
-class Config:
-    def __init__(self, config_file='config/settings.yaml'):
+DEFAULT_CONFIG_FILE = 'config/settings.yaml'
+
+
+class ConfigError(ValueError):
+    """The settings file parsed but a value has the wrong type or range"""
+
+
+class FrozenDict(dict):
+    """Read-only dict; copy.deepcopy() gives back an ordinary, editable dict"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("settings are read-only; copy.deepcopy() them to edit a copy")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __deepcopy__(self, memo):
+        return _thaw(self)
+
+    def __reduce__(self):
+        return (dict, (_thaw(self),))
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, dict):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True)
+class OpenAISettings:
+    api_key: Optional[str] = None
+    model: str = "gpt-3.5-turbo"
+    temperature: float = 0.7
+    max_tokens: int = 150
+    base_url: Optional[str] = None
+    timeout_seconds: float = 30.0
+    max_retries: int = 1
+
+
+@dataclass(frozen=True)
+class DriftSettings:
+    threshold: float = 0.5
+    recent_half_life: float = 3.0
+    baseline_half_life: float = 30.0
+    prior_strength: float = 5.0
+    min_turns: int = 3
+    check_interval: int = 10
+    recursion_threshold: int = 2
+    recursion_min_repetition: float = 0.25
+    shingle_size: int = 3
+    shingle_window: int = 5
+    coherence_loss_threshold: int = 3
+    stress_jump_threshold: float = 0.15
+
+
+@dataclass(frozen=True)
+class ApiSettings:
+    max_sessions: int = 1000
+    session_idle_seconds: float = 3600.0
+    session_memory_ceiling_mb: float = 32.0
+    compression_min_bytes: int = 1024
+    compression_level: int = 6
+    default_view: str = "full"
+    session_store: str = "local"
+    session_store_path: str = "logs/sessions.sqlite3"
+
+
+# Lower bounds checked on load; a file that fails them is not applied
+_MINIMUMS = {
+    "openai.temperature": 0.0, "openai.max_tokens": 1, "openai.timeout_seconds": 0.1, "openai.max_retries": 0,
+    "emotional_drift.threshold": 0.0, "emotional_drift.recent_half_life": 0.0,
+    "emotional_drift.baseline_half_life": 0.0, "emotional_drift.prior_strength": 0.0,
+    "emotional_drift.min_turns": 0, "emotional_drift.check_interval": 1,
+    "emotional_drift.recursion_threshold": 1, "emotional_drift.recursion_min_repetition": 0.0,
+    "emotional_drift.shingle_size": 1,
+    "emotional_drift.shingle_window": 1, "emotional_drift.stress_jump_threshold": 0.0,
+    "api.max_sessions": 1, "api.session_idle_seconds": 0.0, "api.session_memory_ceiling_mb": 0.0,
+    "api.compression_min_bytes": 0, "api.compression_level": 0,
+}
+
+
+def _typed_section(cls, name: str, raw):
+    """Build a typed section from its settings, checking each known key's type and minimum"""
+    if raw is None:
+        raw = {}
+    if not isinstance(raw, dict):
+        raise ConfigError(f"{name} must be a mapping, got {type(raw).__name__}")
+    values = {}
+    for field in dataclasses.fields(cls):
+        if raw.get(field.name) is None:
+            continue
+        value = raw[field.name]
+        key = f"{name}.{field.name}"
+        if field.type in (int, float):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ConfigError(f"{key} must be a number, got {value!r}")
+            if field.type is int and value != int(value):
+                raise ConfigError(f"{key} must be a whole number, got {value!r}")
+            value = field.type(value)
+            if key in _MINIMUMS and value < _MINIMUMS[key]:
+                raise ConfigError(f"{key} must be at least {_MINIMUMS[key]}, got {value!r}")
+        elif not isinstance(value, str):
+            raise ConfigError(f"{key} must be a string, got {value!r}")
+        values[field.name] = value
+    return cls(**values)
+
+
+class ConfigSnapshot:
+    """
+    One parse of the settings file. `settings` is the whole file, read-only; `openai`,
+    `emotional_drift` and `api` are validated typed sections. Never changes once built:
+    a reload produces a new snapshot.
+    """
+
+    def __init__(self, settings: Dict, config_file: str = DEFAULT_CONFIG_FILE, version: Tuple = None):
+        if not isinstance(settings, dict):
+            raise ConfigError(f"{config_file} must contain a mapping of sections")
+        self.settings = _freeze(settings)
+        self.config_file = config_file
+        self.version = version
+        self.loaded_at = time.time()
+        self.openai = _typed_section(OpenAISettings, "openai", self.settings.get("openai"))
+        self.emotional_drift = _typed_section(DriftSettings, "emotional_drift", self.settings.get("emotional_drift"))
+        self.api = _typed_section(ApiSettings, "api", self.settings.get("api"))
+
+    def get(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def section(self, name: str) -> Dict:
+        """A section's settings, empty when it is missing or blank"""
+        return self.settings.get(name) or FrozenDict()
+
+
+class ConfigService:
+    """
+    The current snapshot of one settings file, shared process-wide. The file is parsed once and
+    again only when its mtime or size changes, checked at most every `reload_interval` seconds
+    when a snapshot is asked for (or by the watcher thread). A new snapshot replaces the old one
+    in a single assignment, then subscribers are called with it. A file that fails to parse or
+    validate is reported and the previous snapshot stays in use.
+    """
+
+    def __init__(self, config_file: str = DEFAULT_CONFIG_FILE):
         self.config_file = config_file
-        self.settings = self.load_config()
+        self._lock = threading.Lock()
+        self._subscribers = []
+        # Subscriber count at which dead references are next pruned
+        self._prune_at = 64
+        self._watcher = None
+        self._snapshot = None
+        self._version = None
+        self._next_check = 0.0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.reload(force=True)
+
+    @property
+    def reload_interval(self) -> float:
+        reload_config = self._snapshot.section('config_reload')
+        if not reload_config.get('enabled', True):
+            return float('inf')
+        return float(reload_config.get('interval_seconds', 2.0))
+
+    def snapshot(self) -> ConfigSnapshot:
+        """Current snapshot, after a cheap check for a changed file when one is due"""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.reload_interval
+            self.reload()
+        return self._snapshot
+
+    def _file_version(self) -> Optional[Tuple]:
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the file if it changed (or always with force); True when a new snapshot was applied"""
+        # Imported on the first load rather than with the module, off the import path of every entry point
+        import yaml
+        with self._lock:
+            version = self._file_version()
+            if version is None:
+                if self._snapshot is None:
+                    raise FileNotFoundError(f"Configuration file not found: {self.config_file}")
+                return False
+            if version == self._version and not force:
+                return False
+            try:
+                with open(self.config_file, 'r') as file:
+                    snapshot = ConfigSnapshot(yaml.safe_load(file), self.config_file, version)
+            except (yaml.YAMLError, ConfigError) as e:
+                if self._snapshot is None:
+                    raise
+                # Keep serving the last good settings; retry once the file changes again
+                self._version = version
+                self.reload_errors += 1
+                print(f"Warning: {self.config_file} not reloaded, keeping previous settings: {e}")
+                return False
+            first_load = self._snapshot is None
+            self._snapshot = snapshot
+            self._version = version
+            if not first_load:
+                self.reloads += 1
+            subscribers = list(self._subscribers)
+        if not first_load:
+            self._notify(subscribers, snapshot)
+        return not first_load
+
+    def subscribe(self, callback: Callable[[ConfigSnapshot], None]):
+        """Call callback(snapshot) after every reload. Bound methods are held weakly,
+        so a subscribed component can still be garbage collected. References to collected
+        components are dropped whenever the list doubles, so it stays within twice the live ones
+        however many sessions come and go between reloads."""
+        ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+        with self._lock:
+            if len(self._subscribers) >= self._prune_at:
+                self._subscribers = [live for live in self._subscribers if live() is not None]
+                self._prune_at = max(64, 2 * len(self._subscribers))
+            self._subscribers.append(ref)
+
+    def _notify(self, subscribers, snapshot: ConfigSnapshot):
+        dead = []
+        for ref in subscribers:
+            callback = ref()
+            if callback is None:
+                dead.append(ref)
+                continue
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Warning: config subscriber {callback} failed: {e}")
+        if dead:
+            with self._lock:
+                self._subscribers = [ref for ref in self._subscribers if ref not in dead]
 
-    def load_config(self):
-        if not os.path.exists(self.config_file):
-            raise FileNotFoundError(f"Configuration file not found: {self.config_file}")
-        
-        with open(self.config_file, 'r') as file:
-            return yaml.safe_load(file)
+    def start_watching(self) -> bool:
+        """Check the file on a background thread, so reloads reach subscribers without traffic;
+        False if already watching or reloading is disabled"""
+        with self._lock:
+            if self._watcher is not None or self.reload_interval == float('inf'):
+                return False
+            self._watcher = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+            self._watcher.start()
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(min(self.reload_interval, 60.0))
+            self.snapshot()
+
+    def status(self) -> Dict:
+        return {
+            "config_file": self.config_file,
+            "loaded_at": self._snapshot.loaded_at,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "subscribers": len(self._subscribers),
+            "watching": self._watcher is not None
+        }
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_config_service(config_file: str = DEFAULT_CONFIG_FILE) -> ConfigService:
+    """Process-wide service for a settings file, created on first use"""
+    key = os.path.abspath(config_file)
+    service = _services.get(key)
+    if service is None:
+        with _services_lock:
+            service = _services.get(key)
+            if service is None:
+                service = ConfigService(config_file)
+                _services[key] = service
+    return service
+
+
+def get_config(config_file: str = DEFAULT_CONFIG_FILE) -> ConfigSnapshot:
+    """Current settings snapshot; no file parsing unless the file changed"""
+    return get_config_service(config_file).snapshot()
+
+
+class Config:
+    """Read access to the current snapshot, kept for existing callers"""
+
+    def __init__(self, config_file=DEFAULT_CONFIG_FILE):
+        self.config_file = config_file
+        self.snapshot = get_config(config_file)
+        self.settings = self.snapshot.settings
 
     def get(self, key, default=None):
         return self.settings.get(key, default)
 
     def set(self, key, value):
-        self.settings[key] = value
-        self.save_config()
-
-    def save_config(self):
-        with open(self.config_file, 'w') as file:
-            yaml.dump(self.settings, file)
+        """Change a top-level setting in the file and apply it to every subscriber.
+        The file is written out from the parsed settings, so its comments are not kept."""
+        settings = copy.deepcopy(self.settings)
+        settings[key] = value
+        import yaml
+        temp_file = f"{self.config_file}.tmp"
+        with open(temp_file, 'w') as file:
+            yaml.safe_dump(settings, file, sort_keys=False)
+        os.replace(temp_file, self.config_file)
+        service = get_config_service(self.config_file)
+        service.reload(force=True)
+        self.snapshot = service.snapshot()
+        self.settings = self.snapshot.settings
 
 
 # Standalone function for backward compatibility
-def load_config(config_file='config/settings.yaml'):
+def load_config(config_file=DEFAULT_CONFIG_FILE):
     """
-    Load configuration settings from YAML file.
+    Current configuration settings (read-only; parsed once per file change).
     Returns the configuration dictionary.
     """
-    if not os.path.exists(config_file):
-        raise FileNotFoundError(f"Configuration file not found: {config_file}")
-    
-    with open(config_file, 'r') as file:
-        return yaml.safe_load(file)
\ No newline at end of file
+    return get_config(config_file).settings
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from interfaces.admission import AdmissionController
+
+
+def acquire_concurrently(controller: AdmissionController, count: int) -> list:
+    results = [None] * count
+
+    def turn(index):
+        start = time.monotonic()
+        admission = controller.acquire()
+        results[index] = (admission, time.monotonic() - start)
+
+    threads = [threading.Thread(target=turn, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_queued_turns_run_degraded_while_slots_hang():
+    controller = AdmissionController(max_in_flight=2, max_queue=8, max_wait=1.0, degrade_queue_depth=2,
+                                     probe_interval=60.0)
+    hung = [controller.acquire(), controller.acquire()]
+    assert not any(admission.degraded for admission in hung)
+
+    results = acquire_concurrently(controller, 4)
+    assert controller.degraded
+    for admission, elapsed in results:
+        assert admission is not None and admission.degraded
+        assert elapsed < 0.5
+    assert controller.status()["degraded_in_flight"] == 4
+    assert controller.in_flight == 2
+
+
+def test_held_slots_count_as_latency():
+    controller = AdmissionController(max_in_flight=2, max_wait=2.0, degrade_queue_depth=16,
+                                     degrade_latency=0.2, probe_interval=60.0)
+    hung = [controller.acquire(), controller.acquire()]
+    start = time.monotonic()
+    # Waits only until the held slots pass degrade_latency, then runs degraded
+    admission = controller.acquire()
+    assert admission.degraded
+    assert 0.15 < time.monotonic() - start < 1.0
+    assert controller.latency == 0.0
+
+    # Once the held slots come back within recover_latency, degraded mode ends
+    controller.recover_latency = 1.0
+    for held in hung + [admission]:
+        controller.release(held)
+    assert not controller.degraded
+    assert not controller.acquire().degraded
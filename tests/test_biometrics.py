@@ -0,0 +1,34 @@
+import numpy as np
+
+from core.biometrics import load_biometric_params, monte_carlo
+from core.memory import Memory
+from core.metrics import ALERTS
+
+
+def test_monte_carlo_reproduces_live_sessions_with_the_same_seed():
+    params = load_biometric_params({"seed": 7, "noise_block": 16})
+    rng = np.random.default_rng(0)
+    # Longer than several noise blocks, so the live sessions refill theirs along the way
+    intensity = rng.random(50)
+    stress = rng.random(50) * 0.5
+    keys = ["alice", "bob", "carol"]
+
+    runs = monte_carlo(intensity, stress, seed=7, params=params, session_keys=keys)
+
+    assert runs["hrv"].shape == (len(keys), len(intensity))
+    for row, key in enumerate(keys):
+        memory = Memory(key, settings={"biometric_simulation": params})
+        readings = [memory.simulate_biometric_response(i, s) for i, s in zip(intensity, stress)]
+        np.testing.assert_allclose(runs["hrv"][row], [reading["hrv"] for reading in readings], atol=0.051)
+        np.testing.assert_array_equal(runs["heart_rate"][row], [reading["heart_rate"] for reading in readings])
+        np.testing.assert_allclose(runs["gsr"][row], [reading["gsr"] for reading in readings])
+
+
+def test_biometric_alert_counted_once_per_episode(monkeypatch):
+    memory = Memory("alerts", settings={"biometric_simulation": load_biometric_params({})})
+    states = iter([False, True, True, True, False, True, True])
+    monkeypatch.setattr(memory, "is_biometric_alert", lambda: next(states))
+    before = ALERTS.value("biometric")
+    for turn in range(7):
+        memory.store_interaction("text", {"emotional_state": "anxious"}, turn)
+    assert ALERTS.value("biometric") - before == 2
@@ -0,0 +1,42 @@
+import builtins
+
+import main
+from core.profiling import RequestProfiler
+
+
+def run_cli(monkeypatch, lines):
+    """Feed lines to the interactive loop and return the turns it ran"""
+    system = main.AgenticAISystem.__new__(main.AgenticAISystem)
+    system.profile_turns_remaining = 0
+    system.profile_mode = "cprofile"
+    turns = []
+    monkeypatch.setattr(system, "run_turn", turns.append, raising=False)
+    inputs = iter(lines + ["quit"])
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(inputs))
+    system.run_interactive_mode()
+    return system, turns
+
+
+def test_messages_starting_with_profile_are_turns(monkeypatch, capsys):
+    system, turns = run_cli(monkeypatch, ["profile picture makes me sad", "Profiles of my friends look happier"])
+    assert turns == ["profile picture makes me sad", "Profiles of my friends look happier"]
+    assert "Usage: profile" not in capsys.readouterr().out
+    assert system.profile_turns_remaining == 0
+
+
+def test_profile_command(monkeypatch):
+    system, turns = run_cli(monkeypatch, ["profile 3 sampling"])
+    assert turns == []
+    assert system.profile_turns_remaining == 3 and system.profile_mode == "sampling"
+
+    system, turns = run_cli(monkeypatch, ["Profile"])
+    assert turns == []
+    assert system.profile_turns_remaining == 1 and system.profile_mode == "cprofile"
+
+
+def test_admin_token_must_match():
+    profiler = RequestProfiler(output_dir=None, admin_token="s3cret")
+    assert profiler.is_authorized("s3cret")
+    assert not profiler.is_authorized("s3cre")
+    assert not profiler.is_authorized(None)
+    assert not RequestProfiler(output_dir=None).is_authorized("")
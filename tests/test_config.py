@@ -0,0 +1,57 @@
+import copy
+import gc
+import shutil
+
+import yaml
+
+from core.memory import Memory
+from utils.config import Config, ConfigService, ConfigSnapshot, get_config, get_config_service
+
+
+def test_set_writes_the_setting_and_reloads(tmp_path):
+    path = tmp_path / "settings.yaml"
+    shutil.copy("config/settings.yaml", path)
+    original = yaml.safe_load(path.read_text())
+    drift = dict(original["emotional_drift"], threshold=0.7)
+
+    config = Config(str(path))
+    config.set("emotional_drift", drift)
+
+    assert yaml.safe_load(path.read_text()) == dict(original, emotional_drift=drift)
+    assert config.get("emotional_drift")["threshold"] == 0.7
+    assert get_config(str(path)).emotional_drift.threshold == 0.7
+    assert not (tmp_path / "settings.yaml.tmp").exists()
+
+
+class Component:
+    def __init__(self, service):
+        service.subscribe(self.apply_settings)
+
+    def apply_settings(self, snapshot):
+        pass
+
+
+def test_subscribers_of_collected_components_are_dropped():
+    service = ConfigService("config/settings.yaml")
+    live = [Component(service) for _ in range(10)]
+    for _ in range(5000):
+        Component(service)
+    gc.collect()
+    assert len(live) + 1 <= len(service._subscribers) <= 128
+
+
+def test_memory_follows_biometric_thresholds():
+    memory = Memory("thresholds")
+    memory.stress_level = 0.8
+    assert not memory.is_biometric_alert()
+
+    settings = copy.deepcopy(get_config().settings)
+    settings["biometric_simulation"]["alert_thresholds"]["stress_level"] = 0.5
+    settings["biometric_simulation"]["stress_smoothing"] = 0.9
+    service = get_config_service()
+    service._notify(list(service._subscribers), ConfigSnapshot(settings))
+    try:
+        assert memory.is_biometric_alert()
+        assert memory.stress_smoothing == 0.9
+    finally:
+        service._notify(list(service._subscribers), get_config())
@@ -0,0 +1,36 @@
+from interfaces import api
+from interfaces.events import SessionChannel
+
+
+def first_frame(last_event_id: int = None) -> bytes:
+    headers = {} if last_event_id is None else {"Last-Event-ID": str(last_event_id)}
+    response = api.app.test_client().get("/api/events?session_id=events-test", headers=headers)
+    try:
+        return next(iter(response.response))
+    finally:
+        response.close()
+
+
+def test_read_after_an_unknown_id_asks_for_a_resync():
+    channel = SessionChannel()
+    for index in range(3):
+        channel.publish("alert", {"index": index})
+    assert channel.read(40, timeout=0.0) == ([], False)
+    events, complete = channel.read(1, timeout=0.0)
+    assert [event_id for event_id, _ in events] == [2, 3] and complete
+
+
+def test_reconnect_with_unknown_last_event_id_gets_full_state():
+    # Channel ids restart at 0 in a new process, after a prune, or on another worker
+    frame = first_frame(last_event_id=40)
+    assert b"event: status" in frame and b"id: 0" in frame
+
+    bus = api.get_event_bus()
+    channel = bus.open_stream("events-test")
+    try:
+        channel.publish("alert", {"index": 1})
+        # A known id resumes without a snapshot
+        assert b"event: status" not in first_frame(last_event_id=channel.last_id)
+        assert b"event: status" in first_frame()
+    finally:
+        bus.close_stream(channel)
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from agents.specialized_agents import AgentB
+from core.llm_service import LLMService
+
+CALL_TYPES = ("agent_a", "agent_b_intervention", "emotional_analysis", "conversation_summary",
+              "agent_b_monitoring")
+
+# Two sessions of two turns each, with different inputs every turn
+SESSIONS = {
+    "first": ["I'm feeling great today, everything is going well!",
+              "Actually, I keep worrying about work over and over"],
+    "second": ["I love my job but I also hate it",
+               "I'm fine, everything is fine, but nothing feels right"],
+}
+
+
+class RecordingClient:
+    """Stands in for the OpenAI client, keeping every request's messages"""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        self.requests.append(messages)
+        message = SimpleNamespace(content="none")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def call(service: LLMService, client: RecordingClient, call_type: str, inputs: list) -> list:
+    """Run one LLM call of the given type for the latest turn, returning the messages sent"""
+    user_input = inputs[-1]
+    history = [{"interaction": text} for text in inputs]
+    analysis = {"emotional_state": "anxious" if "worry" in user_input else "neutral",
+                "alerts": [f"turn {len(inputs)}"], "recursion_detected": len(inputs) > 1}
+    if call_type == "agent_a":
+        service.get_agent_a_response(user_input, analysis, {"recent_interactions": history[:-1]})
+    elif call_type == "agent_b_intervention":
+        service.get_agent_b_intervention(user_input, analysis, {"intervention_needed": True,
+                                                                "concern_level": "medium",
+                                                                "recommendations": [user_input]})
+    elif call_type == "emotional_analysis":
+        service.enhance_emotional_analysis(user_input, history[:-1])
+    elif call_type == "conversation_summary":
+        service.generate_conversation_summary(history)
+    else:
+        AgentB(name="Sentinel", tone="analytical", llm_service=service)._ai_powered_monitoring(history)
+    return client.requests.pop()
+
+
+def test_system_prefix_is_identical_across_turns_and_sessions():
+    sent = {call_type: [] for call_type in CALL_TYPES}
+    for inputs in SESSIONS.values():
+        # Each session gets its own service, as the CLI's components do
+        service = LLMService()
+        client = service._client = RecordingClient()
+        service._available = True
+        for turn in range(1, len(inputs) + 1):
+            for call_type in CALL_TYPES:
+                sent[call_type].append(call(service, client, call_type, inputs[:turn]))
+
+    for call_type, requests in sent.items():
+        assert len(requests) == 4, call_type
+        system_messages = [messages[0] for messages in requests]
+        assert all(message["role"] == "system" for message in system_messages), call_type
+        prefixes = {message["content"].encode("utf-8") for message in system_messages}
+        assert len(prefixes) == 1, f"{call_type} sent {len(prefixes)} different system prefixes"
+        # The per-turn content does change, after the prefix
+        assert len({messages[-1]["content"] for messages in requests}) == 4, call_type
@@ -0,0 +1,48 @@
+from core.reasoning import Reasoning
+from core.shingles import ShingleIndex
+from core.turn_features import TurnFeatures
+from utils.config import get_config
+
+# Ordinary conversation that shares only filler ("I feel like") from turn to turn
+FILLER_TURNS = [
+    "I feel like work has been busy lately, lots of meetings",
+    "Yesterday I feel like we had a good time at the park",
+    "Today I feel like going for a walk by the river",
+    "Honestly I feel like cooking pasta for dinner tonight",
+    "I feel like my sister would enjoy the new museum",
+    "This weekend I feel like reading a mystery novel",
+]
+
+
+def reasoning() -> Reasoning:
+    return Reasoning(settings=get_config().settings, use_llm=False)
+
+
+def test_shared_filler_is_not_recursion():
+    session = reasoning()
+    for text in FILLER_TURNS:
+        analysis = session.analyze_input(text)
+        assert not analysis["recursion_detected"], text
+        assert analysis["coherence_status"] == "stable", text
+        assert analysis["repetition"]["repetition_score"] == 0.0, text
+
+
+def test_repeated_phrase_is_recursion():
+    session = reasoning()
+    texts = ["I keep replaying the argument with my brother",
+             "Work was fine but I keep replaying the argument with my brother",
+             "Still I keep replaying the argument with my brother tonight"]
+    results = [session.analyze_input(text) for text in texts]
+    assert [result["recursion_detected"] for result in results] == [False, False, True]
+    assert "keep replaying the" in results[-1]["repetition"]["recurring_phrases"]
+
+
+def test_one_shared_phrase_in_a_long_turn_is_not_enough():
+    index = ShingleIndex(n=3, window=5, threshold=2, min_repetition=0.25)
+    index.observe(TurnFeatures("the project deadline moved again").tokens)
+    index.observe(TurnFeatures("my project deadline moved, oh well").tokens)
+    result = index.observe(TurnFeatures(
+        "project deadline moved but otherwise we painted the garden fence blue and planted tomatoes").tokens)
+    assert result["max_recurrence"] == 2
+    assert 0.0 < result["repetition_score"] < 0.25
+    assert not result["recursion_detected"]
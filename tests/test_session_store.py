@@ -0,0 +1,95 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT, SRC
+
+# One turn of a stored session in a fresh interpreter, printing what the analysis found
+TURN_SCRIPT = """
+import json, sys
+from interfaces import api
+from interfaces.session_store import SQLiteSessionStore
+from interfaces.sessions import SessionRegistry
+api.get_llm_service().disable()
+registry = SessionRegistry(api.config.settings['agent_parameters'], api.get_llm_service(),
+                           store=SQLiteSessionStore(sys.argv[1]))
+session = registry.get('shared')
+with registry.turn(session):
+    analysis = api.run_turn(session, sys.argv[2])['emotional_analysis']
+print(json.dumps({'turn': session.turn_counter, 'recursion': analysis['recursion_detected'],
+                  'repetition': analysis['repetition']['repetition_score']}))
+"""
+
+
+def run_turn_in_process(store_path: str, text: str, hash_seed: int) -> dict:
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed), PYTHONPATH=SRC)
+    output = subprocess.run([sys.executable, "-c", TURN_SCRIPT, store_path, text], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=120, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_recursion_detected_across_worker_processes(tmp_path):
+    store_path = str(tmp_path / "sessions.sqlite3")
+    text = "I keep going over the same argument with my brother again"
+    results = [run_turn_in_process(store_path, text, seed) for seed in (1, 2, 3)]
+
+    assert [result["turn"] for result in results] == [1, 2, 3]
+    assert results[1]["repetition"] > 0
+    assert results[2]["recursion"]
+
+
+def stored_sizes(store, session_id: str) -> tuple:
+    """Bytes of the session's core and of its newest journal row"""
+    connection = store._connection()
+    core = connection.execute("SELECT length(state) FROM sessions WHERE session_id = ?", (session_id,)).fetchone()[0]
+    row = connection.execute("SELECT length(items) FROM session_turns WHERE session_id = ? ORDER BY turn DESC LIMIT 1",
+                             (session_id,)).fetchone()[0]
+    return core, row
+
+
+def test_turns_alternating_between_workers_match_a_local_session(tmp_path):
+    from core.retrieval import TfidfIndex
+    from interfaces import api
+    from interfaces.session_store import JOURNALED_LISTS, SQLiteSessionStore, _resolve
+    from interfaces.sessions import ConversationSession, SessionRegistry
+
+    service = api.get_llm_service()
+    service.disable()
+    parameters = api.config.settings['agent_parameters']
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"))
+    workers = [SessionRegistry(parameters, service, store=store) for _ in range(2)]
+    local = ConversationSession("alternating", parameters, service)
+    texts = [f"Turn {turn}: I talked to my sister about work and the move to {city}"
+             for turn, city in enumerate(["Lyon", "Oslo", "Quito", "Perth"] * 10, 1)]
+
+    sizes = {}
+    for turn, text in enumerate(texts, 1):
+        registry = workers[turn % 2]
+        session = registry.get("alternating")
+        with registry.turn(session):
+            api.run_turn(session, text)
+        api.run_turn(local, text)
+        if turn in (5, len(texts)):
+            sizes[turn] = stored_sizes(store, "alternating")
+
+    # One copy caught up row by row, the other loaded in full
+    caught_up = workers[0].get("alternating")
+    restored = SessionRegistry(parameters, service, store=store).get("alternating")
+    for session in (caught_up, restored):
+        assert session.turn_counter == local.turn_counter == len(texts)
+        for path in JOURNALED_LISTS:
+            assert len(_resolve(session.get_state(), path)) == len(_resolve(local.get_state(), path)), path
+        assert [entry["interaction"] for entry in session.memory.past_interactions] == texts
+        rebuilt = TfidfIndex()
+        rebuilt.documents = list(session.memory.retrieval_index.documents)
+        rebuilt.index_documents()
+        assert session.memory.retrieval_index.postings == rebuilt.postings
+    assert caught_up.memory.retrieval_index.documents == restored.memory.retrieval_index.documents
+    assert caught_up.memory.retrieval_index.search("sister in Oslo") == \
+        restored.memory.retrieval_index.search("sister in Oslo")
+
+    # Saves write the turn, not the conversation: the core and each journal row stay about the same size
+    (early_core, early_row), (late_core, late_row) = sizes[5], sizes[len(texts)]
+    assert late_core < early_core * 1.5
+    assert late_row < early_row * 1.5
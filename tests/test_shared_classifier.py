@@ -0,0 +1,14 @@
+from interfaces.sessions import SessionRegistry
+from utils.config import get_config
+
+
+def test_sessions_share_one_emotion_classifier():
+    registry = SessionRegistry(get_config().settings["agent_parameters"])
+    first, second = registry.get("classifier-a"), registry.get("classifier-b")
+    classifier = first.reasoning.emotion_classifier
+    assert classifier is not None
+    assert second.reasoning.emotion_classifier is classifier
+
+    # The shared copy is not counted against each session's memory
+    sizes = {entry["session_id"]: entry["bytes"] for entry in registry.memory_usage()}
+    assert sizes["classifier-a"] < 50 * 1024, sizes
@@ -0,0 +1,19 @@
+import os
+import sys
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import pytest
+
+from bench_startup import DEFAULT_BUDGETS_MS, DEFERRED_MODULES, measure
+
+
+@pytest.mark.parametrize("target", sorted(DEFERRED_MODULES))
+def test_cold_start_within_budget(target):
+    result = measure(target, runs=3)
+
+    assert result["deferred_imported"] == [], f"{target} imports {result['deferred_imported']} at startup"
+    assert result["wall"] * 1000 <= DEFAULT_BUDGETS_MS[target], \
+        f"{target} cold start took {result['wall'] * 1000:.0f} ms"
@@ -0,0 +1,28 @@
+import threading
+from types import SimpleNamespace
+
+from core.usage import UsageLedger
+
+
+def test_calls_from_short_lived_threads_share_one_table():
+    ledger = UsageLedger(pricing={"model": {"prompt": 1.0, "completion": 2.0}})
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, prompt_tokens_details=None)
+
+    def request():
+        for _ in range(10):
+            ledger.record("agent_a", "model", usage, latency=0.01, session_id="alice")
+
+    # One thread per request, as the threaded development server does
+    for _ in range(20):
+        threads = [threading.Thread(target=request) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(ledger._totals) == 1
+    total = ledger.summary()["total"]
+    assert total["calls"] == 2000
+    assert total["prompt_tokens"] == 20000 and total["completion_tokens"] == 10000
+    assert total["cost_usd"] == 40.0
+    assert ledger.throughput()["calls_per_minute"] == 2000